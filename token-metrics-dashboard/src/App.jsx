@@ -12,6 +12,10 @@ import './App.css'
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:5000/api/v1'
 const WEBSOCKET_URL = import.meta.env.VITE_WEBSOCKET_URL || 'http://localhost:5000'
 const API_KEY = 'demo-api-key-12345678'
+// Only the columns the dashboard renders; the API skips everything else
+const TOKEN_FIELDS = 'id,name,symbol,price,market_cap,volume_24h,percent_change_24h,percent_change_7d,velocity,velocity_trend'
+// Fallback refresh while the socket is down; live updates cover the connected case
+const OFFLINE_REFRESH_MS = 300000
 
 function App() {
   const [tokens, setTokens] = useState([])
@@ -19,6 +23,9 @@ function App() {
   const [loading, setLoading] = useState(true)
   const [searchTerm, setSearchTerm] = useState('')
   const [velocityData, setVelocityData] = useState([])
+  const [overview, setOverview] = useState(null)
+  // Snapshot version of the last bootstrap; subscriptions only send changes after it
+  const [version, setVersion] = useState(null)
   const [socket, setSocket] = useState(null)
   const [connected, setConnected] = useState(false)
   const [lastUpdate, setLastUpdate] = useState(null)
@@ -55,12 +62,11 @@ function App() {
       )
       
       // Update selected token if it matches
-      if (selectedToken && selectedToken.id === data.token_id) {
-        setSelectedToken(prev => ({
-          ...prev,
-          quote: { USD: { ...prev.quote?.USD, ...data.data } }
-        }))
-      }
+      setSelectedToken(prev =>
+        prev && prev.id === data.token_id
+          ? { ...prev, quote: { USD: { ...prev.quote?.USD, ...data.data } } }
+          : prev
+      )
     })
 
     socketInstance.on('market_update', (data) => {
@@ -73,65 +79,77 @@ function App() {
     }
   }, [])
 
-  // Fetch tokens data
-  const fetchTokens = async () => {
+  // Fetch the list, overview and selected token's detail and series in one request
+  const fetchBootstrap = async (tokenId = selectedToken?.id) => {
     try {
       setLoading(true)
-      const response = await fetch(`${API_BASE_URL}/tokens?limit=20`, {
+      const params = new URLSearchParams({ limit: '20', fields: TOKEN_FIELDS })
+      if (tokenId) {
+        params.set('token', tokenId)
+      }
+      const response = await fetch(`${API_BASE_URL}/dashboard/bootstrap?${params}`, {
         headers: {
           'X-API-Key': API_KEY
         }
       })
       const data = await response.json()
       if (data.status.error_code === 0) {
-        setTokens(data.data)
-        if (data.data.length > 0 && !selectedToken) {
-          setSelectedToken(data.data[0])
+        const { tokens, overview, selected, version } = data.data
+        setTokens(tokens)
+        setOverview(overview)
+        setVersion(version)
+        if (selected) {
+          setSelectedToken(selected.token)
+          setVelocityData(toChartData(selected.series.data))
         }
       }
     } catch (error) {
-      console.error('Error fetching tokens:', error)
+      console.error('Error fetching dashboard:', error)
     } finally {
       setLoading(false)
     }
   }
 
-  // Subscribe to token updates via WebSocket
+  // Subscribe to token updates newer than the bootstrap snapshot
   const subscribeToToken = (tokenId) => {
     if (socket && connected) {
       socket.emit('subscribe_token', {
         token_id: tokenId,
-        metrics: ['price', 'volume', 'velocity']
+        metrics: ['price', 'volume', 'velocity'],
+        since_version: version
       })
     }
   }
 
-  // Generate mock velocity chart data
-  const generateVelocityData = (currentVelocity) => {
-    const data = []
-    const baseVelocity = currentVelocity || 0.5
-    for (let i = 23; i >= 0; i--) {
-      data.push({
-        time: `${i}h`,
-        velocity: Math.max(0, baseVelocity + (Math.random() - 0.5) * 0.2),
-        volume: Math.random() * 10000 + 1000
-      })
+  const toChartData = (series) => series.map(point => ({
+    time: new Date(point.timestamp).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }),
+    velocity: point.quote?.USD?.velocity || 0,
+    volume: point.quote?.USD?.volume_24h || 0
+  }))
+
+  const selectToken = (token) => {
+    if (token.id !== selectedToken?.id) {
+      fetchBootstrap(token.id)
     }
-    return data
   }
 
   useEffect(() => {
-    fetchTokens()
-    const interval = setInterval(fetchTokens, 300000) // Refresh every 5 minutes
-    return () => clearInterval(interval)
+    fetchBootstrap()
   }, [])
 
   useEffect(() => {
-    if (selectedToken) {
-      setVelocityData(generateVelocityData(selectedToken.quote?.USD?.velocity))
+    if (connected) {
+      return
+    }
+    const interval = setInterval(() => fetchBootstrap(), OFFLINE_REFRESH_MS)
+    return () => clearInterval(interval)
+  }, [connected, selectedToken?.id])
+
+  useEffect(() => {
+    if (selectedToken && version !== null) {
       subscribeToToken(selectedToken.id)
     }
-  }, [selectedToken, socket, connected])
+  }, [selectedToken?.id, version, socket, connected])
 
   const filteredTokens = tokens.filter(token =>
     token.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
@@ -201,7 +219,7 @@ function App() {
                   Last update: {lastUpdate.toLocaleTimeString()}
                 </span>
               )}
-              <Button onClick={fetchTokens} disabled={loading} className="gap-2">
+              <Button onClick={() => fetchBootstrap()} disabled={loading} className="gap-2">
                 <RefreshCw className={`h-4 w-4 ${loading ? 'animate-spin' : ''}`} />
                 Refresh
               </Button>
@@ -217,7 +235,7 @@ function App() {
               <BarChart3 className="h-4 w-4 text-muted-foreground" />
             </CardHeader>
             <CardContent>
-              <div className="text-2xl font-bold">{tokens.length}</div>
+              <div className="text-2xl font-bold">{overview ? overview.active_tokens : tokens.length}</div>
               <p className="text-xs text-muted-foreground">Active tokens tracked</p>
             </CardContent>
           </Card>
@@ -229,10 +247,7 @@ function App() {
             </CardHeader>
             <CardContent>
               <div className="text-2xl font-bold">
-                {tokens.length > 0 
-                  ? (tokens.reduce((sum, token) => sum + (token.quote?.USD?.velocity || 0), 0) / tokens.length).toFixed(3)
-                  : '0.000'
-                }
+                {(overview?.average_velocity || 0).toFixed(3)}
               </div>
               <p className="text-xs text-muted-foreground">Average token velocity</p>
             </CardContent>
@@ -245,7 +260,7 @@ function App() {
             </CardHeader>
             <CardContent>
               <div className="text-2xl font-bold">
-                ${formatNumber(tokens.reduce((sum, token) => sum + (token.quote?.USD?.market_cap || 0), 0))}
+                ${formatNumber(overview?.total_market_cap || 0)}
               </div>
               <p className="text-xs text-muted-foreground">Combined market cap</p>
             </CardContent>
@@ -258,7 +273,7 @@ function App() {
             </CardHeader>
             <CardContent>
               <div className="text-2xl font-bold">
-                ${formatNumber(tokens.reduce((sum, token) => sum + (token.quote?.USD?.volume_24h || 0), 0))}
+                ${formatNumber(overview?.total_volume_24h || 0)}
               </div>
               <p className="text-xs text-muted-foreground">Total 24h volume</p>
             </CardContent>
@@ -290,7 +305,7 @@ function App() {
                       className={`p-4 border-b cursor-pointer hover:bg-slate-50 dark:hover:bg-slate-800 transition-all duration-200 ${
                         selectedToken?.id === token.id ? 'bg-blue-50 dark:bg-blue-900/20 border-blue-200 border-l-4 border-l-blue-500' : ''
                       }`}
-                      onClick={() => setSelectedToken(token)}
+                      onClick={() => selectToken(token)}
                     >
                       <div className="flex items-center justify-between">
                         <div>
@@ -0,0 +1,94 @@
+"""Compare indexed alert matching against scanning every rule per tick.
+
+Builds ``--rules`` random rules over ``--tokens`` tokens and replays
+``--ticks`` small random price/velocity moves through ``AlertEngine.evaluate``
+and through a naive loop over all rules. Both must produce the same alerts.
+
+Usage:
+    python benchmarks/alert_benchmark.py --rules 100000 --tokens 100 --ticks 50
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.alerts import ALERT_CONDITIONS, AlertEngine
+
+METRICS = ('price', 'velocity')
+
+
+def naive(rules, previous, values):
+    fired = []
+    for rule in rules:
+        before = previous.get(rule.token_id, {}).get(rule.metric)
+        after = values.get(rule.token_id, {}).get(rule.metric)
+        if before is None or after is None:
+            continue
+        rising = before <= rule.threshold < after
+        falling = after < rule.threshold <= before
+        if (rule.condition == 'above' and rising) or (rule.condition == 'below' and falling) \
+                or (rule.condition == 'crosses' and (rising or falling)):
+            fired.append(rule.id)
+    return fired
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rules', type=int, default=100000)
+    parser.add_argument('--tokens', type=int, default=100)
+    parser.add_argument('--ticks', type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(1)
+    values = {
+        token_id: {'price': random.uniform(1, 1000), 'velocity': random.uniform(0, 2)}
+        for token_id in range(args.tokens)
+    }
+    rules = []
+    for rule_id in range(args.rules):
+        token_id = random.randrange(args.tokens)
+        metric = random.choice(METRICS)
+        rules.append(SimpleNamespace(
+            id=rule_id, api_key_hash='bench', token_id=token_id, metric=metric,
+            condition=random.choice(ALERT_CONDITIONS),
+            threshold=values[token_id][metric] * random.uniform(0.5, 1.5)
+        ))
+
+    engine = AlertEngine()
+    engine._loaded = True
+    for rule in rules:
+        engine._add(rule)
+    engine.evaluate(values)
+
+    indexed_time = naive_time = 0.0
+    fired = 0
+    for _ in range(args.ticks):
+        previous = values
+        values = {
+            token_id: {metric: value * random.uniform(0.98, 1.02) for metric, value in metrics.items()}
+            for token_id, metrics in previous.items()
+        }
+
+        started = time.perf_counter()
+        alerts = engine.evaluate(values)
+        indexed_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        expected = naive(rules, previous, values)
+        naive_time += time.perf_counter() - started
+
+        assert sorted(payload['rule_id'] for _, payload in alerts) == sorted(expected)
+        fired += len(alerts)
+
+    print(f"rules={args.rules} tokens={args.tokens} ticks={args.ticks} alerts/tick={fired / args.ticks:.1f}")
+    print(f"indexed  {indexed_time / args.ticks * 1000:8.3f} ms/tick")
+    print(f"naive    {naive_time / args.ticks * 1000:8.3f} ms/tick")
+    print(f"speedup  {naive_time / indexed_time:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""Time the historical backfill against the CMC stub and check its results.
+
+Starts the deterministic stub from ``cmc_stub.py`` in-process, with
+``--latency-ms`` of injected latency per request, seeds its tokens into a
+fresh SQLite database and then:
+
+- backfills ``--days`` of ``--interval`` quotes for every token at each
+  ``--concurrency`` level and reports requests, rows and throughput
+- interrupts a run halfway, resumes it from the checkpoint, and checks
+  the result holds exactly one row per token and interval
+- compares the vectorized velocity windows with a per-row query of the
+  window each row would have seen at ingest time
+
+Usage:
+    python benchmarks/backfill_benchmark.py --universe 50 --days 7 --concurrency 1 8 --latency-ms 40
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sqlalchemy import func, select
+from werkzeug.serving import make_server
+from cmc_stub import FaultPlan, SyntheticMarket, create_stub_app
+from src.app import create_app
+from src.models.token import db, Token, TokenMetric
+from src.services.backfill import BACKFILL_INTERVALS, VELOCITY_WINDOWS, Backfill
+from src.services.container import get_services
+
+
+class Interrupted(Exception):
+    pass
+
+
+def start_stub(market, faults):
+    server = make_server('127.0.0.1', 0, create_stub_app(market, faults), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/v1"
+
+
+def fresh_app(market):
+    directory = tempfile.mkdtemp(prefix='tms-backfill-')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'backfill.db')}",
+        'SOCKETIO_ASYNC_MODE': 'threading',
+        'INGEST_ENABLED': False,
+        'TESTING': True
+    })
+    with app.app_context():
+        now = datetime.utcnow()
+        db.session.execute(Token.__table__.insert(), [
+            {'cmc_id': int(cmc_id), 'name': name, 'symbol': symbol, 'slug': slug,
+             'is_active': True, 'created_at': now, 'updated_at': now}
+            for cmc_id, name, symbol, slug in zip(market.ids, market.names, market.symbols, market.slugs)
+        ])
+        db.session.commit()
+    return app, directory
+
+
+def backfill(app, time_start, time_end, interval, concurrency, checkpoint=None, progress=None):
+    with app.app_context():
+        tokens = dict(db.session.execute(select(Token.cmc_id, Token.id)).all())
+        job = Backfill(get_services().data_service, tokens, time_start, time_end, interval,
+                       concurrency, checkpoint_path=checkpoint)
+        started = time.perf_counter()
+        stats = job.run(progress)
+        return stats, time.perf_counter() - started
+
+
+def naive_windows(token_id):
+    """Each row's window averages, one query per row and window as the ingester does"""
+    metrics = TokenMetric.query.filter_by(token_id=token_id).order_by(TokenMetric.timestamp).all()
+    expected = {}
+    for metric in metrics:
+        values = []
+        for column, window in VELOCITY_WINDOWS.items():
+            earlier = db.session.query(TokenMetric.velocity).filter(
+                TokenMetric.token_id == token_id,
+                TokenMetric.timestamp >= metric.timestamp - window,
+                TokenMetric.timestamp < metric.timestamp
+            ).all()
+            velocities = [float(row[0]) for row in earlier if row[0]]
+            values.append(sum(velocities) / len(velocities) if velocities else None)
+        expected[metric.id] = values
+    return expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--universe', type=int, default=50)
+    parser.add_argument('--days', type=float, default=7)
+    parser.add_argument('--interval', choices=tuple(BACKFILL_INTERVALS), default='1h')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--latency-ms', type=float, default=40)
+    parser.add_argument('--naive-tokens', type=int, default=3, help='tokens checked against per-row queries')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    market = SyntheticMarket(args.universe)
+    os.environ['CMC_BASE_URL'] = start_stub(market, FaultPlan(args.latency_ms))
+
+    step = BACKFILL_INTERVALS[args.interval]
+    time_end = datetime(2025, 6, 20)
+    time_start = time_end - timedelta(days=args.days)
+    expected_rows = args.universe * int((time_end - time_start) / step)
+
+    print(f"{'concurrency':>11} {'units':>6} {'rows':>8} {'seconds':>8} {'rows/s':>9} {'recompute':>9}")
+    for concurrency in args.concurrency:
+        app, _ = fresh_app(market)
+        stats, seconds = backfill(app, time_start, time_end, args.interval, concurrency)
+        assert stats['inserted'] == expected_rows, (stats['inserted'], expected_rows)
+        print(f"{concurrency:>11} {stats['units']:>6} {stats['inserted']:>8} {seconds:>8.2f} "
+              f"{stats['inserted'] / seconds:>9.0f} {stats['recomputed']:>9}")
+
+    # Interrupt halfway, then resume from the checkpoint
+    app, directory = fresh_app(market)
+    checkpoint = os.path.join(directory, 'backfill.checkpoint.json')
+    completed = []
+
+    def interrupt(unit, inserted):
+        completed.append(unit)
+        if len(completed) * 2 >= len(plan):
+            raise Interrupted()
+
+    with app.app_context():
+        tokens = dict(db.session.execute(select(Token.cmc_id, Token.id)).all())
+        plan = Backfill(get_services().data_service, tokens, time_start, time_end, args.interval).units
+    try:
+        backfill(app, time_start, time_end, args.interval, max(args.concurrency), checkpoint, interrupt)
+    except Interrupted:
+        pass
+    stats, _ = backfill(app, time_start, time_end, args.interval, max(args.concurrency), checkpoint)
+    with app.app_context():
+        rows = db.session.query(func.count(TokenMetric.id)).scalar()
+        distinct = db.session.execute(
+            select(func.count()).select_from(
+                select(TokenMetric.token_id, TokenMetric.timestamp).distinct().subquery()
+            )
+        ).scalar()
+    assert rows == distinct == expected_rows, (rows, distinct, expected_rows)
+    print(f"resume: {len(completed)} units before interruption, {stats['skipped']} skipped on rerun, "
+          f"{rows} rows, no duplicates")
+
+    # Vectorized velocity windows against per-row queries
+    with app.app_context():
+        diff = 0.0
+        started = time.perf_counter()
+        checked = 0
+        for token_id in range(1, args.naive_tokens + 1):
+            expected = naive_windows(token_id)
+            checked += len(expected)
+            stored = {
+                row[0]: row[1:] for row in db.session.execute(
+                    select(TokenMetric.id, *(getattr(TokenMetric, column) for column in VELOCITY_WINDOWS))
+                    .where(TokenMetric.token_id == token_id)
+                )
+            }
+            for metric_id, values in expected.items():
+                for value, actual in zip(values, stored[metric_id]):
+                    assert (value is None) == (actual is None), (metric_id, value, actual)
+                    if value is not None:
+                        diff = max(diff, abs(value - float(actual)))
+        naive_seconds = time.perf_counter() - started
+    assert diff < 1e-6, diff
+    print(f"velocity windows: {checked} rows match per-row queries (max |diff| {diff:.1e}); "
+          f"per-row queries took {naive_seconds:.2f}s for {args.naive_tokens} tokens")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,333 @@
+"""Deterministic stand-in for the CoinMarketCap API used by the ingester.
+
+Serves ``/v1/cryptocurrency/listings/latest``, ``/v1/cryptocurrency/quotes/historical``,
+``/v1/cryptocurrency/info`` and ``/v1/tools/price-conversion`` from either a synthetic market (a seeded random walk over ``--universe``
+tokens, advanced one tick per listings request) or recorded listings
+payloads replayed in order. Latency, a random error rate and periodic 429
+bursts can be injected. Point the service at it with
+``CMC_BASE_URL=http://127.0.0.1:<port>/v1``.
+
+Usage:
+    python benchmarks/cmc_stub.py --port 8765 --universe 500 --latency-ms 80 \\
+        --error-rate 0.01 --burst-every 50 --burst-length 3
+    python benchmarks/cmc_stub.py --payloads recorded_listings.jsonl
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import Flask, jsonify, request
+
+# Fixed USD cross rates served by tools/price-conversion
+FIAT_RATES = {
+    'EUR': 0.92, 'GBP': 0.79, 'JPY': 151.2, 'CAD': 1.36, 'AUD': 1.52,
+    'CHF': 0.9, 'CNY': 7.24, 'INR': 83.3, 'KRW': 1350.0, 'BRL': 5.05
+}
+
+# Historical quote intervals served, in seconds
+HISTORICAL_INTERVALS = {
+    '5m': 300, '15m': 900, '30m': 1800, '1h': 3600, '2h': 7200,
+    '6h': 21600, '12h': 43200, '1d': 86400
+}
+
+# BTC and ETH keep their real ids so cross rates resolve during replays
+_ANCHORS = ((1, 'Bitcoin', 'BTC', 'bitcoin', 60000.0), (1027, 'Ethereum', 'ETH', 'ethereum', 3000.0))
+
+
+def _status(error_code=0, error_message=None):
+    return {
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'error_code': error_code,
+        'error_message': error_message,
+        'elapsed': 0,
+        'credit_count': 0 if error_code else 1
+    }
+
+
+class SyntheticMarket:
+    """Seeded random-walk market; the same seed yields the same tick sequence"""
+
+    def __init__(self, universe=100, seed=0):
+        self.universe = universe
+        self.seed = seed
+        self.tick = 0
+        rng = np.random.default_rng(seed)
+
+        self.ids = np.concatenate(([a[0] for a in _ANCHORS], np.arange(2000, 2000 + universe)))[:universe]
+        self.names = [a[1] for a in _ANCHORS] + [f'Synthetic {i}' for i in range(universe)]
+        self.symbols = [a[2] for a in _ANCHORS] + [f'SYN{i}' for i in range(universe)]
+        self.slugs = [a[3] for a in _ANCHORS] + [f'synthetic-{i}' for i in range(universe)]
+
+        self.price = rng.lognormal(0, 3, universe)
+        self.price[:len(_ANCHORS)] = [a[4] for a in _ANCHORS][:universe]
+        self.supply = rng.uniform(1e6, 1e10, universe)
+        self.max_supply = np.where(rng.random(universe) < 0.3, self.supply * 2, np.nan)
+        self.turnover = rng.uniform(0.01, 0.5, universe)
+        self.history = [self.price.copy()]
+        self.date_added = (datetime(2020, 1, 1) + timedelta(days=int(rng.integers(0, 1500)))).isoformat() + 'Z'
+
+    def advance(self):
+        """Step every price one tick forward"""
+        self.tick += 1
+        rng = np.random.default_rng((self.seed, self.tick))
+        self.price = self.price * np.exp(rng.normal(0, 0.005, self.universe))
+        self.turnover = np.clip(self.turnover * np.exp(rng.normal(0, 0.05, self.universe)), 0.001, 5)
+        # Keep a week of five-minute ticks for the percent_change fields
+        self.history = (self.history + [self.price.copy()])[-2017:]
+
+    def _change(self, ticks_back):
+        past = self.history[max(0, len(self.history) - 1 - ticks_back)]
+        return (self.price / past - 1) * 100
+
+    def listings(self, start=1, limit=100):
+        """A listings/latest payload ranked by market cap"""
+        market_cap = self.price * self.supply
+        order = np.argsort(-market_cap)[start - 1:start - 1 + limit]
+        changes = {'1h': self._change(12), '24h': self._change(288), '7d': self._change(2016)}
+        last_updated = datetime.utcnow().isoformat() + 'Z'
+
+        data = []
+        for rank, index in enumerate(order, start=start):
+            data.append({
+                'id': int(self.ids[index]),
+                'name': self.names[index],
+                'symbol': self.symbols[index],
+                'slug': self.slugs[index],
+                'cmc_rank': rank,
+                'date_added': self.date_added,
+                'circulating_supply': float(self.supply[index]),
+                'total_supply': float(self.supply[index]),
+                'max_supply': None if np.isnan(self.max_supply[index]) else float(self.max_supply[index]),
+                'last_updated': last_updated,
+                'quote': {'USD': {
+                    'price': float(self.price[index]),
+                    'volume_24h': float(market_cap[index] * self.turnover[index]),
+                    'market_cap': float(market_cap[index]),
+                    'percent_change_1h': float(changes['1h'][index]),
+                    'percent_change_24h': float(changes['24h'][index]),
+                    'percent_change_7d': float(changes['7d'][index]),
+                    'last_updated': last_updated
+                }}
+            })
+        return {'status': _status(), 'data': data}
+
+
+    def historical(self, cmc_id, time_start, time_end, interval_seconds, count):
+        """Quotes at every interval boundary in ``[time_start, time_end]``.
+
+        Each sample is a pure function of token and time, so any split of
+        a range into requests returns the same series.
+        """
+        matches = np.flatnonzero(self.ids == cmc_id)
+        if not len(matches):
+            return None
+        index = int(matches[0])
+        epoch = datetime(1970, 1, 1)
+        first = -(-int((time_start - epoch).total_seconds()) // interval_seconds)
+        last = int((time_end - epoch).total_seconds()) // interval_seconds
+        buckets = np.arange(first, min(last + 1, first + count))
+        seconds = buckets * interval_seconds
+        phase = (cmc_id * 0.618) % 1 * 2 * np.pi
+        wave = np.sin(seconds / 86400 * 2 * np.pi + phase)
+        jitter = np.sin(seconds * 12.9898 + cmc_id * 78.233) * 0.01
+        price = self.history[0][index] * np.exp(0.05 * wave + jitter)
+        market_cap = price * self.supply[index]
+        volume = market_cap * self.turnover[index] * (1 + 0.3 * wave)
+
+        quotes = []
+        for position, second in enumerate(seconds.tolist()):
+            timestamp = (epoch + timedelta(seconds=second)).isoformat() + 'Z'
+            quotes.append({
+                'timestamp': timestamp,
+                'quote': {'USD': {
+                    'price': float(price[position]),
+                    'volume_24h': float(volume[position]),
+                    'market_cap': float(market_cap[position]),
+                    'circulating_supply': float(self.supply[index]),
+                    'total_supply': float(self.supply[index]),
+                    'timestamp': timestamp
+                }}
+            })
+        return {
+            'id': cmc_id,
+            'name': self.names[index],
+            'symbol': self.symbols[index],
+            'is_active': 1,
+            'quotes': quotes
+        }
+
+
+    def info(self, cmc_ids):
+        """``/cryptocurrency/info`` entries keyed by id string; unknown ids are left out"""
+        positions = {int(cmc_id): index for index, cmc_id in enumerate(self.ids)}
+        data = {}
+        for cmc_id in cmc_ids:
+            index = positions.get(cmc_id)
+            if index is None:
+                continue
+            slug = self.slugs[index]
+            data[str(cmc_id)] = {
+                'id': cmc_id,
+                'name': self.names[index],
+                'symbol': self.symbols[index],
+                'slug': slug,
+                'description': f'{self.names[index]} is a synthetic token of the CMC stub.',
+                'logo': f'https://s2.coinmarketcap.com/static/img/coins/64x64/{cmc_id}.png',
+                'twitter_username': slug.replace('-', ''),
+                'urls': {
+                    'website': [f'https://{slug}.example.org/'],
+                    'twitter': [f"https://twitter.com/{slug.replace('-', '')}"],
+                    'reddit': [f'https://reddit.com/r/{slug}'],
+                    'source_code': [f'https://github.com/{slug}/{slug}'],
+                    'technical_doc': [f'https://{slug}.example.org/whitepaper.pdf']
+                }
+            }
+        return data
+
+
+class RecordedPayloads:
+    """Replays listings payloads from a JSON-lines file, one per tick, looping"""
+
+    def __init__(self, path):
+        with open(path) as payload_file:
+            self.payloads = [json.loads(line) for line in payload_file if line.strip()]
+        if not self.payloads:
+            raise ValueError(f"no payloads in {path}")
+        self.tick = 0
+
+    def advance(self):
+        self.tick += 1
+
+    def listings(self, start=1, limit=100):
+        payload = self.payloads[(self.tick - 1) % len(self.payloads)]
+        return dict(payload, data=payload['data'][start - 1:start - 1 + limit])
+
+
+class FaultPlan:
+    """Deterministic latency, random errors and 429 bursts per request number"""
+
+    def __init__(self, latency_ms=0, error_rate=0.0, burst_every=0, burst_length=0, seed=0):
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.seed = seed
+
+    def fault(self, request_number):
+        """``(http_status, error_code, message)`` for a failing request, else None"""
+        if self.burst_every and request_number % self.burst_every < self.burst_length and request_number >= self.burst_every:
+            return 429, 1008, "You've exceeded your API Key's HTTP request rate limit."
+        if self.error_rate and np.random.default_rng((self.seed, request_number, 1)).random() < self.error_rate:
+            return 500, 500, 'An internal server error occurred.'
+        return None
+
+
+def create_stub_app(market, faults=None):
+    """Flask app serving ``market`` behind the CoinMarketCap URL layout"""
+    app = Flask(__name__)
+    faults = faults or FaultPlan()
+    lock = threading.Lock()
+    counters = {'requests': 0, 'served': 0, 'faults': 0}
+    app.config['STUB_COUNTERS'] = counters
+
+    def guarded(view):
+        def wrapper():
+            with lock:
+                counters['requests'] += 1
+                number = counters['requests']
+            if faults.latency:
+                time.sleep(faults.latency)
+            fault = faults.fault(number)
+            if fault:
+                with lock:
+                    counters['faults'] += 1
+                http_status, error_code, message = fault
+                return jsonify({'status': _status(error_code, message)}), http_status
+            return view()
+        wrapper.__name__ = view.__name__
+        return wrapper
+
+    @app.route('/v1/cryptocurrency/listings/latest')
+    @guarded
+    def listings_latest():
+        start = request.args.get('start', 1, type=int)
+        limit = request.args.get('limit', 100, type=int)
+        with lock:
+            market.advance()
+            payload = market.listings(start, limit)
+            counters['served'] += 1
+        return jsonify(payload)
+
+    @app.route('/v1/cryptocurrency/quotes/historical')
+    @guarded
+    def quotes_historical():
+        interval = request.args.get('interval', '5m')
+        if not hasattr(market, 'historical') or interval not in HISTORICAL_INTERVALS:
+            return jsonify({'status': _status(400, 'Unsupported historical request')}), 400
+        parse = lambda value: datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+        data = market.historical(
+            request.args.get('id', type=int),
+            parse(request.args['time_start']),
+            parse(request.args['time_end']),
+            HISTORICAL_INTERVALS[interval],
+            request.args.get('count', 10000, type=int)
+        )
+        if data is None:
+            return jsonify({'status': _status(400, 'Invalid value for "id"')}), 400
+        with lock:
+            counters['served'] += 1
+        return jsonify({'status': _status(), 'data': data})
+
+    @app.route('/v1/cryptocurrency/info')
+    @guarded
+    def cryptocurrency_info():
+        if not hasattr(market, 'info'):
+            return jsonify({'status': _status(400, 'Unsupported info request')}), 400
+        cmc_ids = [int(value) for value in request.args.get('id', '').split(',') if value.strip()]
+        data = market.info(cmc_ids)
+        missing = [str(cmc_id) for cmc_id in cmc_ids if str(cmc_id) not in data]
+        if missing and request.args.get('skip_invalid') != 'true':
+            return jsonify({'status': _status(400, f'Invalid value for "id": "{missing[0]}"')}), 400
+        with lock:
+            counters['served'] += 1
+        return jsonify({'status': _status(), 'data': data})
+
+    @app.route('/v1/tools/price-conversion')
+    @guarded
+    def price_conversion():
+        symbols = [s for s in request.args.get('convert', '').split(',') if s in FIAT_RATES]
+        return jsonify({
+            'status': _status(),
+            'data': {
+                'symbol': request.args.get('symbol', 'USD'),
+                'amount': request.args.get('amount', 1, type=float),
+                'quote': {symbol: {'price': FIAT_RATES[symbol]} for symbol in symbols}
+            }
+        })
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--universe', type=int, default=100, help='number of synthetic tokens')
+    parser.add_argument('--payloads', help='JSON-lines file of recorded listings payloads')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests answered with 500')
+    parser.add_argument('--burst-every', type=int, default=0, help='start a 429 burst every N requests')
+    parser.add_argument('--burst-length', type=int, default=0, help='requests per 429 burst')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    market = RecordedPayloads(args.payloads) if args.payloads else SyntheticMarket(args.universe, args.seed)
+    faults = FaultPlan(args.latency_ms, args.error_rate, args.burst_every, args.burst_length, args.seed)
+    create_stub_app(market, faults).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Show that simultaneous identical reads share one database execution.
+
+Seeds a SQLite database, then releases ``--callers`` threads at once
+against ``GET /api/v1/tokens?limit=20`` and against
+``DataService.get_market_overview`` (the ``subscribe_market`` snapshot).
+Every SQL statement is delayed by ``--delay`` ms to stand in for a loaded
+database, so that all callers overlap the leader's execution. The script
+counts the statements executed for the burst and compares them with a
+single uncontended call. It exits non-zero if the burst ran more than one
+caller's worth of SQL.
+
+Usage:
+    python benchmarks/coalescing_benchmark.py --callers 50 --delay 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from src.app import create_app
+from src.models.token import db, Token, TokenMetric
+from src.services.container import get_services
+from src.utils.metrics import SINGLE_FLIGHT_CALLS
+
+TOKENS = 200
+
+
+class StatementCounter:
+    """Counts (and optionally slows down) every statement on an engine"""
+
+    def __init__(self, engine, delay):
+        self.count = 0
+        self.delay = delay
+        self._lock = threading.Lock()
+        event.listen(engine, 'before_cursor_execute', self._before)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.count += 1
+        time.sleep(self.delay)
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+
+
+def seed():
+    now = datetime.utcnow()
+    db.session.execute(Token.__table__.insert(), [
+        {'cmc_id': 1000 + i, 'name': f'Token {i}', 'symbol': f'TK{i}', 'slug': f'token-{i}',
+         'is_active': True, 'created_at': now, 'updated_at': now}
+        for i in range(TOKENS)
+    ])
+    db.session.execute(TokenMetric.__table__.insert(), [
+        {'token_id': token_id, 'timestamp': now, 'price_usd': token_id, 'market_cap_usd': token_id * 1e6,
+         'volume_24h_usd': token_id * 1e5, 'velocity': 0.1, 'created_at': now}
+        for token_id in range(1, TOKENS + 1)
+    ])
+    db.session.commit()
+
+
+def burst(callers, call):
+    """Run ``call`` from ``callers`` threads released together; returns their results"""
+    barrier = threading.Barrier(callers)
+    results = [None] * callers
+
+    def worker(index):
+        barrier.wait()
+        results[index] = call()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def flight_counts(operation):
+    return tuple(
+        SINGLE_FLIGHT_CALLS.labels(operation=operation, role=role)._value.get()
+        for role in ('leader', 'follower')
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--callers', type=int, default=50)
+    parser.add_argument('--delay', type=float, default=20, help='added latency per SQL statement, ms')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='tms-coalesce-')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'coalesce.db')}",
+        'SOCKETIO_ASYNC_MODE': 'threading',
+        'INGEST_ENABLED': False,
+        'TESTING': True
+    })
+    with app.app_context():
+        seed()
+        counter = StatementCounter(db.engine, args.delay / 1000)
+
+    def list_tokens():
+        response = app.test_client().get('/api/v1/tokens?limit=20', headers={'X-API-Key': 'coalesce-benchmark'})
+        assert response.status_code == 200, response.status_code
+        return response.get_json()['data']
+
+    def market_overview():
+        with app.app_context():
+            overview = get_services(app).data_service.get_market_overview()
+        return {key: value for key, value in overview.items() if key != 'timestamp'}
+
+    failed = False
+    print(f"{'operation':<16} {'callers':>7} {'single SQL':>10} {'burst SQL':>9} {'leaders':>7} {'followers':>9} {'seconds':>8}")
+    for operation, call in (('list_tokens', list_tokens), ('market_overview', market_overview)):
+        counter.reset()
+        expected = call()
+        single = counter.count
+
+        counter.reset()
+        before = flight_counts(operation)
+        started = time.perf_counter()
+        results = burst(args.callers, call)
+        elapsed = time.perf_counter() - started
+        leaders, followers = (after - earlier for after, earlier in zip(flight_counts(operation), before))
+
+        assert all(result == expected for result in results), operation
+        failed = failed or counter.count > single
+        print(f"{operation:<16} {args.callers:>7} {single:>10} {counter.count:>9} "
+              f"{leaders:>7.0f} {followers:>9.0f} {elapsed:>8.2f}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Compare history and velocity-window reads from SQL and from the column store.
+
+Replays ``--ticks`` ingest ticks against the CMC stub from ``cmc_stub.py``
+into a fresh SQLite database with ``COLUMN_STORE_DIR`` set, so every
+committed tick is also appended to the store. Then it:
+
+- checks the store against ``token_metrics`` row for row
+- reads each token's full history at every interval through SQL and
+  through the store, asserting the same timestamps and quotes
+- computes every velocity window for each token both ways, asserting the
+  same averages
+- rebuilds the store from SQL and reports the time it takes
+
+Usage:
+    python benchmarks/column_store_benchmark.py --universe 100 --ticks 2016
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sqlalchemy import func, select
+from cmc_stub import FaultPlan, SyntheticMarket
+from ingest_replay import SimulatedClock, start_stub
+from src.app import create_app
+from src.models.token import db, TokenMetric
+from src.services.column_store import STORE_COLUMNS
+from src.services.container import get_services
+from src.services.data_service import DataService
+
+WINDOWS = ({'hours': 1}, {'hours': 4}, {'hours': 12}, {'days': 7})
+
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--universe', type=int, default=100)
+    parser.add_argument('--ticks', type=int, default=2016, help='five-minute ingest ticks (2016 = one week)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    os.environ['CMC_BASE_URL'] = start_stub(SyntheticMarket(args.universe, args.seed), FaultPlan())
+    os.environ['CMC_LISTINGS_LIMIT'] = str(args.universe)
+    directory = tempfile.mkdtemp(prefix='tms-columns-')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'columns.db')}",
+        'SOCKETIO_ASYNC_MODE': 'threading',
+        'INGEST_ENABLED': False,
+        'TESTING': True,
+        'COLUMN_STORE_DIR': os.path.join(directory, 'columns')
+    })
+
+    tick = timedelta(minutes=5)
+    clock = SimulatedClock(datetime(2025, 6, 20) - tick * args.ticks)
+    with app.app_context():
+        column_store = get_services().column_store
+        # The store is complete from the first tick: the table starts empty
+        assert column_store.complete
+        stored = DataService(clock=clock, column_store=column_store)
+        plain = DataService(clock=clock)
+
+        started = time.perf_counter()
+        for _ in range(args.ticks):
+            clock.advance(tick)
+            stored.update_token_data()
+        ingest_seconds = time.perf_counter() - started
+        rows = db.session.query(func.count(TokenMetric.id)).scalar()
+        problems = column_store.check()
+        assert not problems, problems[:5]
+        print(f"ingested {args.ticks} ticks, {rows} rows in {ingest_seconds:.1f}s with appends; store matches SQL")
+
+        token_ids = db.session.execute(select(TokenMetric.token_id).distinct()).scalars().all()
+        time_start, time_end = clock() - tick * args.ticks, clock()
+
+        print(f"{'read':>12} {'calls':>6} {'sql ms':>9} {'store ms':>9} {'speedup':>8}")
+        for interval in DataService.HISTORY_INTERVALS:
+            sql_seconds = store_seconds = 0.0
+            for token_id in token_ids:
+                expected, seconds = timed(plain.get_token_history, token_id, time_start, time_end, interval)
+                sql_seconds += seconds
+                actual, seconds = timed(stored.get_token_history, token_id, time_start, time_end, interval)
+                store_seconds += seconds
+                assert actual == expected, (token_id, interval)
+            print(f"{'history ' + interval:>12} {len(token_ids):>6} {sql_seconds * 1000:>9.1f} "
+                  f"{store_seconds * 1000:>9.1f} {sql_seconds / store_seconds:>7.1f}x")
+
+        diff = 0.0
+        for window in WINDOWS:
+            sql_seconds = store_seconds = 0.0
+            for token_id in token_ids:
+                expected, seconds = timed(plain._calculate_historical_velocity, token_id, **window)
+                sql_seconds += seconds
+                actual, seconds = timed(stored._calculate_historical_velocity, token_id, **window)
+                store_seconds += seconds
+                assert (expected is None) == (actual is None), (token_id, window, expected, actual)
+                if expected is not None:
+                    diff = max(diff, abs(expected - actual))
+            label = 'velocity ' + ''.join(f'{value}{unit[0]}' for unit, value in window.items())
+            print(f"{label:>12} {len(token_ids):>6} {sql_seconds * 1000:>9.1f} "
+                  f"{store_seconds * 1000:>9.1f} {sql_seconds / store_seconds:>7.1f}x")
+        assert diff < 1e-6, diff
+        print(f"velocity windows agree (max |diff| {diff:.1e})")
+
+        written, seconds = timed(column_store.rebuild)
+        size = sum(
+            os.path.getsize(os.path.join(column_store.root, str(token_id), f'{column}.f64'))
+            for token_id in token_ids for column in STORE_COLUMNS
+        )
+        assert sum(written.values()) == rows and not column_store.check()
+        print(f"rebuilt {len(written)} tokens, {rows} rows in {seconds:.2f}s; "
+              f"{size / 1e6:.1f} MB of value columns ({np.float64().itemsize} bytes per value)")
+
+
+if __name__ == '__main__':
+    main()
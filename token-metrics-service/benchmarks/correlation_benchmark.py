@@ -0,0 +1,156 @@
+"""Time universe-wide correlation and beta against a per-token baseline.
+
+For each ``--tokens`` size, seeds a SQLite database with hourly samples
+over the 7d window. Prices follow a one-factor model around a benchmark
+token (id 1) with known betas, and some samples are dropped at random.
+The script then times:
+
+- ``CorrelationSet.load``: one aggregate query plus the matrix products,
+  the cost paid once per window per ingest tick
+- a cached ``CorrelationCache.get`` plus the slicing a request does
+- the baseline: load each token's history through the ORM and correlate
+  every pair in a Python loop, for up to ``--naive-max`` tokens
+
+The vectorized coefficients must match the pairwise loop, and the
+recovered betas must track the seeded ones.
+
+Usage:
+    python benchmarks/correlation_benchmark.py --tokens 100 1000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.app import create_app
+from src.models.token import db, Token, TokenMetric
+from src.services.correlation import CORRELATION_WINDOWS, CorrelationCache, CorrelationSet, betas
+
+WINDOW = '7d'
+DROP_RATE = 0.05
+
+
+def seed(tokens):
+    """Seed hourly samples; returns the true beta of each token id"""
+    span, _ = CORRELATION_WINDOWS[WINDOW]
+    hours = int(span.total_seconds() // 3600)
+    end = datetime(2025, 6, 20)
+    now = datetime.utcnow()
+    db.session.execute(Token.__table__.insert(), [
+        {'cmc_id': 1 + i, 'name': f'Token {i}', 'symbol': 'BTC' if i == 0 else f'TK{i}',
+         'slug': f'token-{i}', 'is_active': True, 'created_at': now, 'updated_at': now}
+        for i in range(tokens)
+    ])
+
+    market = np.cumsum(np.random.normal(0, 0.01, hours + 1))
+    true_betas = {1: 1.0}
+    rows = []
+    for token_id in range(1, tokens + 1):
+        beta = 1.0 if token_id == 1 else random.uniform(0.2, 2.5)
+        true_betas[token_id] = beta
+        noise = 0.0 if token_id == 1 else 0.004
+        log_price = np.log(random.uniform(0.1, 1000)) + beta * market + np.cumsum(np.random.normal(0, noise, hours + 1))
+        velocity = np.abs(0.3 + 0.1 * beta * market + np.random.normal(0, 0.02, hours + 1))
+        for hour in range(hours + 1):
+            if token_id != 1 and random.random() < DROP_RATE:
+                continue
+            rows.append({
+                'token_id': token_id,
+                'timestamp': end - timedelta(hours=hours - hour, minutes=30),
+                'price_usd': float(np.exp(log_price[hour])),
+                'velocity': float(velocity[hour]),
+                'created_at': now
+            })
+    db.session.execute(TokenMetric.__table__.insert(), rows)
+    db.session.commit()
+    return true_betas, len(rows)
+
+
+def naive(token_ids, time_start, bucket_seconds):
+    """Per-token ORM history averaged per bucket, then one correlation per pair"""
+    series = {}
+    for token_id in token_ids:
+        metrics = TokenMetric.query.filter(
+            TokenMetric.token_id == token_id, TokenMetric.timestamp > time_start
+        ).order_by(TokenMetric.timestamp).all()
+        buckets = {}
+        for metric in metrics:
+            seconds = int((metric.timestamp - datetime(1970, 1, 1)).total_seconds())
+            buckets.setdefault(seconds // bucket_seconds, []).append(float(metric.price_usd))
+        buckets = {key: np.mean(prices) for key, prices in buckets.items()}
+        keys = sorted(buckets)
+        series[token_id] = {
+            key: np.log(buckets[key]) - np.log(buckets[key - 1]) for key in keys if key - 1 in buckets
+        }
+    matrix = np.full((len(token_ids), len(token_ids)), np.nan)
+    for i, a in enumerate(token_ids):
+        for j, b in enumerate(token_ids):
+            shared = sorted(series[a].keys() & series[b].keys())
+            if len(shared) >= 3:
+                x = np.array([series[a][key] for key in shared])
+                y = np.array([series[b][key] for key in shared])
+                matrix[i, j] = np.mean((x - x.mean()) * (y - y.mean())) / (x.std() * y.std())
+    return matrix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tokens', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--naive-max', type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'tokens':>6} {'rows':>8} {'build ms':>9} {'cached ms':>9} {'naive ms':>9} {'max |diff|':>10} {'beta err':>8}")
+    for size in args.tokens:
+        random.seed(size)
+        np.random.seed(size)
+        directory = tempfile.mkdtemp(prefix='tms-correlation-')
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'correlation.db')}",
+            'SOCKETIO_ASYNC_MODE': 'threading',
+            'INGEST_ENABLED': False,
+            'TESTING': True
+        })
+        with app.app_context():
+            true_betas, rows = seed(size)
+
+            started = time.perf_counter()
+            correlations = CorrelationSet.load(WINDOW)
+            build_ms = (time.perf_counter() - started) * 1000
+
+            cache = CorrelationCache()
+            cache.get(WINDOW)
+            started = time.perf_counter()
+            for _ in range(20):
+                cached = cache.get(WINDOW)
+                positions = np.arange(min(size, 100))
+                cached.matrices['price'][np.ix_(positions, positions)].tolist()
+                betas(cached.returns['price'], cached.positions[1])[positions]
+            cached_ms = (time.perf_counter() - started) * 1000 / 20
+
+            estimated = betas(correlations.returns['price'], correlations.positions[1])
+            beta_error = np.nanmean(np.abs(
+                estimated - np.array([true_betas[token_id] for token_id in correlations.token_ids])
+            ))
+
+            naive_ms, diff = float('nan'), float('nan')
+            if size <= args.naive_max:
+                bucket_seconds = int(CORRELATION_WINDOWS[WINDOW][1].total_seconds())
+                started = time.perf_counter()
+                expected = naive(correlations.token_ids, correlations.time_start, bucket_seconds)
+                naive_ms = (time.perf_counter() - started) * 1000
+                diff = np.nanmax(np.abs(expected - correlations.matrices['price']))
+                assert np.array_equal(np.isnan(expected), np.isnan(correlations.matrices['price']))
+                assert diff < 1e-6, diff
+
+        print(f"{size:>6} {rows:>8} {build_ms:>9.1f} {cached_ms:>9.3f} {naive_ms:>9.1f} {diff:>10.2e} {beta_error:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
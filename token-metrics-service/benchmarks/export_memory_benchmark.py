@@ -0,0 +1,116 @@
+"""Check that streaming exports use flat memory regardless of range size.
+
+Seeds SQLite databases of increasing size, streams the full range through
+``/api/v1/tokens/export`` for each format, and records the tracemalloc peak
+while the body is consumed. Exits non-zero if the peak for the largest
+database exceeds the smallest by more than ``--tolerance``.
+
+Usage:
+    python benchmarks/export_memory_benchmark.py --rows 20000 200000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.app import create_app
+from src.models.token import db, Token, TokenMetric
+from src.services.export import pa
+
+TOKENS = 50
+INSERT_BATCH = 10000
+
+
+def seed(rows):
+    now = datetime.utcnow().replace(microsecond=0)
+    db.session.execute(Token.__table__.insert(), [
+        {'cmc_id': 1000 + i, 'name': f'Token {i}', 'symbol': f'TK{i}', 'slug': f'token-{i}',
+         'is_active': True, 'created_at': now, 'updated_at': now}
+        for i in range(TOKENS)
+    ])
+    per_token = rows // TOKENS
+    batch = []
+    for token_id in range(1, TOKENS + 1):
+        for step in range(per_token):
+            batch.append({
+                'token_id': token_id,
+                'timestamp': now - timedelta(minutes=5 * step),
+                'price_usd': random.uniform(0.01, 50000),
+                'market_cap_usd': random.uniform(1e6, 1e12),
+                'volume_24h_usd': random.uniform(1e5, 1e10),
+                'percent_change_24h': random.uniform(-20, 20),
+                'velocity': random.uniform(0, 2),
+                'created_at': now
+            })
+            if len(batch) == INSERT_BATCH:
+                db.session.execute(TokenMetric.__table__.insert(), batch)
+                batch = []
+    if batch:
+        db.session.execute(TokenMetric.__table__.insert(), batch)
+    db.session.commit()
+    return per_token * TOKENS
+
+
+def measure(app, export_format):
+    """Stream one export and return (bytes, seconds, peak traced bytes)"""
+    client = app.test_client()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    response = client.get(
+        f'/api/v1/tokens/export?format={export_format}&time_start=2000-01-01',
+        headers={'X-API-Key': 'export-benchmark'}, buffered=False
+    )
+    assert response.status_code == 200, response.status_code
+    size = 0
+    for data in response.response:
+        size += len(data)
+    response.close()
+    elapsed = time.perf_counter() - started
+    return size, elapsed, tracemalloc.get_traced_memory()[1] - baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[20000, 200000])
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='allowed ratio between the largest and smallest peak')
+    args = parser.parse_args()
+
+    formats = ['ndjson', 'csv'] + (['parquet'] if pa is not None else [])
+    peaks = {export_format: [] for export_format in formats}
+    tracemalloc.start()
+
+    print(f"{'rows':>9} {'format':<8} {'MB out':>8} {'seconds':>8} {'peak KB':>9}")
+    for rows in sorted(args.rows):
+        directory = tempfile.mkdtemp(prefix='tms-export-')
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'export.db')}",
+            'SOCKETIO_ASYNC_MODE': 'threading',
+            'INGEST_ENABLED': False,
+            'TESTING': True
+        })
+        with app.app_context():
+            seeded = seed(rows)
+        for export_format in formats:
+            size, elapsed, peak = measure(app, export_format)
+            peaks[export_format].append(peak)
+            print(f"{seeded:>9} {export_format:<8} {size / 1e6:>8.2f} {elapsed:>8.2f} {peak / 1024:>9.0f}")
+
+    failed = False
+    for export_format, values in peaks.items():
+        ratio = values[-1] / values[0]
+        status = 'ok' if ratio <= args.tolerance else 'FAIL'
+        failed = failed or ratio > args.tolerance
+        print(f"{export_format:<8} peak ratio largest/smallest {ratio:.2f} {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
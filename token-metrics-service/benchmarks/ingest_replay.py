@@ -0,0 +1,184 @@
+"""Replay days of ingest ticks in accelerated time against the CMC stub.
+
+Runs ``DataService.update_token_data`` once per simulated tick with a
+simulated clock, so ``--days`` of five-minute ticks complete as fast as the
+ingester allows. Upstream is the deterministic stub from ``cmc_stub.py``
+(started in-process unless ``--upstream`` points elsewhere). Reports ingest
+throughput, per-stage time, velocity-window query cost and database growth
+per simulated day.
+
+Usage:
+    python benchmarks/ingest_replay.py --days 2 --universe 100 --report ingest.json
+    python benchmarks/ingest_replay.py --days 1 --error-rate 0.02 --burst-every 40 --burst-length 3
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from flask import Flask
+from prometheus_client import REGISTRY
+from sqlalchemy import func
+from werkzeug.serving import make_server
+from cmc_stub import FaultPlan, RecordedPayloads, SyntheticMarket, create_stub_app
+from src.models.token import db, TokenMetric
+from src.services.data_service import DataService
+
+STAGES = ('fetch', 'validate', 'process', 'commit', 'rates')
+
+
+class SimulatedClock:
+    def __init__(self, start):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, delta):
+        self.now += delta
+
+
+def start_stub(market, faults):
+    server = make_server('127.0.0.1', 0, create_stub_app(market, faults), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/v1"
+
+
+def stage_seconds():
+    return {
+        stage: REGISTRY.get_sample_value('tms_ingest_stage_duration_seconds_sum', {'stage': stage}) or 0.0
+        for stage in STAGES
+    }
+
+
+def timed_velocity_windows(data_service):
+    """Wrap the historical velocity query so its cumulative cost is recorded"""
+    spent = {'seconds': 0.0, 'calls': 0}
+    calculate = data_service._calculate_historical_velocity
+
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return calculate(*args, **kwargs)
+        finally:
+            spent['seconds'] += time.perf_counter() - started
+            spent['calls'] += 1
+
+    data_service._calculate_historical_velocity = wrapper
+    return spent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=float, default=1)
+    parser.add_argument('--tick-minutes', type=float, default=5)
+    parser.add_argument('--universe', type=int, default=100, help='synthetic tokens served by the stub')
+    parser.add_argument('--limit', type=int, default=100, help='listings per tick (CMC_LISTINGS_LIMIT)')
+    parser.add_argument('--payloads', help='replay recorded listings payloads instead of the synthetic market')
+    parser.add_argument('--upstream', help='use an already running upstream instead of the in-process stub')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--burst-every', type=int, default=0)
+    parser.add_argument('--burst-length', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--database', help='SQLite file to ingest into (default: fresh temporary file)')
+    parser.add_argument('--report', help='write the JSON report to this path')
+    parser.add_argument('--verbose', action='store_true', help='show ingester error logs')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    if args.upstream:
+        base_url = args.upstream
+    else:
+        market = RecordedPayloads(args.payloads) if args.payloads else SyntheticMarket(args.universe, args.seed)
+        faults = FaultPlan(args.latency_ms, args.error_rate, args.burst_every, args.burst_length, args.seed)
+        base_url = start_stub(market, faults)
+    os.environ['CMC_BASE_URL'] = base_url
+    os.environ['CMC_LISTINGS_LIMIT'] = str(args.limit)
+
+    database_path = os.path.abspath(args.database) if args.database else \
+        os.path.join(tempfile.mkdtemp(prefix='tms-replay-'), 'replay.db')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{database_path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    tick = timedelta(minutes=args.tick_minutes)
+    ticks = int(args.days * 24 * 60 / args.tick_minutes)
+    ticks_per_day = int(24 * 60 / args.tick_minutes)
+    clock = SimulatedClock(datetime.utcnow() - tick * ticks)
+    data_service = DataService(clock=clock)
+    velocity = timed_velocity_windows(data_service)
+
+    days = []
+    with app.app_context():
+        db.create_all()
+        rows = db.session.query(func.count(TokenMetric.id)).scalar()
+        day = None
+        for number in range(ticks):
+            if day is None:
+                day = {'durations': [], 'failed': 0, 'rows_before': rows,
+                       'stages_before': stage_seconds(), 'velocity_before': dict(velocity)}
+
+            clock.advance(tick)
+            started = time.perf_counter()
+            data_service.update_token_data()
+            day['durations'].append(time.perf_counter() - started)
+
+            # update_token_data swallows upstream failures; a tick that adds no rows failed
+            current = db.session.query(func.count(TokenMetric.id)).scalar()
+            if current == rows:
+                day['failed'] += 1
+            rows = current
+
+            if (number + 1) % ticks_per_day == 0 or number + 1 == ticks:
+                durations = np.array(day['durations'])
+                stages = stage_seconds()
+                days.append({
+                    'day': len(days) + 1,
+                    'ticks': len(durations),
+                    'failed_ticks': day['failed'],
+                    'rows_added': rows - day['rows_before'],
+                    'total_rows': rows,
+                    'db_bytes': os.path.getsize(database_path),
+                    'ingest_seconds': round(float(durations.sum()), 3),
+                    'ticks_per_second': round(len(durations) / durations.sum(), 2),
+                    'rows_per_second': round((rows - day['rows_before']) / durations.sum(), 1),
+                    'tick_p50_ms': round(float(np.percentile(durations, 50)) * 1000, 2),
+                    'tick_p95_ms': round(float(np.percentile(durations, 95)) * 1000, 2),
+                    'stage_seconds': {
+                        stage: round(stages[stage] - day['stages_before'][stage], 3) for stage in STAGES
+                    },
+                    'velocity_window_seconds': round(velocity['seconds'] - day['velocity_before']['seconds'], 3),
+                    'velocity_window_queries': velocity['calls'] - day['velocity_before']['calls']
+                })
+                day = None
+
+    print(f"{'day':>4} {'ticks':>6} {'failed':>6} {'rows':>9} {'db MB':>8} {'ticks/s':>8} "
+          f"{'p95 ms':>8} {'velocity s':>10} {'process s':>9}")
+    for summary in days:
+        print(f"{summary['day']:>4} {summary['ticks']:>6} {summary['failed_ticks']:>6} {summary['total_rows']:>9} "
+              f"{summary['db_bytes'] / 1e6:>8.2f} {summary['ticks_per_second']:>8} {summary['tick_p95_ms']:>8} "
+              f"{summary['velocity_window_seconds']:>10} {summary['stage_seconds']['process']:>9}")
+
+    if args.report:
+        with open(args.report, 'w') as report_file:
+            json.dump({
+                'config': {key: value for key, value in vars(args).items() if key not in ('report', 'verbose')},
+                'database': database_path,
+                'days': days
+            }, report_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
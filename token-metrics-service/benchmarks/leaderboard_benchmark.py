@@ -0,0 +1,101 @@
+"""Time per-tick leaderboard ranking and top-N reads over a synthetic market.
+
+Advances the synthetic market from ``cmc_stub.py`` for ``--ticks`` ticks
+and builds a ``MarketSnapshot`` from each listings payload, the way the
+ingest loop does, keeping ``--listed`` of the ``--universe`` tokens so
+some tokens enter and leave between ticks. For every snapshot it:
+
+- ranks every board (``Leaderboards.update``), and for comparison
+  fully sorts each board's qualifying tokens as a per-request sort would
+- checks that each board is the head of that full sort
+- times top ``--limit`` reads of every board, the cost of a
+  ``/market/movers`` request apart from serialization
+
+Usage:
+    python benchmarks/leaderboard_benchmark.py --universe 20000 --listed 19000 --ticks 50
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from cmc_stub import SyntheticMarket
+from src.services.leaderboards import BOARDS, MAX_MOVERS_LIMIT, Leaderboards
+from src.services.screener import SNAPSHOT_QUOTE_FIELDS, MarketSnapshot
+
+
+def snapshot_rows(market, listed, rng):
+    """``MarketSnapshot`` rows for a random subset of the listings"""
+    # Snapshots list tokens by id, as the latest-quote query returns them
+    listings = sorted(market.listings(1, market.universe)['data'], key=lambda entry: entry['id'])
+    keep = np.sort(rng.permutation(len(listings))[:listed])
+    now = datetime.utcnow()
+    rows = []
+    for index in keep.tolist():
+        entry = listings[index]
+        quote = dict(entry['quote']['USD'], circulating_supply=entry['circulating_supply'],
+                     total_supply=entry['total_supply'], max_supply=entry['max_supply'])
+        rows.append(
+            (entry['id'], entry['id'], entry['name'], entry['symbol'], entry['slug'])
+            + tuple(quote.get(field) for field in SNAPSHOT_QUOTE_FIELDS)
+            + (now,)
+        )
+    return rows
+
+
+def full_sort(snapshot, metric, descending, qualify):
+    """Every qualifying position, ordered by value then token id"""
+    values = snapshot.columns[metric]
+    with np.errstate(invalid='ignore'):
+        mask = {'positive': values > 0, 'negative': values < 0, 'present': ~np.isnan(values)}[qualify]
+    positions = np.flatnonzero(mask)
+    keys = -values[positions] if descending else values[positions]
+    return positions[np.lexsort((snapshot.ids[positions], keys))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--universe', type=int, default=20000)
+    parser.add_argument('--listed', type=int, default=19000, help='tokens in each snapshot')
+    parser.add_argument('--ticks', type=int, default=50)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    market = SyntheticMarket(args.universe, args.seed)
+    leaderboards = Leaderboards()
+    ranking, sorting, reads = [], [], []
+    for tick in range(args.ticks):
+        market.advance()
+        snapshot = MarketSnapshot(snapshot_rows(market, min(args.listed, args.universe), rng))
+
+        started = time.perf_counter()
+        boards = leaderboards.update(snapshot)
+        ranking.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        expected = {board: full_sort(snapshot, *BOARDS[board]) for board in BOARDS}
+        sorting.append(time.perf_counter() - started)
+
+        for board in BOARDS:
+            assert np.array_equal(boards[board], expected[board][:MAX_MOVERS_LIMIT]), (tick, board)
+
+        started = time.perf_counter()
+        for board in BOARDS:
+            leaderboards.top(snapshot, board, args.limit)
+        reads.append(time.perf_counter() - started)
+
+    ranking_ms, sorting_ms = np.array(ranking) * 1000, np.array(sorting) * 1000
+    print(f"{args.listed} of {args.universe} tokens, {len(BOARDS)} boards, {args.ticks} ticks; rankings verified")
+    print(f"all boards per tick: ranked top {MAX_MOVERS_LIMIT} p50 {np.percentile(ranking_ms, 50):.2f} ms, "
+          f"full sort p50 {np.percentile(sorting_ms, 50):.2f} ms")
+    print(f"top {args.limit} of every board: p50 {np.percentile(np.array(reads) * 1e6, 50):.1f} us")
+
+
+if __name__ == '__main__':
+    main()
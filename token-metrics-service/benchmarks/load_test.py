@@ -0,0 +1,355 @@
+"""Load-test the REST and WebSocket APIs and report latency percentiles.
+
+Seeds a SQLite database with ``--tokens`` tokens and ``--days`` of
+``token_metrics`` history, serves the API on a local port, then drives
+mixed REST traffic (list/detail/search/velocity) from ``--concurrency``
+workers while ``--subscribers`` Socket.IO clients receive ``market_update``
+broadcasts. Throughput, p50/p95/p99 latency per endpoint and broadcast
+fan-out delay are written as JSON so runs can be compared with
+``--baseline``.
+
+Usage:
+    python benchmarks/load_test.py --tokens 200 --days 7 --duration 30 \\
+        --concurrency 8 --subscribers 50 --report load.json
+    python benchmarks/load_test.py --report new.json --baseline load.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import socket
+import string
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import requests
+import socketio as socketio_client
+from src.app import create_app as create_service_app, socketio
+from src.models.token import db, Token, TokenMetric
+from src.services.container import get_services
+
+API_KEY = 'load-test-api-key'
+
+# Endpoint name -> default share of REST traffic
+DEFAULT_MIX = {'list': 50, 'detail': 25, 'search': 15, 'velocity': 10}
+
+
+def seed(tokens, days, interval_minutes):
+    """Insert ``tokens`` tokens with ``days`` of metrics at ``interval_minutes``"""
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    db.session.execute(Token.__table__.insert(), [
+        {
+            'cmc_id': 1000 + i,
+            'name': f'Token {i}',
+            'symbol': ''.join(random.choices(string.ascii_uppercase, k=4)) + str(i),
+            'slug': f'token-{i}',
+            'is_active': True,
+            'created_at': now,
+            'updated_at': now
+        }
+        for i in range(tokens)
+    ])
+
+    steps = days * 24 * 60 // interval_minutes
+    for token_id in range(1, tokens + 1):
+        price = random.uniform(0.01, 50000)
+        rows = []
+        for step in range(steps, -1, -1):
+            price *= 1 + random.gauss(0, 0.01)
+            volume = random.uniform(1e5, 1e10)
+            market_cap = price * random.uniform(1e6, 1e9)
+            rows.append({
+                'token_id': token_id,
+                'timestamp': now - timedelta(minutes=step * interval_minutes),
+                'price_usd': price,
+                'market_cap_usd': market_cap,
+                'volume_24h_usd': volume,
+                'circulating_supply': market_cap / price,
+                'percent_change_1h': random.uniform(-5, 5),
+                'percent_change_24h': random.uniform(-20, 20),
+                'percent_change_7d': random.uniform(-50, 50),
+                'velocity': volume / market_cap,
+                'velocity_1h': volume / market_cap,
+                'velocity_4h': volume / market_cap,
+                'velocity_12h': volume / market_cap,
+                'velocity_7d': volume / market_cap,
+                'data_quality_score': 0.95,
+                'created_at': now
+            })
+        db.session.execute(TokenMetric.__table__.insert(), rows)
+    db.session.commit()
+    return (steps + 1) * tokens
+
+
+def create_app(database_uri):
+    app = create_service_app({
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'SOCKETIO_ASYNC_MODE': 'threading',
+        'INGEST_ENABLED': False
+    })
+    return app, socketio
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+def summarize(latencies, duration):
+    """Count, throughput and latency percentiles in milliseconds"""
+    if not latencies:
+        return {'count': 0}
+    values = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'count': len(latencies),
+        'throughput_rps': round(len(latencies) / duration, 2),
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'max_ms': round(float(values.max()), 3)
+    }
+
+
+class RestWorker(threading.Thread):
+    def __init__(self, base_url, mix, cmc_ids, symbols, deadline):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.names = list(mix)
+        self.weights = list(mix.values())
+        self.cmc_ids = cmc_ids
+        self.symbols = symbols
+        self.deadline = deadline
+        self.latencies = {name: [] for name in mix}
+        self.errors = {name: 0 for name in mix}
+
+    def url_for(self, name):
+        if name == 'list':
+            sort = random.choice(('market_cap', 'volume_24h', 'velocity', 'name'))
+            return f"/api/v1/tokens?limit={random.choice((20, 50, 100))}&sort={sort}"
+        if name == 'detail':
+            return f"/api/v1/tokens/{random.choice(self.cmc_ids)}"
+        if name == 'search':
+            return f"/api/v1/tokens/search?q={random.choice(self.symbols)[:2]}"
+        return f"/api/v1/tokens/{random.choice(self.cmc_ids)}/velocity"
+
+    def run(self):
+        session = requests.Session()
+        session.headers['X-API-Key'] = API_KEY
+        while time.perf_counter() < self.deadline:
+            name = random.choices(self.names, self.weights)[0]
+            started = time.perf_counter()
+            try:
+                response = session.get(self.base_url + self.url_for(name), timeout=30)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            if ok:
+                self.latencies[name].append(time.perf_counter() - started)
+            else:
+                self.errors[name] += 1
+
+
+class Subscriber:
+    """Socket.IO client subscribed to a few tokens that timestamps broadcasts"""
+
+    def __init__(self, base_url, cmc_ids):
+        self.received = []
+        self.client = socketio_client.Client(reconnection=False)
+        self.client.on('market_update', self._on_market_update)
+        self.client.connect(base_url, auth={'api_key': API_KEY}, wait_timeout=30)
+        self.client.emit('subscribe_tokens', {'token_ids': random.sample(cmc_ids, min(5, len(cmc_ids)))})
+
+    def _on_market_update(self, data):
+        self.received.append((data.get('sequence'), time.perf_counter()))
+
+
+def broadcast(app, server, subscribers, count, interval):
+    """Emit ``count`` market updates and return per-delivery fan-out delays"""
+    sent = {}
+    with app.app_context():
+        services = get_services(app)
+        payload = services.leaderboards.market_update(services.screener.current(services.data_service))
+    for sequence in range(count):
+        sent[sequence] = time.perf_counter()
+        server.emit('market_update', dict(payload, sequence=sequence), namespace='/')
+        time.sleep(interval)
+
+    # Let the last broadcast drain before reading receive times
+    time.sleep(max(1.0, interval))
+    delays = []
+    for subscriber in subscribers:
+        for sequence, received_at in subscriber.received:
+            if sequence in sent:
+                delays.append(received_at - sent[sequence])
+    return delays
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    """Print p95/p99 and throughput deltas against a previous report"""
+    print(f"\ncompared with {baseline['meta'].get('git_revision')} ({baseline['meta']['started_at']})")
+    sections = dict(report['rest'], fanout=report['websocket']['fanout'])
+    previous = dict(baseline['rest'], fanout=baseline['websocket']['fanout'])
+    for name, stats in sections.items():
+        before = previous.get(name)
+        if not before or not before.get('count') or not stats.get('count'):
+            continue
+        changes = []
+        for key in ('p95_ms', 'p99_ms', 'throughput_rps'):
+            if key in stats and before.get(key):
+                changes.append(f"{key} {(stats[key] - before[key]) / before[key] * 100:+.1f}%")
+        print(f"  {name:<10} " + '  '.join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tokens', type=int, default=100)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--interval-minutes', type=int, default=60,
+                        help='spacing of seeded metric rows')
+    parser.add_argument('--database', help='reuse an already seeded SQLite file instead of seeding')
+    parser.add_argument('--duration', type=float, default=20, help='seconds of REST traffic')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent REST workers')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help='endpoint weights, e.g. list=50,detail=25,search=15,velocity=10')
+    parser.add_argument('--subscribers', type=int, default=20)
+    parser.add_argument('--broadcasts', type=int, default=10)
+    parser.add_argument('--broadcast-interval', type=float, default=0.5)
+    parser.add_argument('--report', help='write the JSON report to this path')
+    parser.add_argument('--baseline', help='previous JSON report to compare against')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    if args.database:
+        database_path = os.path.abspath(args.database)
+    else:
+        database_path = os.path.join(tempfile.mkdtemp(prefix='tms-load-'), 'load.db')
+    app, server = create_app(f"sqlite:///{database_path}")
+
+    with app.app_context():
+        db.create_all()
+        if args.database:
+            metric_rows = db.session.query(TokenMetric).count()
+        else:
+            started = time.perf_counter()
+            metric_rows = seed(args.tokens, args.days, args.interval_minutes)
+            print(f"seeded {args.tokens} tokens x {metric_rows // max(args.tokens, 1)} metrics "
+                  f"in {time.perf_counter() - started:.1f}s -> {database_path}")
+        tokens = db.session.query(Token.cmc_id, Token.symbol).all()
+    cmc_ids = [cmc_id for cmc_id, _ in tokens]
+    symbols = [symbol for _, symbol in tokens]
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    threading.Thread(
+        target=server.run, args=(app,),
+        kwargs={'host': '127.0.0.1', 'port': port, 'allow_unsafe_werkzeug': True},
+        daemon=True
+    ).start()
+    for _ in range(100):
+        try:
+            requests.get(base_url + '/api/v1/tokens?limit=1', headers={'X-API-Key': API_KEY}, timeout=1)
+            break
+        except requests.ConnectionError:
+            time.sleep(0.1)
+
+    subscribers = [Subscriber(base_url, cmc_ids) for _ in range(args.subscribers)]
+    started_at = datetime.utcnow().isoformat() + 'Z'
+
+    deadline = time.perf_counter() + args.duration
+    workers = [RestWorker(base_url, args.mix, cmc_ids, symbols, deadline) for _ in range(args.concurrency)]
+    for worker in workers:
+        worker.start()
+
+    # Broadcast while REST traffic is running so fan-out is measured under load
+    fanout = broadcast(app, server, subscribers, args.broadcasts, args.broadcast_interval)
+    for worker in workers:
+        worker.join()
+
+    rest = {}
+    for name in args.mix:
+        latencies = [latency for worker in workers for latency in worker.latencies[name]]
+        rest[name] = dict(summarize(latencies, args.duration),
+                          errors=sum(worker.errors[name] for worker in workers))
+    total = [latency for worker in workers for values in worker.latencies.values() for latency in values]
+    rest['total'] = dict(summarize(total, args.duration),
+                         errors=sum(sum(worker.errors.values()) for worker in workers))
+
+    for subscriber in subscribers:
+        subscriber.client.disconnect()
+
+    report = {
+        'meta': {
+            'started_at': started_at,
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'config': {
+            'tokens': len(cmc_ids),
+            'metric_rows': metric_rows,
+            'days': args.days,
+            'interval_minutes': args.interval_minutes,
+            'duration_s': args.duration,
+            'concurrency': args.concurrency,
+            'mix': args.mix,
+            'subscribers': args.subscribers,
+            'broadcasts': args.broadcasts
+        },
+        'rest': rest,
+        'websocket': {
+            'fanout': summarize(fanout, args.duration),
+            'delivered': len(fanout),
+            'expected': args.subscribers * args.broadcasts
+        }
+    }
+
+    print(f"{'endpoint':<10} {'count':>7} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+    for name, stats in dict(rest, fanout=report['websocket']['fanout']).items():
+        if stats.get('count'):
+            print(f"{name:<10} {stats['count']:>7} {stats['throughput_rps']:>8} {stats['p50_ms']:>9} "
+                  f"{stats['p95_ms']:>9} {stats['p99_ms']:>9} {stats.get('errors', 0):>7}")
+    print(f"fan-out delivered {report['websocket']['delivered']}/{report['websocket']['expected']}")
+
+    if args.report:
+        with open(args.report, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            compare(report, json.load(baseline_file))
+
+
+if __name__ == '__main__':
+    main()
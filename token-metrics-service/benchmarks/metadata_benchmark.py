@@ -0,0 +1,175 @@
+"""Check metadata enrichment against the CMC stub and count its upstream calls.
+
+Starts the stub from ``cmc_stub.py`` in-process, ingests one tick of
+``--universe - --new`` tokens into a fresh SQLite database, and then:
+
+- runs the enricher with an unlimited budget and reports its info calls
+  against one call per token; every token must have its metadata
+- runs it again, which must make no call while everything is fresh
+- ingests a tick listing ``--new`` more tokens, counting the ingest's own
+  upstream calls (none may go to the info endpoint), and enriches only the
+  new tokens
+- moves the clock past the TTL and checks that one budgeted run refreshes
+  ``--calls`` batches, the stalest first, without rewriting unchanged rows
+- makes every token due again, answers 429 to the second info call of the
+  next run (the first when only one is possible) and checks it stops there
+- times ``/tokens`` pages with the default fields and with
+  ``fields=`` naming the metadata, reporting payload sizes
+
+Usage:
+    python benchmarks/metadata_benchmark.py --universe 2000 --new 50 --calls 5
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+from werkzeug.serving import make_server
+from cmc_stub import FaultPlan, SyntheticMarket, create_stub_app
+from ingest_replay import SimulatedClock
+from src.app import create_app
+from src.models.token import db, Token, TokenEnrichment
+from src.services.container import get_services
+from src.services.metadata import DEFAULT_BATCH_SIZE, MetadataEnricher
+from src.utils.serialization import LIST_TOKEN_FIELDS, LIST_QUOTE_FIELDS, METADATA_FIELDS
+
+
+class ScriptedFaults(FaultPlan):
+    """Answers 429 to the requests whose numbers are in ``rate_limited``"""
+
+    def __init__(self):
+        super().__init__()
+        self.rate_limited = set()
+
+    def fault(self, request_number):
+        if request_number in self.rate_limited:
+            return 429, 1008, "You've exceeded your API Key's HTTP request rate limit."
+        return None
+
+
+def missing_metadata():
+    return db.session.execute(
+        select(func.count()).select_from(Token).where(Token.logo_url.is_(None))
+    ).scalar()
+
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--universe', type=int, default=2000)
+    parser.add_argument('--new', type=int, default=50, help='tokens listed by the second tick only')
+    parser.add_argument('--calls', type=int, default=5, help='info calls allowed per budgeted run')
+    parser.add_argument('--page', type=int, default=1000, help='tokens per /tokens page')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    faults = ScriptedFaults()
+    stub = create_stub_app(SyntheticMarket(args.universe), faults)
+    counters = stub.config['STUB_COUNTERS']
+    server = make_server('127.0.0.1', 0, stub, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['CMC_BASE_URL'] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ['CMC_LISTINGS_LIMIT'] = str(args.universe - args.new)
+
+    directory = tempfile.mkdtemp(prefix='tms-metadata-')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'metadata.db')}",
+        'SOCKETIO_ASYNC_MODE': 'threading',
+        'INGEST_ENABLED': False,
+        'TESTING': True,
+        'SLOW_QUERY_MS': ''
+    })
+    clock = SimulatedClock(datetime.utcnow())
+    with app.app_context():
+        data_service = get_services().data_service
+        enricher = MetadataEnricher(data_service, max_calls=args.calls, min_interval=0, clock=clock)
+        data_service.update_token_data()
+        tokens = db.session.execute(select(func.count()).select_from(Token)).scalar()
+        assert missing_metadata() == tokens
+
+        before = counters['requests']
+        stats, seconds = timed(enricher.run, max_calls=10 ** 6)
+        calls = counters['requests'] - before
+        assert calls == stats['calls'] == -(-tokens // DEFAULT_BATCH_SIZE), stats
+        assert stats['found'] == stats['changed'] == tokens and missing_metadata() == 0, stats
+        print(f"initial: {tokens} tokens enriched with {calls} info calls in {seconds:.2f}s "
+              f"(one call per token: {tokens})")
+
+        before = counters['requests']
+        stats = enricher.run()
+        assert stats['calls'] == 0 and counters['requests'] == before, stats
+        print("all fresh: 0 info calls")
+
+        data_service.listings_limit = args.universe
+        before = counters['requests']
+        _, seconds = timed(data_service.update_token_data)
+        ingest_calls = counters['requests'] - before
+        new = db.session.execute(select(func.count()).select_from(Token)).scalar() - tokens
+        assert missing_metadata() == new == args.new
+        print(f"ingest tick: {ingest_calls} upstream calls in {seconds * 1000:.0f} ms, "
+              f"{new} new tokens left for the enricher")
+
+        before = counters['requests']
+        stats = enricher.run()
+        assert stats['calls'] == counters['requests'] - before == -(-args.new // DEFAULT_BATCH_SIZE), stats
+        assert stats['requested'] == args.new and missing_metadata() == 0, stats
+        print(f"new tokens: {stats['requested']} enriched with {stats['calls']} info call(s)")
+
+        clock.advance(enricher.ttl + timedelta(minutes=1))
+        total = tokens + new
+        expected_calls = min(args.calls, -(-total // DEFAULT_BATCH_SIZE))
+        oldest = db.session.execute(
+            select(TokenEnrichment.token_id).order_by(TokenEnrichment.fetched_at, TokenEnrichment.token_id)
+            .limit(args.calls * DEFAULT_BATCH_SIZE)
+        ).scalars().all()
+        stats, seconds = timed(enricher.run)
+        refreshed = set(db.session.execute(
+            select(TokenEnrichment.token_id).where(TokenEnrichment.fetched_at == clock())
+        ).scalars())
+        assert stats['calls'] == expected_calls and stats['changed'] == 0, stats
+        assert refreshed == set(oldest), 'refreshed tokens are not the stalest'
+        print(f"past the TTL: budget of {args.calls} calls refreshed {len(refreshed)} stalest tokens "
+              f"in {seconds:.2f}s, {stats['changed']} token rows rewritten")
+
+        # Everything due again, so the run would make as many calls as the budget and batches allow
+        clock.advance(enricher.ttl + timedelta(minutes=1))
+        failing = min(2, args.calls, -(-total // DEFAULT_BATCH_SIZE))
+        faults.rate_limited = {counters['requests'] + failing}
+        stats = enricher.run()
+        assert stats['calls'] == failing and stats['error'], stats
+        assert stats['requested'] == (failing - 1) * DEFAULT_BATCH_SIZE, stats
+        print(f"429 on call {failing}: run stopped after {stats['requested']} tokens ({stats['error']})")
+
+    client = app.test_client()
+    headers = {'X-API-Key': 'metadata-benchmark'}
+    with_metadata = ','.join(LIST_TOKEN_FIELDS + LIST_QUOTE_FIELDS + METADATA_FIELDS + ('velocity_trend', 'last_updated'))
+    print(f"{'/tokens page of ' + str(args.page):>24} {'ms':>8} {'bytes':>10}")
+    for label, fields in (('default', None), ('with metadata', with_metadata)):
+        url = f'/api/v1/tokens?limit={args.page}' + (f'&fields={with_metadata}' if fields else '')
+        client.get(url, headers=headers)
+        timings = []
+        for _ in range(5):
+            response, seconds = timed(client.get, url, headers=headers)
+            assert response.status_code == 200
+            timings.append(seconds)
+        payload = response.get_json()['data'][0]
+        assert ('logo_url' in payload) == bool(fields)
+        print(f"{label:>24} {sorted(timings)[2] * 1000:>8.1f} {len(response.data):>10}")
+
+
+if __name__ == '__main__':
+    main()
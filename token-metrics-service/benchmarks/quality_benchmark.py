@@ -0,0 +1,120 @@
+"""Time the vectorized quality checks and measure what they catch.
+
+Builds listings batches from the synthetic market in ``cmc_stub.py``,
+injects known faults into a fraction of the records (zero market cap,
+volume spikes, price spikes, stale quotes, market cap inconsistent with
+price x supply) and scores each batch against the previous tick as the
+stored history. Reports the time per batch and how many injected faults
+were quarantined and how many clean records were (false positives). It
+also shows how the faults would have skewed a rolling velocity average
+had they gone into the history unchecked.
+
+Usage:
+    python benchmarks/quality_benchmark.py --universe 5000 --fault-rate 0.02
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from cmc_stub import SyntheticMarket
+from src.services.quality import MAX_VELOCITY, score_batch
+
+FAULTS = ('zero_market_cap', 'volume_spike', 'price_spike', 'stale', 'inconsistent')
+
+
+def batch_columns(market):
+    """Column arrays of one listings payload, ordered by CMC id"""
+    listings = sorted(market.listings(1, market.universe)['data'], key=lambda entry: entry['id'])
+    quotes = [entry['quote']['USD'] for entry in listings]
+    return np.array([entry['id'] for entry in listings]), {
+        'price': np.array([quote['price'] for quote in quotes]),
+        'market_cap': np.array([quote['market_cap'] for quote in quotes]),
+        'volume_24h': np.array([quote['volume_24h'] for quote in quotes]),
+        'circulating_supply': np.array([entry['circulating_supply'] for entry in listings]),
+        'age_seconds': np.full(len(listings), 60.0)
+    }
+
+
+def inject(columns, rng, rate):
+    """Corrupt a random subset in place; returns ``{fault: positions}``"""
+    size = len(columns['price'])
+    positions = rng.permutation(size)[:int(size * rate) // len(FAULTS) * len(FAULTS)]
+    injected = dict(zip(FAULTS, np.split(positions, len(FAULTS))))
+    columns['market_cap'][injected['zero_market_cap']] = 0.0
+    columns['volume_24h'][injected['volume_spike']] *= 100
+    columns['price'][injected['price_spike']] *= 10
+    columns['age_seconds'][injected['stale']] = 3 * 3600
+    columns['market_cap'][injected['inconsistent']] *= 3
+    return injected
+
+
+def velocity(columns):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.nan_to_num(np.minimum(columns['volume_24h'] / columns['market_cap'], MAX_VELOCITY))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--universe', type=int, default=5000)
+    parser.add_argument('--fault-rate', type=float, default=0.02)
+    parser.add_argument('--ticks', type=int, default=12, help='ticks in the rolling average')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    market = SyntheticMarket(args.universe, args.seed)
+    now = datetime(2025, 6, 20)
+    market.advance()
+    _, stored = batch_columns(market)
+    stored['age_seconds'] = np.full(args.universe, 300.0)
+    no_pending = {'price': np.full(args.universe, np.nan), 'volume_24h': np.full(args.universe, np.nan)}
+
+    durations, caught, missed, false_positive, total_faults = [], {fault: 0 for fault in FAULTS}, 0, 0, 0
+    clean_sum, unchecked_sum, checked_sum, checked_count = 0.0, 0.0, 0.0, 0
+    for _ in range(args.ticks):
+        market.advance()
+        now += timedelta(minutes=5)
+        _, clean = batch_columns(market)
+        columns = {name: values.copy() for name, values in clean.items()}
+        injected = inject(columns, rng, args.fault_rate)
+
+        started = time.perf_counter()
+        result = score_batch(columns, stored, no_pending)
+        durations.append(time.perf_counter() - started)
+
+        faulty = np.zeros(args.universe, dtype=bool)
+        for fault, positions in injected.items():
+            faulty[positions] = True
+            caught[fault] += int(result.quarantined[positions].sum())
+            total_faults += len(positions)
+        missed += int((faulty & ~result.quarantined).sum())
+        false_positive += int((~faulty & result.quarantined).sum())
+
+        clean_velocity, raw_velocity = velocity(clean), velocity(columns)
+        clean_sum += clean_velocity.sum()
+        unchecked_sum += raw_velocity.sum()
+        checked_sum += raw_velocity[~result.quarantined].sum()
+        checked_count += int((~result.quarantined).sum())
+
+        # Accepted records become the stored history for the next tick
+        for name in ('price', 'market_cap', 'volume_24h'):
+            stored[name] = np.where(result.quarantined, stored[name], columns[name])
+
+    batch_ms = np.array(durations) * 1000
+    per_fault = ', '.join(f"{fault} {caught[fault]}" for fault in FAULTS)
+    print(f"{args.universe} records per batch: p50 {np.percentile(batch_ms, 50):.2f} ms, "
+          f"p95 {np.percentile(batch_ms, 95):.2f} ms")
+    print(f"faults injected {total_faults}, quarantined {total_faults - missed} ({per_fault}), missed {missed}")
+    print(f"clean records quarantined: {false_positive}")
+    records = args.universe * args.ticks
+    print(f"mean velocity: clean {clean_sum / records:.4f}, unchecked {unchecked_sum / records:.4f}, "
+          f"checked {checked_sum / checked_count:.4f}")
+
+
+if __name__ == '__main__':
+    main()
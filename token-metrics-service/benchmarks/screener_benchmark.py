@@ -0,0 +1,128 @@
+"""Compare snapshot screens against the equivalent SQL over latest metrics.
+
+Seeds a SQLite database with ``--tokens`` tokens and ``--history`` metric
+rows each, builds a ``MarketSnapshot`` (the per-tick cost), then runs a
+set of compound screens both through ``MarketSnapshot.screen`` and as
+``latest_quote_query`` statements with the same filters and ordering.
+Both paths must return the same token ids.
+
+Usage:
+    python benchmarks/screener_benchmark.py --tokens 5000 --history 3
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.app import create_app
+from src.models.token import db, Token, TokenMetric
+from src.services.container import get_services
+from src.services.screener import SCREENER_SELECTION, MarketSnapshot, parse_filters, parse_sort
+from src.utils.serialization import QUOTE_FIELDS
+
+SCREENS = (
+    ('velocity>0.5,percent_change_24h<-5', '-velocity'),
+    ('market_cap>=1e8,percent_change_7d>0', '-percent_change_24h,market_cap'),
+    ('volume_24h>1e6', '-volume_24h,-price'),
+    ('percent_change_1h>-1,percent_change_1h<1,velocity_7d>0.2', 'percent_change_7d,-market_cap')
+)
+
+_SQL_OPERATORS = {
+    '>': lambda column, value: column > value,
+    '>=': lambda column, value: column >= value,
+    '<': lambda column, value: column < value,
+    '<=': lambda column, value: column <= value,
+    '=': lambda column, value: column == value,
+    '!=': lambda column, value: column != value
+}
+
+
+def seed(tokens, history):
+    now = datetime.utcnow().replace(microsecond=0)
+    db.session.execute(Token.__table__.insert(), [
+        {'cmc_id': 1000 + i, 'name': f'Token {i}', 'symbol': f'TK{i}', 'slug': f'token-{i}',
+         'is_active': True, 'created_at': now, 'updated_at': now}
+        for i in range(tokens)
+    ])
+    rows = []
+    for token_id in range(1, tokens + 1):
+        for step in range(history):
+            market_cap = 10 ** random.uniform(5, 12)
+            volume = market_cap * random.uniform(0.001, 2)
+            rows.append({
+                'token_id': token_id,
+                'timestamp': now - timedelta(minutes=step),
+                'price_usd': round(random.uniform(0.0001, 50000), 8),
+                'market_cap_usd': round(market_cap, 2),
+                'volume_24h_usd': round(volume, 2),
+                'percent_change_1h': round(random.uniform(-5, 5), 4),
+                'percent_change_24h': round(random.uniform(-30, 30), 4),
+                'percent_change_7d': round(random.uniform(-60, 60), 4),
+                'velocity': round(volume / market_cap, 6),
+                'velocity_7d': round(random.uniform(0, 2), 6),
+                'created_at': now
+            })
+    db.session.execute(TokenMetric.__table__.insert(), rows)
+    db.session.commit()
+
+
+def sql_screen(data_service, filters, sort):
+    query = data_service.latest_quote_query(SCREENER_SELECTION).where(
+        Token.is_active == True, TokenMetric.id.isnot(None)
+    )
+    for metric, operator, value in filters:
+        query = query.where(_SQL_OPERATORS[operator](getattr(TokenMetric, QUOTE_FIELDS[metric]), value))
+    order = []
+    for metric, descending in sort:
+        column = getattr(TokenMetric, QUOTE_FIELDS[metric])
+        # Missing values last in either direction, as in MarketSnapshot.screen
+        order += [column.is_(None), column.desc() if descending else column.asc()]
+    return [row[0] for row in db.session.execute(query.order_by(*order, Token.id))]
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tokens', type=int, default=5000)
+    parser.add_argument('--history', type=int, default=3, help='metric rows per token')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(1)
+    directory = tempfile.mkdtemp(prefix='tms-screener-')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'screener.db')}",
+        'SOCKETIO_ASYNC_MODE': 'threading',
+        'INGEST_ENABLED': False,
+        'TESTING': True
+    })
+    with app.app_context():
+        seed(args.tokens, args.history)
+        data_service = get_services().data_service
+
+        snapshot, build_ms = timed(lambda: MarketSnapshot.load(data_service), 3)
+        print(f"tokens={args.tokens} history={args.history} snapshot build {build_ms:8.2f} ms")
+        print(f"{'screen':<90} {'rows':>5} {'snapshot ms':>12} {'sql ms':>9}")
+
+        for filter_value, sort_value in SCREENS:
+            filters, sort = parse_filters([filter_value]), parse_sort(sort_value)
+            positions, snapshot_ms = timed(lambda: snapshot.screen(filters, sort), args.repeat)
+            expected, sql_ms = timed(lambda: sql_screen(data_service, filters, sort), 3)
+            assert snapshot.ids[positions].tolist() == expected, filter_value
+            label = f"{filter_value} | {sort_value}"
+            print(f"{label:<90} {len(positions):>5} {snapshot_ms:>12.3f} {sql_ms:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
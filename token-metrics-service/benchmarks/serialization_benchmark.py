@@ -0,0 +1,113 @@
+"""Compare ORM hydration against the row-tuple serialization path.
+
+Seeds an in-memory SQLite database with ``--rows`` token metrics and times
+``TokenMetric.to_dict`` over ORM instances against projected row tuples
+mapped by a compiled serializer. Both paths must produce identical payloads.
+
+Usage:
+    python benchmarks/serialization_benchmark.py --rows 1000 --repeat 20
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import select
+from src.models.token import db, Token, TokenMetric
+from src.utils.serialization import METRIC_FIELDS, compile_row_serializer, metric_columns
+
+
+def seed(rows):
+    token = Token(cmc_id=1, name='Bitcoin', symbol='BTC', slug='bitcoin')
+    db.session.add(token)
+    db.session.flush()
+
+    start = datetime.utcnow() - timedelta(minutes=rows)
+    db.session.add_all([
+        TokenMetric(
+            token_id=token.id,
+            timestamp=start + timedelta(minutes=i),
+            price_usd=random.uniform(1, 50000),
+            market_cap_usd=random.uniform(1e6, 1e12),
+            volume_24h_usd=random.uniform(1e5, 1e10),
+            circulating_supply=random.uniform(1e6, 1e9),
+            total_supply=random.uniform(1e6, 1e9),
+            max_supply=random.uniform(1e6, 1e9),
+            percent_change_1h=random.uniform(-5, 5),
+            percent_change_24h=random.uniform(-20, 20),
+            percent_change_7d=random.uniform(-50, 50),
+            velocity=random.uniform(0, 1),
+            velocity_1h=random.uniform(0, 1),
+            velocity_4h=random.uniform(0, 1),
+            velocity_12h=random.uniform(0, 1),
+            velocity_7d=random.uniform(0, 1),
+            data_quality_score=0.95
+        )
+        for i in range(rows)
+    ])
+    db.session.commit()
+
+
+def orm_path():
+    metrics = db.session.query(TokenMetric).order_by(TokenMetric.timestamp).all()
+    result = [metric.to_dict() for metric in metrics]
+    db.session.expunge_all()
+    return result
+
+
+def row_path():
+    mapping = {name: name for name in METRIC_FIELDS}
+    serialize = compile_row_serializer(METRIC_FIELDS)
+    rows = db.session.execute(select(*metric_columns(mapping)).order_by(TokenMetric.timestamp))
+    return [serialize(row) for row in rows]
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        seed(args.rows)
+
+        # Both paths must produce the same payloads, value for value
+        expected, actual = orm_path(), row_path()
+        assert len(expected) == len(actual) == args.rows
+        for expected_row, actual_row in zip(expected, actual):
+            assert expected_row == actual_row, (expected_row, actual_row)
+
+        orm = measure(orm_path, args.repeat)
+        rows = measure(row_path, args.repeat)
+
+    print(f"rows={args.rows} repeat={args.repeat}")
+    print(f"orm_to_dict   median {orm * 1000:8.2f} ms")
+    print(f"row_tuples    median {rows * 1000:8.2f} ms")
+    print(f"speedup       {orm / rows:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
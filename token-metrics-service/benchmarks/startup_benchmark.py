@@ -0,0 +1,68 @@
+"""Measure cold-start time from interpreter launch to the first API response.
+
+Each run starts a fresh interpreter that imports ``src.app``, calls
+``create_app`` and serves ``GET /api/v1/tokens?limit=1`` through the test
+client, so imports, table creation and lazy service construction are all
+counted. The child also reports how many threads exist after startup; with
+ingest disabled no background threads should be running.
+
+Usage:
+    python benchmarks/startup_benchmark.py --runs 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import json, sys, threading, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+from src.app import create_app
+imported = time.perf_counter()
+app = create_app({{
+    'SQLALCHEMY_DATABASE_URI': {uri!r},
+    'SOCKETIO_ASYNC_MODE': 'threading',
+    'INGEST_ENABLED': False,
+    'TESTING': True
+}})
+created = time.perf_counter()
+response = app.test_client().get('/api/v1/tokens?limit=1', headers={{'X-API-Key': 'startup-benchmark'}})
+responded = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_response_ms': (responded - created) * 1000,
+    'total_ms': (responded - started) * 1000,
+    'threads': threading.active_count()
+}}))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    database = os.path.join(tempfile.mkdtemp(prefix='tms-startup-'), 'startup.db')
+    code = CHILD.format(root=SERVICE_ROOT, uri=f"sqlite:///{database}")
+    env = dict(os.environ, FLASK_ENV='testing')
+
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.check_output([sys.executable, '-c', code], env=env, text=True)
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    for key in ('import_ms', 'create_app_ms', 'first_response_ms', 'total_ms'):
+        values = sorted(run[key] for run in runs)
+        print(f"{key:<18} median {values[len(values) // 2]:8.1f}  min {values[0]:8.1f}  max {values[-1]:8.1f}")
+    print(f"threads after startup: {max(run['threads'] for run in runs)}")
+
+
+if __name__ == '__main__':
+    main()
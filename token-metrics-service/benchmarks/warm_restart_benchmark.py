@@ -0,0 +1,174 @@
+"""Compare a cold restart with one that loads the warm-state file.
+
+Seeds a SQLite database with ``--tokens`` tokens and ``--history`` metric
+rows each (as ``screener_benchmark.py`` does), then runs the derived-state
+steps of one ingest tick and writes the warm-state file, reporting its
+size and write time. Fiat rates come from the stub in ``cmc_stub.py``,
+started in-process. Each restart is a fresh interpreter that calls
+``create_app`` and times the first request to each endpoint below:
+
+- cold: ``WARM_STATE_PATH`` unset, so the ``convert=EUR`` request fetches
+  the fiat rates from the stub
+- warm: the file matches the database's latest tick
+- stale: one metric row was added after the file was written, so only
+  the fiat rates may be restored
+
+Every request must succeed, responses of the warm restart must match the
+cold ones, and only cold restarts may call the stub.
+
+Usage:
+    python benchmarks/warm_restart_benchmark.py --tokens 5000 --history 50 --runs 3
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.serving import make_server
+from cmc_stub import SyntheticMarket, create_stub_app
+from screener_benchmark import seed
+from src.app import create_app
+from src.models.token import db, TokenMetric
+from src.services import warm_state
+from src.services.container import get_services
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = (
+    '/api/v1/dashboard/bootstrap',
+    '/api/v1/market/movers?limit=10',
+    '/api/v1/tokens/screener?filter=velocity>0.5&sort=-percent_change_24h&limit=50',
+    '/api/v1/tokens/screener?limit=20&convert=EUR'
+)
+
+CHILD = r'''
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+from src.app import create_app
+config = {{
+    'SQLALCHEMY_DATABASE_URI': {uri!r},
+    'SOCKETIO_ASYNC_MODE': 'threading',
+    'INGEST_ENABLED': False,
+    'TESTING': True,
+    'SLOW_QUERY_MS': ''
+}}
+if {path!r}:
+    config['WARM_STATE_PATH'] = {path!r}
+imported = time.perf_counter()
+app = create_app(config)
+created = time.perf_counter()
+client = app.test_client()
+requests = {{}}
+for url in {endpoints!r}:
+    before = time.perf_counter()
+    response = client.get(url, headers={{'X-API-Key': 'warm-restart-benchmark'}})
+    body = response.get_json()
+    body.pop('status')
+    # Build times differ between processes by construction
+    for holder in (body, body.get('data') or {{}}):
+        if isinstance(holder, dict) and isinstance(holder.get('snapshot'), dict):
+            holder['snapshot'].pop('built_at', None)
+    requests[url] = {{'ms': (time.perf_counter() - before) * 1000, 'code': response.status_code, 'body': body}}
+print(json.dumps({{'create_app_ms': (created - imported) * 1000, 'requests': requests}}))
+'''
+
+
+def restart(database, path):
+    code = CHILD.format(root=SERVICE_ROOT, uri=f"sqlite:///{database}", path=path, endpoints=ENDPOINTS)
+    env = dict(os.environ, FLASK_ENV='testing')
+    output = subprocess.check_output([sys.executable, '-c', code], env=env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tokens', type=int, default=5000)
+    parser.add_argument('--history', type=int, default=50, help='metric rows per token')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(1)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    # Only tools/price-conversion is called; restarts inherit CMC_BASE_URL
+    stub = create_stub_app(SyntheticMarket(1))
+    counters = stub.config['STUB_COUNTERS']
+    server = make_server('127.0.0.1', 0, stub, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['CMC_BASE_URL'] = f"http://127.0.0.1:{server.server_port}/v1"
+
+    directory = tempfile.mkdtemp(prefix='tms-warm-')
+    database = os.path.join(directory, 'warm.db')
+    path = os.path.join(directory, 'warm_state.npz')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{database}",
+        'SOCKETIO_ASYNC_MODE': 'threading',
+        'INGEST_ENABLED': False,
+        'TESTING': True,
+        'SLOW_QUERY_MS': ''
+    })
+    with app.app_context():
+        seed(args.tokens, args.history)
+        services = get_services()
+        data_service = services.data_service
+        # Rates normally come from the ingester: crypto every tick, fiat hourly
+        data_service.load_crypto_rates()
+        data_service._refresh_fiat_rates(force=True)
+        snapshot = services.screener.rebuild(data_service)
+        view = services.dashboard.warm(data_service, snapshot)
+        services.leaderboards.update(snapshot)
+        started = time.perf_counter()
+        size = warm_state.save(path, services, snapshot, view)
+        save_ms = (time.perf_counter() - started) * 1000
+    print(f"{args.tokens} tokens x {args.history} rows; state file {size / 1e6:.2f} MB written in {save_ms:.1f} ms")
+
+    upstream = {}
+    before = counters['requests']
+    runs = {'cold': [restart(database, None) for _ in range(args.runs)]}
+    upstream['cold'] = counters['requests'] - before
+    before = counters['requests']
+    runs['warm'] = [restart(database, path) for _ in range(args.runs)]
+    upstream['warm'] = counters['requests'] - before
+
+    with app.app_context():
+        db.session.add(TokenMetric(token_id=1, timestamp=datetime.utcnow()))
+        db.session.commit()
+    before = counters['requests']
+    runs['stale'] = [restart(database, path) for _ in range(args.runs)]
+    upstream['stale'] = counters['requests'] - before
+    assert upstream == {'cold': args.runs, 'warm': 0, 'stale': 0}, upstream
+
+    for url in ENDPOINTS:
+        for name, results in runs.items():
+            assert all(result['requests'][url]['code'] == 200 for result in results), (name, url)
+        assert runs['warm'][0]['requests'][url]['body'] == runs['cold'][0]['requests'][url]['body'], url
+
+    print(f"{'restart':>8} {'create_app':>10} " + ' '.join(f"{'req ' + str(i + 1):>8}" for i in range(len(ENDPOINTS)))
+          + f" {'upstream':>8}")
+    for name, results in runs.items():
+        cells = [
+            f"{median([result['requests'][url]['ms'] for result in results]):>8.1f}" for url in ENDPOINTS
+        ]
+        print(f"{name:>8} {median([result['create_app_ms'] for result in results]):>10.1f} " + ' '.join(cells)
+              + f" {upstream[name]:>8}")
+    for index, url in enumerate(ENDPOINTS, start=1):
+        print(f"  req {index}: {url}")
+    print(f"times in ms (median); upstream: fiat rate fetches over {args.runs} restarts; warm responses match cold")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""Application factory.
+
+Importing this module has no side effects: the app, database tables, service
+container and Socket.IO server are set up by ``create_app`` and the ingest
+loop only starts when ``start_data_updater`` is called.
+"""
+import logging
+import os
+import threading
+import time
+from flask import Flask
+from flask_cors import CORS
+from flask_socketio import SocketIO
+from dotenv import load_dotenv
+from src.commands import register_commands
+from src.models.token import db
+from src.routes.admin import admin_bp
+from src.routes.alerts import alerts_bp
+from src.routes.dashboard import dashboard_bp
+from src.routes.market import market_bp
+from src.routes.tokens import tokens_bp
+from src.routes.websocket import register_socketio_events
+from src.services.alerts import alert_room
+from src.services.container import EXTENSION_KEY, ServiceContainer, get_services
+from src.services import warm_state
+from src.services.subscriptions import token_room
+from src.utils import metrics, profiling
+from src.utils.auth import hash_api_key
+from src.utils.logs import configure_logging
+
+logger = logging.getLogger(__name__)
+
+socketio = SocketIO()
+
+# Seconds between ingest ticks
+UPDATE_INTERVAL = 60
+
+DEFAULT_STATIC_FOLDER = os.path.join(os.path.dirname(__file__), 'static')
+DEFAULT_DATABASE_URI = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+
+
+def create_app(config=None):
+    """Build the Flask app; ``config`` overrides environment-derived settings"""
+    load_dotenv()
+
+    app = Flask(__name__, static_folder=os.getenv('STATIC_FOLDER', DEFAULT_STATIC_FOLDER))
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-here')
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI', DEFAULT_DATABASE_URI)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SOCKETIO_ASYNC_MODE'] = os.getenv('SOCKETIO_ASYNC_MODE', 'eventlet')
+    app.config['INGEST_ENABLED'] = os.getenv('FLASK_ENV') != 'testing'
+    app.config['ADMIN_API_KEYS'] = os.getenv('ADMIN_API_KEYS', '')
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+    app.config['PROFILE_DIR'] = os.getenv('PROFILE_DIR')
+    app.config['SLOW_QUERY_MS'] = os.getenv('SLOW_QUERY_MS', '500')
+    app.config['COLUMN_STORE_DIR'] = os.getenv('COLUMN_STORE_DIR')
+    app.config['WARM_STATE_PATH'] = os.getenv('WARM_STATE_PATH')
+    # Token metadata enrichment: runs every METADATA_REFRESH_SECONDS (0 disables)
+    app.config['METADATA_REFRESH_SECONDS'] = int(os.getenv('METADATA_REFRESH_SECONDS', '300'))
+    app.config['METADATA_TTL_HOURS'] = float(os.getenv('METADATA_TTL_HOURS', '168'))
+    app.config['METADATA_BATCH_SIZE'] = int(os.getenv('METADATA_BATCH_SIZE', '100'))
+    app.config['METADATA_CALLS_PER_RUN'] = int(os.getenv('METADATA_CALLS_PER_RUN', '5'))
+    app.config.update(config or {})
+    app.config['ADMIN_API_KEY_HASHES'] = frozenset(
+        hash_api_key(key.strip()) for key in app.config['ADMIN_API_KEYS'].split(',') if key.strip()
+    )
+
+    if not app.testing:
+        configure_logging()
+
+    # Enable CORS for all routes
+    CORS(app, origins="*")
+
+    db.init_app(app)
+    app.extensions[EXTENSION_KEY] = ServiceContainer(app)
+
+    app.register_blueprint(tokens_bp, url_prefix='/api/v1')
+    app.register_blueprint(alerts_bp, url_prefix='/api/v1')
+    app.register_blueprint(market_bp, url_prefix='/api/v1')
+    app.register_blueprint(dashboard_bp, url_prefix='/api/v1')
+    app.register_blueprint(admin_bp, url_prefix='/api/v1')
+    register_commands(app)
+
+    socketio.init_app(app, cors_allowed_origins="*", async_mode=app.config['SOCKETIO_ASYNC_MODE'])
+    register_socketio_events(socketio)
+
+    # Request timing, SQL accounting and the /metrics endpoint
+    metrics.init_app(app, socketio)
+    # Opt-in profiling and the slow-query log
+    profiling.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        # Start from the state the last tick built, when it still matches the database
+        if app.config['WARM_STATE_PATH']:
+            warm_state.restore(app.config['WARM_STATE_PATH'], get_services(app))
+
+    app.add_url_rule('/', 'serve', serve, defaults={'path': ''})
+    app.add_url_rule('/<path:path>', 'serve', serve)
+    return app
+
+
+def serve(path):
+    """Serve the static folder, with client-side routes falling back to index.html"""
+    static_files = get_services().static_files
+    entry = static_files.lookup(path)
+    if entry is None:
+        return "index.html not found", 404
+    return static_files.response(entry)
+
+
+def background_data_updater(app):
+    """Background loop that ingests token data and broadcasts market updates"""
+    services = get_services(app)
+    data_service = services.data_service
+    while True:
+        try:
+            with app.app_context():
+                data_service.update_token_data()
+                # Refresh the read models derived from the latest tick
+                with metrics.time_stage('snapshot'):
+                    snapshot = services.screener.rebuild(data_service)
+                    dashboard_view = services.dashboard.warm(data_service, snapshot)
+                    services.leaderboards.update(snapshot)
+                services.correlations.invalidate()
+                # Emit updates to WebSocket clients
+                with metrics.time_stage('broadcast'):
+                    socketio.emit('market_update', services.leaderboards.market_update(snapshot), namespace='/')
+                    # Per-token updates only for tokens someone is subscribed to
+                    token_updates = data_service.get_socket_payloads(services.subscriptions.interest())
+                    for token_id, payload in token_updates.items():
+                        socketio.emit('token_update', payload, room=token_room(token_id), namespace='/')
+                metrics.count_emit('market_update')
+                metrics.count_emit('token_update', len(token_updates))
+
+                # Deliver crossed alert rules to the connections of their owners
+                with metrics.time_stage('alerts'):
+                    alerts = services.alert_engine.evaluate_latest(data_service)
+                    for api_key_hash, payload in alerts:
+                        socketio.emit('alert', payload, room=alert_room(api_key_hash), namespace='/')
+                metrics.count_emit('alert', len(alerts))
+
+                if app.config['WARM_STATE_PATH']:
+                    with metrics.time_stage('warm_state'):
+                        warm_state.save(app.config['WARM_STATE_PATH'], services, snapshot, dashboard_view)
+        except Exception as e:
+            logger.exception("Error in background data updater")
+
+        time.sleep(UPDATE_INTERVAL)
+
+
+def background_metadata_enricher(app):
+    """Background loop that fills token metadata, apart from the ingest loop"""
+    services = get_services(app)
+    while True:
+        try:
+            with app.app_context():
+                with metrics.time_stage('metadata'):
+                    services.metadata_enricher.run()
+        except Exception as e:
+            logger.exception("Error in background metadata enricher")
+
+        time.sleep(app.config['METADATA_REFRESH_SECONDS'])
+
+
+def start_data_updater(app):
+    """Start the ingest thread unless ingest is disabled for this app.
+
+    The metadata enricher gets its own thread, so its upstream calls never
+    delay a tick.
+    """
+    if not app.config['INGEST_ENABLED']:
+        return None
+    update_thread = threading.Thread(target=background_data_updater, args=(app,), daemon=True)
+    update_thread.start()
+    if app.config['METADATA_REFRESH_SECONDS'] > 0:
+        threading.Thread(target=background_metadata_enricher, args=(app,), daemon=True).start()
+    return update_thread
@@ -0,0 +1,168 @@
+"""Flask CLI commands, registered on the app by ``create_app``.
+
+Run with ``FLASK_APP=src/main.py flask <command>``.
+"""
+import sys
+from datetime import datetime, timedelta
+import click
+from src.services.backfill import (
+    BACKFILL_INTERVALS, DEFAULT_CHUNK_SIZE, DEFAULT_CONCURRENCY, Backfill, BackfillError, resolve_backfill_tokens
+)
+from src.services.container import get_services
+from src.services.export import EXPORT_FORMATS, export_query, parse_export_format, stream_export
+from src.utils.serialization import DETAIL_SELECTION, QUOTE_FIELDS, parse_fields
+
+
+@click.command('export-metrics')
+@click.option('--ids', default='', help='Comma-separated CMC ids, symbols or slugs (default: all tokens)')
+@click.option('--start', 'time_start', type=click.DateTime(), help='Start of the range, UTC (default: 30 days before --end)')
+@click.option('--end', 'time_end', type=click.DateTime(), help='End of the range, UTC (default: now)')
+@click.option('--format', 'export_format', type=click.Choice(tuple(EXPORT_FORMATS)), default='ndjson')
+@click.option('--fields', help='Comma-separated quote fields (default: all)')
+@click.option('--chunk-size', type=int, default=None, help='Rows fetched per cursor round trip')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='Output file (default: stdout)')
+def export_metrics_command(ids, time_start, time_end, export_format, fields, chunk_size, output):
+    """Stream token_metrics history to a file as NDJSON, CSV or Parquet."""
+    try:
+        parse_export_format(export_format)
+        selection = parse_fields(fields, DETAIL_SELECTION, allowed=tuple(QUOTE_FIELDS))
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+    time_end = time_end or datetime.utcnow()
+    time_start = time_start or time_end - timedelta(days=30)
+
+    token_ids = None
+    identifiers = [value.strip() for value in ids.split(',') if value.strip()]
+    if identifiers:
+        resolved = get_services().data_service.resolve_token_ids(identifiers)
+        not_found = [identifier for identifier in identifiers if identifier not in resolved]
+        if not_found:
+            raise click.UsageError(f"Token not found: {', '.join(not_found)}")
+        token_ids = set(resolved.values())
+
+    query = export_query(token_ids, time_start, time_end, selection.quote_fields)
+    kwargs = {'chunk_size': chunk_size} if chunk_size else {}
+
+    target = open(output, 'wb') if output else sys.stdout.buffer
+    try:
+        written = 0
+        for data in stream_export(query, selection.quote_fields, export_format, **kwargs):
+            target.write(data)
+            written += len(data)
+    finally:
+        if output:
+            target.close()
+    if output:
+        click.echo(f"Wrote {written} bytes to {output}", err=True)
+
+
+@click.command('backfill')
+@click.option('--ids', default='', help='Comma-separated CMC ids, symbols or slugs (default: all active tokens)')
+@click.option('--start', 'time_start', type=click.DateTime(), help='Start of the range, UTC (default: 7 days before --end)')
+@click.option('--end', 'time_end', type=click.DateTime(), help='End of the range, UTC (default: now)')
+@click.option('--interval', type=click.Choice(tuple(BACKFILL_INTERVALS)), default='1h')
+@click.option('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Upstream requests in flight')
+@click.option('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows per insert statement')
+@click.option('--checkpoint', type=click.Path(dir_okay=False), default='backfill.checkpoint.json',
+              help='Progress file; a rerun with the same arguments resumes from it')
+@click.option('--restart', is_flag=True, help='Discard an existing checkpoint')
+def backfill_command(ids, time_start, time_end, interval, concurrency, chunk_size, checkpoint, restart):
+    """Load historical quotes into token_metrics and recompute velocity windows."""
+    time_end = time_end or datetime.utcnow().replace(microsecond=0)
+    time_start = time_start or time_end - timedelta(days=7)
+
+    identifiers = [value.strip() for value in ids.split(',') if value.strip()]
+    data_service = get_services().data_service
+    try:
+        tokens = resolve_backfill_tokens(data_service, identifiers)
+    except LookupError as e:
+        raise click.UsageError(f"Token not found: {e}")
+    if not tokens:
+        raise click.UsageError('No tokens to backfill')
+
+    try:
+        backfill = Backfill(data_service, tokens, time_start, time_end, interval,
+                            concurrency, chunk_size, checkpoint, restart)
+    except (ValueError, BackfillError) as e:
+        raise click.UsageError(str(e))
+
+    total = len(backfill.units)
+    click.echo(f"{total} units for {len(tokens)} tokens, "
+               f"{total - len(backfill.checkpoint.done)} pending", err=True)
+
+    def progress(unit, inserted):
+        done = len(backfill.checkpoint.done)
+        click.echo(f"[{done}/{total}] {unit[0]} from {unit[1].isoformat()}: {inserted} rows", err=True)
+
+    try:
+        stats = backfill.run(progress)
+    except BackfillError as e:
+        raise click.ClickException(f"{e} (progress saved to {checkpoint})")
+    click.echo(f"Inserted {stats['inserted']} rows ({stats['duplicates']} already stored), "
+               f"recomputed velocity windows on {stats['recomputed']} rows", err=True)
+
+
+@click.command('column-store')
+@click.argument('action', type=click.Choice(('check', 'rebuild')))
+@click.option('--ids', default='', help='Comma-separated CMC ids, symbols or slugs (default: all tokens)')
+def column_store_command(action, ids):
+    """Check the column store against token_metrics, or rebuild it from SQL."""
+    services = get_services()
+    column_store = services.column_store
+    if column_store is None:
+        raise click.UsageError('COLUMN_STORE_DIR is not set')
+
+    token_ids = None
+    identifiers = [value.strip() for value in ids.split(',') if value.strip()]
+    if identifiers:
+        resolved = services.data_service.resolve_token_ids(identifiers)
+        not_found = [identifier for identifier in identifiers if identifier not in resolved]
+        if not_found:
+            raise click.UsageError(f"Token not found: {', '.join(not_found)}")
+        token_ids = sorted(set(resolved.values()))
+
+    if action == 'rebuild':
+        written = column_store.rebuild(token_ids)
+        # Only a full rebuild makes the store authoritative for reads
+        if token_ids is None:
+            column_store.mark_complete()
+        click.echo(f"Rebuilt {len(written)} tokens, {sum(written.values())} rows", err=True)
+        return
+
+    problems = column_store.check(token_ids)
+    for token_id, problem in problems:
+        click.echo(f"{token_id if token_id is not None else 'store'}: {problem}")
+    if problems:
+        raise click.ClickException(f"{len(problems)} problems found; run 'flask column-store rebuild'")
+    click.echo('Column store matches token_metrics', err=True)
+
+
+@click.command('enrich-metadata')
+@click.option('--ids', default='', help='Comma-separated CMC ids, symbols or slugs (default: all active tokens)')
+@click.option('--force', is_flag=True, help='Refetch tokens whose metadata is still within the TTL')
+@click.option('--max-calls', type=int, default=None, help='Upstream calls allowed (default: METADATA_CALLS_PER_RUN)')
+def enrich_metadata_command(ids, force, max_calls):
+    """Fetch token metadata from the info endpoint for new and stale tokens."""
+    services = get_services()
+    token_ids = None
+    identifiers = [value.strip() for value in ids.split(',') if value.strip()]
+    if identifiers:
+        resolved = services.data_service.resolve_token_ids(identifiers)
+        not_found = [identifier for identifier in identifiers if identifier not in resolved]
+        if not_found:
+            raise click.UsageError(f"Token not found: {', '.join(not_found)}")
+        token_ids = sorted(set(resolved.values()))
+
+    stats = services.metadata_enricher.run(token_ids, force, max_calls)
+    click.echo(f"{stats['calls']} calls for {stats['requested']} tokens: {stats['found']} found, "
+               f"{stats['changed']} changed", err=True)
+    if stats['error']:
+        raise click.ClickException(stats['error'])
+
+
+def register_commands(app):
+    app.cli.add_command(export_metrics_command)
+    app.cli.add_command(backfill_command)
+    app.cli.add_command(column_store_command)
+    app.cli.add_command(enrich_metadata_command)
@@ -74,21 +74,21 @@ class TokenMetric(db.Model):
             'id': self.id,
             'token_id': self.token_id,
             'timestamp': self.timestamp.isoformat(),
-            'price_usd': float(self.price_usd) if self.price_usd else None,
-            'market_cap_usd': float(self.market_cap_usd) if self.market_cap_usd else None,
-            'volume_24h_usd': float(self.volume_24h_usd) if self.volume_24h_usd else None,
-            'circulating_supply': float(self.circulating_supply) if self.circulating_supply else None,
-            'total_supply': float(self.total_supply) if self.total_supply else None,
-            'max_supply': float(self.max_supply) if self.max_supply else None,
-            'percent_change_1h': float(self.percent_change_1h) if self.percent_change_1h else None,
-            'percent_change_24h': float(self.percent_change_24h) if self.percent_change_24h else None,
-            'percent_change_7d': float(self.percent_change_7d) if self.percent_change_7d else None,
-            'velocity': float(self.velocity) if self.velocity else None,
-            'velocity_1h': float(self.velocity_1h) if self.velocity_1h else None,
-            'velocity_4h': float(self.velocity_4h) if self.velocity_4h else None,
-            'velocity_12h': float(self.velocity_12h) if self.velocity_12h else None,
-            'velocity_7d': float(self.velocity_7d) if self.velocity_7d else None,
-            'data_quality_score': float(self.data_quality_score) if self.data_quality_score else None,
+            'price_usd': float(self.price_usd) if self.price_usd is not None else None,
+            'market_cap_usd': float(self.market_cap_usd) if self.market_cap_usd is not None else None,
+            'volume_24h_usd': float(self.volume_24h_usd) if self.volume_24h_usd is not None else None,
+            'circulating_supply': float(self.circulating_supply) if self.circulating_supply is not None else None,
+            'total_supply': float(self.total_supply) if self.total_supply is not None else None,
+            'max_supply': float(self.max_supply) if self.max_supply is not None else None,
+            'percent_change_1h': float(self.percent_change_1h) if self.percent_change_1h is not None else None,
+            'percent_change_24h': float(self.percent_change_24h) if self.percent_change_24h is not None else None,
+            'percent_change_7d': float(self.percent_change_7d) if self.percent_change_7d is not None else None,
+            'velocity': float(self.velocity) if self.velocity is not None else None,
+            'velocity_1h': float(self.velocity_1h) if self.velocity_1h is not None else None,
+            'velocity_4h': float(self.velocity_4h) if self.velocity_4h is not None else None,
+            'velocity_12h': float(self.velocity_12h) if self.velocity_12h is not None else None,
+            'velocity_7d': float(self.velocity_7d) if self.velocity_7d is not None else None,
+            'data_quality_score': float(self.data_quality_score) if self.data_quality_score is not None else None,
             'created_at': self.created_at.isoformat()
         }
 
@@ -119,3 +119,62 @@ class ApiKey(db.Model):
             'usage_count': self.usage_count
         }
 
+
+class QuarantinedMetric(db.Model):
+    """Listing records rejected by the ingest quality checks, kept for inspection"""
+    __tablename__ = 'quarantined_metrics'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    cmc_id = db.Column(db.Integer, nullable=False, index=True)
+    symbol = db.Column(db.String(50))
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    score = db.Column(db.Float, nullable=False)
+    reasons = db.Column(db.String(255), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'cmc_id': self.cmc_id,
+            'symbol': self.symbol,
+            'timestamp': self.timestamp.isoformat(),
+            'score': self.score,
+            'reasons': self.reasons.split(',')
+        }
+
+
+class TokenEnrichment(db.Model):
+    """When a token's metadata columns were last fetched from the info endpoint"""
+    __tablename__ = 'token_enrichment'
+
+    token_id = db.Column(db.Integer, db.ForeignKey('tokens.id'), primary_key=True)
+    fetched_at = db.Column(db.DateTime, nullable=False, index=True)
+    # False when the upstream had no entry for the token
+    found = db.Column(db.Boolean, nullable=False, default=True)
+
+
+class AlertRule(db.Model):
+    __tablename__ = 'alert_rules'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    api_key_hash = db.Column(db.String(64), nullable=False, index=True)
+    token_id = db.Column(db.Integer, db.ForeignKey('tokens.id'), nullable=False)
+    metric = db.Column(db.String(50), nullable=False)
+    condition = db.Column(db.String(20), nullable=False)
+    threshold = db.Column(db.Float, nullable=False)
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_triggered_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'token_id': self.token_id,
+            'metric': self.metric,
+            'condition': self.condition,
+            'threshold': self.threshold,
+            'is_active': self.is_active,
+            'created_at': self.created_at.isoformat(),
+            'last_triggered_at': self.last_triggered_at.isoformat() if self.last_triggered_at else None
+        }
@@ -0,0 +1,52 @@
+from flask import Blueprint, Response, request, jsonify
+from src.services.quality import recent_quarantine
+from src.utils.auth import require_admin_key
+from src.utils.profiling import profiles, slow_queries
+from src.utils.responses import api_status
+
+admin_bp = Blueprint('admin', __name__)
+
+# Upper bound on quarantined records returned at once
+MAX_QUARANTINE_LIMIT = 500
+
+@admin_bp.route('/admin/profiles', methods=['GET'])
+@require_admin_key
+def list_profiles():
+    """Most recent captured profiles, newest first"""
+    return jsonify({'status': api_status(), 'data': profiles.summaries()})
+
+@admin_bp.route('/admin/profiles/<profile_id>', methods=['GET'])
+@require_admin_key
+def get_profile(profile_id):
+    """One profile as a cumulative-time table, or as a pstats file with ``format=pstats``"""
+    entry = profiles.get(profile_id)
+    if entry is None:
+        return jsonify({'status': api_status(404, 'Profile not found')}), 404
+
+    if request.args.get('format') == 'pstats':
+        return Response(entry['pstats'], mimetype='application/octet-stream', headers={
+            'Content-Disposition': f'attachment; filename="{profile_id}.prof"'
+        })
+
+    return jsonify({
+        'status': api_status(),
+        'data': {key: value for key, value in entry.items() if key != 'pstats'}
+    })
+
+@admin_bp.route('/admin/slow-queries', methods=['GET'])
+@require_admin_key
+def list_slow_queries():
+    """Most recent statements over ``SLOW_QUERY_MS``, newest first"""
+    return jsonify({'status': api_status(), 'data': slow_queries.entries()})
+
+@admin_bp.route('/admin/quarantine', methods=['GET'])
+@require_admin_key
+def list_quarantine():
+    """Most recent listing records rejected by the ingest quality checks, newest first"""
+    try:
+        limit = int(request.args.get('limit', 100))
+        if not 1 <= limit <= MAX_QUARANTINE_LIMIT:
+            raise ValueError(f'Invalid parameter: limit must be between 1 and {MAX_QUARANTINE_LIMIT}')
+    except ValueError as e:
+        return jsonify({'status': api_status(400, str(e))}), 400
+    return jsonify({'status': api_status(), 'data': recent_quarantine(limit)})
@@ -0,0 +1,104 @@
+import math
+from flask import Blueprint, request, jsonify
+from src.models.token import db, AlertRule
+from src.services.alerts import ALERT_CONDITIONS, ALERT_METRICS, MAX_ALERTS_PER_KEY
+from src.services.container import data_service, get_services
+from src.utils.auth import require_api_key, hash_api_key
+from src.utils.responses import api_status
+
+alerts_bp = Blueprint('alerts', __name__)
+
+@alerts_bp.route('/alerts', methods=['GET'])
+@require_api_key
+def list_alerts():
+    """List the alert rules owned by the calling API key"""
+    try:
+        rules = AlertRule.query.filter_by(
+            api_key_hash=hash_api_key(request.headers['X-API-Key']), is_active=True
+        ).order_by(AlertRule.id).all()
+
+        return jsonify({
+            'status': api_status(credit_count=1),
+            'data': [rule.to_dict() for rule in rules]
+        })
+
+    except Exception as e:
+        return jsonify({'status': api_status(500, str(e))}), 500
+
+@alerts_bp.route('/alerts', methods=['POST'])
+@require_api_key
+def create_alert():
+    """Register an alert rule for the calling API key"""
+    try:
+        body = request.get_json(silent=True) or {}
+        key_hash = hash_api_key(request.headers['X-API-Key'])
+
+        try:
+            metric = body.get('metric')
+            condition = body.get('condition')
+            if metric not in ALERT_METRICS:
+                raise ValueError(f"Invalid parameter: metric must be one of {', '.join(ALERT_METRICS)}")
+            if condition not in ALERT_CONDITIONS:
+                raise ValueError(f"Invalid parameter: condition must be one of {', '.join(ALERT_CONDITIONS)}")
+            try:
+                threshold = float(body.get('threshold'))
+            except (TypeError, ValueError):
+                threshold = None
+            # NaN and infinities never cross and cannot be stored or sent as JSON
+            if threshold is None or not math.isfinite(threshold):
+                raise ValueError('Invalid parameter: threshold must be a number')
+            if not body.get('token_id'):
+                raise ValueError('Field "token_id" is required')
+            active = AlertRule.query.filter_by(api_key_hash=key_hash, is_active=True).count()
+            if active >= MAX_ALERTS_PER_KEY:
+                raise ValueError(f'Invalid parameter: at most {MAX_ALERTS_PER_KEY} alert rules per API key')
+        except ValueError as e:
+            return jsonify({'status': api_status(400, str(e))}), 400
+
+        token_id = data_service.resolve_token_id(str(body['token_id']))
+        if token_id is None:
+            return jsonify({'status': api_status(404, 'Token not found')}), 404
+
+        rule = AlertRule(
+            api_key_hash=key_hash,
+            token_id=token_id,
+            metric=metric,
+            condition=condition,
+            threshold=threshold
+        )
+        db.session.add(rule)
+        db.session.commit()
+        get_services().alert_engine.add(rule)
+
+        return jsonify({
+            'status': api_status(credit_count=1),
+            'data': rule.to_dict()
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': api_status(500, str(e))}), 500
+
+@alerts_bp.route('/alerts/<int:rule_id>', methods=['DELETE'])
+@require_api_key
+def delete_alert(rule_id):
+    """Deactivate one of the calling API key's alert rules"""
+    try:
+        rule = AlertRule.query.filter_by(
+            id=rule_id, api_key_hash=hash_api_key(request.headers['X-API-Key']), is_active=True
+        ).first()
+        if rule is None:
+            return jsonify({'status': api_status(404, 'Alert rule not found')}), 404
+
+        rule.is_active = False
+        db.session.commit()
+        get_services().alert_engine.remove(rule_id)
+
+        return jsonify({
+            'status': api_status(credit_count=1),
+            'data': rule.to_dict()
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': api_status(500, str(e))}), 500
@@ -0,0 +1,48 @@
+from flask import Blueprint, request, jsonify
+from src.services.container import data_service, get_services
+from src.services.dashboard import DASHBOARD_SELECTION, DEFAULT_DASHBOARD_LIMIT, MAX_DASHBOARD_LIMIT
+from src.services.rates import RatesUnavailable
+from src.services.screener import SCREENER_FIELDS
+from src.utils.auth import require_api_key
+from src.utils.responses import api_status
+from src.utils.serialization import parse_fields
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+@dashboard_bp.route('/dashboard/bootstrap', methods=['GET'])
+@require_api_key
+def get_bootstrap():
+    """Everything the dashboard renders on load, from one market snapshot"""
+    try:
+        try:
+            limit = int(request.args.get('limit', DEFAULT_DASHBOARD_LIMIT))
+            if not 1 <= limit <= MAX_DASHBOARD_LIMIT:
+                raise ValueError(f'Invalid parameter: limit must be between 1 and {MAX_DASHBOARD_LIMIT}')
+            selection = parse_fields(request.args.get('fields'), DASHBOARD_SELECTION, SCREENER_FIELDS)
+            convert = data_service.parse_convert(request.args.get('convert'))
+        except RatesUnavailable as e:
+            return jsonify({'status': api_status(503, str(e))}), 503
+        except ValueError as e:
+            return jsonify({'status': api_status(400, str(e))}), 400
+
+        token_id = None
+        identifier = request.args.get('token')
+        if identifier:
+            token_id = data_service.resolve_token_id(identifier)
+            if token_id is None:
+                return jsonify({'status': api_status(404, 'Token not found')}), 404
+
+        services = get_services()
+        snapshot = services.screener.current(data_service)
+        try:
+            view = services.dashboard.get(data_service, snapshot, limit, selection, convert, token_id)
+        except LookupError:
+            return jsonify({'status': api_status(404, 'Token has no market data')}), 404
+
+        return jsonify({
+            'status': api_status(credit_count=1),
+            'data': view
+        })
+
+    except Exception as e:
+        return jsonify({'status': api_status(500, str(e))}), 500
@@ -0,0 +1,142 @@
+from flask import Blueprint, request, jsonify
+import numpy as np
+from src.services.container import data_service, get_services
+from src.services.correlation import CORRELATION_METRICS, CORRELATION_WINDOWS, betas
+from src.services.leaderboards import BOARDS, DEFAULT_MOVERS_LIMIT, MAX_MOVERS_LIMIT, parse_boards
+from src.services.rates import RatesUnavailable
+from src.services.screener import SCREENER_FIELDS, SCREENER_SELECTION
+from src.utils.auth import require_api_key
+from src.utils.responses import api_status
+from src.utils.serialization import parse_fields
+
+market_bp = Blueprint('market', __name__)
+
+# Upper bound on tokens in one correlation matrix response
+MAX_CORRELATION_IDS = 100
+
+# Tokens returned when no ids are given, by market cap
+DEFAULT_CORRELATION_TOKENS = 20
+
+def _rounded(values):
+    return [None if np.isnan(value) else round(float(value), 4) for value in values]
+
+@market_bp.route('/market/correlation', methods=['GET'])
+@require_api_key
+def get_correlation():
+    """Correlation matrix and beta against a benchmark token over a window"""
+    try:
+        identifiers = [value.strip() for value in request.args.get('ids', '').split(',') if value.strip()]
+        window = request.args.get('window', '7d')
+        metric = request.args.get('metric', 'price')
+        benchmark = request.args.get('benchmark', 'BTC')
+
+        try:
+            if window not in CORRELATION_WINDOWS:
+                raise ValueError(f"Invalid parameter: window must be one of {', '.join(CORRELATION_WINDOWS)}")
+            if metric not in CORRELATION_METRICS:
+                raise ValueError(f"Invalid parameter: metric must be one of {', '.join(CORRELATION_METRICS)}")
+            if len(identifiers) > MAX_CORRELATION_IDS:
+                raise ValueError(f'Invalid parameter: at most {MAX_CORRELATION_IDS} ids per request')
+        except ValueError as e:
+            return jsonify({'status': api_status(400, str(e))}), 400
+
+        benchmark_id = data_service.resolve_token_id(benchmark)
+        if benchmark_id is None:
+            return jsonify({'status': api_status(404, 'Benchmark token not found')}), 404
+
+        correlations = get_services().correlations.get(window)
+
+        not_found = []
+        if identifiers:
+            resolved = data_service.resolve_token_ids(identifiers)
+            token_ids = []
+            for identifier in identifiers:
+                token_id = resolved.get(identifier)
+                if token_id in correlations.positions:
+                    token_ids.append(token_id)
+                else:
+                    not_found.append(identifier)
+            token_ids = list(dict.fromkeys(token_ids))
+        else:
+            snapshot = get_services().screener.current(data_service)
+            ranked = snapshot.ids[snapshot.screen()].tolist()
+            token_ids = [token_id for token_id in ranked if token_id in correlations.positions]
+            token_ids = token_ids[:DEFAULT_CORRELATION_TOKENS]
+
+        # Slice the cached universe-wide matrix down to the requested tokens
+        positions = np.array([correlations.positions[token_id] for token_id in token_ids], dtype=np.int64)
+        matrix = correlations.matrices[metric][np.ix_(positions, positions)]
+        observations = correlations.observations(metric, positions)
+        benchmark_position = correlations.positions.get(benchmark_id)
+        if benchmark_position is None:
+            token_betas = [None] * len(token_ids)
+        else:
+            token_betas = _rounded(betas(correlations.returns[metric], benchmark_position)[positions])
+
+        tokens = []
+        for token_id, count, beta in zip(token_ids, observations.tolist(), token_betas):
+            token = dict(correlations.tokens[token_id])
+            token['observations'] = count
+            token['beta'] = beta
+            tokens.append(token)
+
+        bucket = CORRELATION_WINDOWS[window][1]
+        return jsonify({
+            'status': api_status(credit_count=1),
+            'data': {
+                'window': window,
+                'metric': metric,
+                'interval_seconds': int(bucket.total_seconds()),
+                'time_start': correlations.time_start.isoformat() if correlations.time_start else None,
+                'time_end': correlations.time_end.isoformat() if correlations.time_end else None,
+                'benchmark': correlations.tokens.get(benchmark_id, {'id': benchmark_id}),
+                'tokens': tokens,
+                'matrix': [_rounded(row) for row in matrix]
+            },
+            'not_found': not_found
+        })
+
+    except Exception as e:
+        return jsonify({'status': api_status(500, str(e))}), 500
+
+@market_bp.route('/market/movers', methods=['GET'])
+@require_api_key
+def get_movers():
+    """Top gainers, losers and leaders by velocity, volume and market cap"""
+    try:
+        try:
+            boards = parse_boards(request.args.get('board'))
+            limit = int(request.args.get('limit', DEFAULT_MOVERS_LIMIT))
+            if not 1 <= limit <= MAX_MOVERS_LIMIT:
+                raise ValueError(f'Invalid parameter: limit must be between 1 and {MAX_MOVERS_LIMIT}')
+            selection = parse_fields(request.args.get('fields'), SCREENER_SELECTION, SCREENER_FIELDS)
+            convert = data_service.parse_convert(request.args.get('convert'))
+        except RatesUnavailable as e:
+            return jsonify({'status': api_status(503, str(e))}), 503
+        except ValueError as e:
+            return jsonify({'status': api_status(400, str(e))}), 400
+
+        services = get_services()
+        snapshot = services.screener.current(data_service)
+        data = {}
+        for board in boards:
+            positions = services.leaderboards.top(snapshot, board, limit)
+            data[board] = {
+                'metric': BOARDS[board][0],
+                'tokens': data_service.serialize_quote_rows(
+                    snapshot.rows(positions, selection), selection, convert=convert
+                )
+            }
+
+        return jsonify({
+            'status': api_status(credit_count=1),
+            'data': data,
+            'snapshot': {
+                'built_at': snapshot.built_at.isoformat() + 'Z',
+                'last_updated': snapshot.latest.isoformat() if snapshot.latest else None,
+                'token_count': snapshot.size
+            }
+        })
+
+    except Exception as e:
+        return jsonify({'status': api_status(500, str(e))}), 500
@@ -1,13 +1,28 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from sqlalchemy import select
 from src.models.token import db, Token, TokenMetric
-from src.services.data_service import DataService
+from src.services.container import data_service, get_services
+from src.services.export import EXPORT_FORMATS, export_query, parse_export_format, stream_export
+from src.services.rates import RatesUnavailable
+from src.services.screener import SCREENER_FIELDS, SCREENER_SELECTION, parse_filters, parse_sort
 from src.utils.auth import require_api_key
+from src.utils.metrics import elapsed_ms
 from src.utils.pagination import paginate_query
-from datetime import datetime, timedelta
+from src.utils.responses import api_status
+from src.utils.serialization import (
+    TOKEN_FIELDS, QUOTE_FIELDS, LIST_SELECTION, DETAIL_SELECTION, SEARCH_SELECTION,
+    HISTORY_SELECTION, parse_fields
+)
+from datetime import datetime, timedelta, timezone
 import json
 
 tokens_bp = Blueprint('tokens', __name__)
-data_service = DataService()
+
+# Upper bound on identifiers accepted by the batch endpoint
+MAX_BATCH_IDS = 100
+
+# Upper bound on identifiers accepted by the export endpoint
+MAX_EXPORT_IDS = 1000
 
 @tokens_bp.route('/tokens', methods=['GET'])
 @require_api_key
@@ -19,98 +34,29 @@ def get_tokens():
         start = int(request.args.get('start', 1))
         sort_field = request.args.get('sort', 'market_cap')
         sort_dir = request.args.get('sort_dir', 'desc')
-        convert = request.args.get('convert', 'USD')
         min_market_cap = request.args.get('min_market_cap', type=float)
         max_market_cap = request.args.get('max_market_cap', type=float)
-        
-        # Build query
-        query = db.session.query(Token).filter(Token.is_active == True)
-        
-        # Apply market cap filters if provided
-        if min_market_cap or max_market_cap:
-            # Join with latest metrics to filter by market cap
-            latest_metrics_subquery = db.session.query(
-                TokenMetric.token_id,
-                db.func.max(TokenMetric.timestamp).label('latest_timestamp')
-            ).group_by(TokenMetric.token_id).subquery()
-            
-            query = query.join(
-                TokenMetric, Token.id == TokenMetric.token_id
-            ).join(
-                latest_metrics_subquery,
-                db.and_(
-                    TokenMetric.token_id == latest_metrics_subquery.c.token_id,
-                    TokenMetric.timestamp == latest_metrics_subquery.c.latest_timestamp
-                )
-            )
-            
-            if min_market_cap:
-                query = query.filter(TokenMetric.market_cap_usd >= min_market_cap)
-            if max_market_cap:
-                query = query.filter(TokenMetric.market_cap_usd <= max_market_cap)
-        
-        # Apply sorting
-        if sort_field in ['market_cap', 'volume_24h', 'velocity', 'price']:
-            # For metric-based sorting, we need to join with latest metrics
-            if 'TokenMetric' not in str(query):
-                latest_metrics_subquery = db.session.query(
-                    TokenMetric.token_id,
-                    db.func.max(TokenMetric.timestamp).label('latest_timestamp')
-                ).group_by(TokenMetric.token_id).subquery()
-                
-                query = query.join(
-                    TokenMetric, Token.id == TokenMetric.token_id
-                ).join(
-                    latest_metrics_subquery,
-                    db.and_(
-                        TokenMetric.token_id == latest_metrics_subquery.c.token_id,
-                        TokenMetric.timestamp == latest_metrics_subquery.c.latest_timestamp
-                    )
-                )
-            
-            sort_column = getattr(TokenMetric, f"{sort_field}_usd" if sort_field in ['market_cap', 'volume_24h'] else sort_field)
-            if sort_field == 'price':
-                sort_column = TokenMetric.price_usd
-        else:
-            sort_column = getattr(Token, sort_field, Token.id)
-        
-        if sort_dir == 'desc':
-            query = query.order_by(sort_column.desc())
-        else:
-            query = query.order_by(sort_column.asc())
-        
-        # Apply pagination
-        offset = start - 1
-        total_count = query.count()
-        tokens = query.offset(offset).limit(limit).all()
-        
-        # Get latest metrics for each token
-        token_data = []
-        for token in tokens:
-            latest_metric = db.session.query(TokenMetric).filter(
-                TokenMetric.token_id == token.id
-            ).order_by(TokenMetric.timestamp.desc()).first()
-            
-            token_dict = token.to_dict()
-            if latest_metric:
-                token_dict['quote'] = {
-                    convert: {
-                        'price': float(latest_metric.price_usd) if latest_metric.price_usd else None,
-                        'volume_24h': float(latest_metric.volume_24h_usd) if latest_metric.volume_24h_usd else None,
-                        'market_cap': float(latest_metric.market_cap_usd) if latest_metric.market_cap_usd else None,
-                        'percent_change_1h': float(latest_metric.percent_change_1h) if latest_metric.percent_change_1h else None,
-                        'percent_change_24h': float(latest_metric.percent_change_24h) if latest_metric.percent_change_24h else None,
-                        'percent_change_7d': float(latest_metric.percent_change_7d) if latest_metric.percent_change_7d else None,
-                        'velocity': float(latest_metric.velocity) if latest_metric.velocity else None,
-                        'velocity_trend': data_service.calculate_velocity_trend(token.id)
-                    }
+        try:
+            selection = parse_fields(request.args.get('fields'), LIST_SELECTION)
+            convert = data_service.parse_convert(request.args.get('convert'))
+        except RatesUnavailable as e:
+            return jsonify({'status': api_status(503, str(e))}), 503
+        except ValueError as e:
+            return jsonify({
+                'status': {
+                    'timestamp': datetime.utcnow().isoformat() + 'Z',
+                    'error_code': 400,
+                    'error_message': str(e),
+                    'elapsed': elapsed_ms(),
+                    'credit_count': 0
                 }
-                token_dict['last_updated'] = latest_metric.timestamp.isoformat()
-            else:
-                token_dict['quote'] = {convert: {}}
-                token_dict['last_updated'] = None
-            
-            token_data.append(token_dict)
+            }), 400
+        
+        # Identical concurrent requests (e.g. dashboards reloading after a tick) share one execution
+        key = (limit, start, sort_field, sort_dir, min_market_cap, max_market_cap, selection, tuple(convert))
+        total_count, token_data = data_service.flights.do('list_tokens', key, lambda: _list_tokens(
+            limit, start, sort_field, sort_dir, min_market_cap, max_market_cap, selection, convert
+        ))
         
         # Calculate pagination info
         total_pages = (total_count + limit - 1) // limit
@@ -121,7 +67,7 @@ def get_tokens():
                 'timestamp': datetime.utcnow().isoformat() + 'Z',
                 'error_code': 0,
                 'error_message': None,
-                'elapsed': 0,
+                'elapsed': elapsed_ms(),
                 'credit_count': 1
             },
             'data': token_data,
@@ -141,7 +87,116 @@ def get_tokens():
                 'timestamp': datetime.utcnow().isoformat() + 'Z',
                 'error_code': 500,
                 'error_message': str(e),
-                'elapsed': 0,
+                'elapsed': elapsed_ms(),
+                'credit_count': 0
+            }
+        }), 500
+
+def _list_tokens(limit, start, sort_field, sort_dir, min_market_cap, max_market_cap, selection, convert):
+    """Run the token list query; returns ``(total_count, token payloads)``"""
+    # Build query over token rows joined to their latest metric
+    query = data_service.latest_quote_query(selection).where(Token.is_active == True)
+    
+    # Apply market cap filters if provided
+    if min_market_cap is not None:
+        query = query.where(TokenMetric.market_cap_usd >= min_market_cap)
+    if max_market_cap is not None:
+        query = query.where(TokenMetric.market_cap_usd <= max_market_cap)
+    
+    # Apply sorting
+    if sort_field in ['market_cap', 'volume_24h', 'velocity', 'price']:
+        # Metric-based sorting only covers tokens that have metrics
+        query = query.where(TokenMetric.id.isnot(None))
+        sort_column = getattr(TokenMetric, f"{sort_field}_usd" if sort_field in ['market_cap', 'volume_24h'] else sort_field)
+        if sort_field == 'price':
+            sort_column = TokenMetric.price_usd
+    else:
+        sort_column = getattr(Token, sort_field) if sort_field in TOKEN_FIELDS else Token.id
+    
+    if sort_dir == 'desc':
+        query = query.order_by(sort_column.desc())
+    else:
+        query = query.order_by(sort_column.asc())
+    
+    # Apply pagination
+    offset = start - 1
+    total_count = db.session.execute(
+        select(db.func.count()).select_from(query.order_by(None).subquery())
+    ).scalar()
+    rows = db.session.execute(query.offset(offset).limit(limit)).all()
+    
+    token_data = data_service.serialize_quote_rows(rows, selection, convert=convert)
+    
+    return total_count, token_data
+
+@tokens_bp.route('/tokens/batch', methods=['GET'])
+@require_api_key
+def get_tokens_batch():
+    """Get several tokens by CMC id, symbol or slug in one request"""
+    try:
+        identifiers = [value.strip() for value in request.args.get('ids', '').split(',') if value.strip()]
+        
+        try:
+            if not identifiers:
+                raise ValueError('Query parameter "ids" is required')
+            if len(identifiers) > MAX_BATCH_IDS:
+                raise ValueError(f'Invalid parameter: at most {MAX_BATCH_IDS} ids per request')
+            selection = parse_fields(request.args.get('fields'), LIST_SELECTION)
+            convert = data_service.parse_convert(request.args.get('convert'))
+        except RatesUnavailable as e:
+            return jsonify({'status': api_status(503, str(e))}), 503
+        except ValueError as e:
+            return jsonify({
+                'status': {
+                    'timestamp': datetime.utcnow().isoformat() + 'Z',
+                    'error_code': 400,
+                    'error_message': str(e),
+                    'elapsed': elapsed_ms(),
+                    'credit_count': 0
+                }
+            }), 400
+        
+        # Resolve every identifier with one query, then load all tokens with one more
+        resolved = data_service.resolve_token_ids(identifiers)
+        rows = db.session.execute(
+            data_service.latest_quote_query(selection).where(Token.id.in_(set(resolved.values())))
+        ).all() if resolved else []
+        
+        payloads = dict(zip(
+            (row[0] for row in rows),
+            data_service.serialize_quote_rows(rows, selection, convert=convert)
+        ))
+        
+        token_data = []
+        not_found = []
+        for identifier in identifiers:
+            token_id = resolved.get(identifier)
+            if token_id is None:
+                not_found.append(identifier)
+            else:
+                token_data.append(payloads[token_id])
+        
+        response = {
+            'status': {
+                'timestamp': datetime.utcnow().isoformat() + 'Z',
+                'error_code': 0,
+                'error_message': None,
+                'elapsed': elapsed_ms(),
+                'credit_count': 1
+            },
+            'data': token_data,
+            'not_found': not_found
+        }
+        
+        return jsonify(response)
+        
+    except Exception as e:
+        return jsonify({
+            'status': {
+                'timestamp': datetime.utcnow().isoformat() + 'Z',
+                'error_code': 500,
+                'error_message': str(e),
+                'elapsed': elapsed_ms(),
                 'credit_count': 0
             }
         }), 500
@@ -151,66 +206,49 @@ def get_tokens():
 def get_token_details(token_id):
     """Get detailed information about a specific token"""
     try:
-        convert = request.args.get('convert', 'USD')
         include_history = request.args.get('include_history', 'false').lower() == 'true'
+        try:
+            selection = parse_fields(request.args.get('fields'), DETAIL_SELECTION)
+            convert = data_service.parse_convert(request.args.get('convert'))
+        except RatesUnavailable as e:
+            return jsonify({'status': api_status(503, str(e))}), 503
+        except ValueError as e:
+            return jsonify({
+                'status': {
+                    'timestamp': datetime.utcnow().isoformat() + 'Z',
+                    'error_code': 400,
+                    'error_message': str(e),
+                    'elapsed': elapsed_ms(),
+                    'credit_count': 0
+                }
+            }), 400
         
         # Find token by ID, symbol, or slug
-        token = None
-        if token_id.isdigit():
-            token = Token.query.filter_by(cmc_id=int(token_id)).first()
-        if not token:
-            token = Token.query.filter_by(symbol=token_id.upper()).first()
-        if not token:
-            token = Token.query.filter_by(slug=token_id.lower()).first()
-        
-        if not token:
+        internal_id = data_service.resolve_token_id(token_id)
+        
+        if internal_id is None:
             return jsonify({
                 'status': {
                     'timestamp': datetime.utcnow().isoformat() + 'Z',
                     'error_code': 404,
                     'error_message': 'Token not found',
-                    'elapsed': 0,
+                    'elapsed': elapsed_ms(),
                     'credit_count': 0
                 }
             }), 404
         
-        # Get latest metrics
-        latest_metric = db.session.query(TokenMetric).filter(
-            TokenMetric.token_id == token.id
-        ).order_by(TokenMetric.timestamp.desc()).first()
-        
-        token_dict = token.to_dict()
-        if latest_metric:
-            token_dict['quote'] = {
-                convert: {
-                    'price': float(latest_metric.price_usd) if latest_metric.price_usd else None,
-                    'volume_24h': float(latest_metric.volume_24h_usd) if latest_metric.volume_24h_usd else None,
-                    'market_cap': float(latest_metric.market_cap_usd) if latest_metric.market_cap_usd else None,
-                    'circulating_supply': float(latest_metric.circulating_supply) if latest_metric.circulating_supply else None,
-                    'total_supply': float(latest_metric.total_supply) if latest_metric.total_supply else None,
-                    'max_supply': float(latest_metric.max_supply) if latest_metric.max_supply else None,
-                    'percent_change_1h': float(latest_metric.percent_change_1h) if latest_metric.percent_change_1h else None,
-                    'percent_change_24h': float(latest_metric.percent_change_24h) if latest_metric.percent_change_24h else None,
-                    'percent_change_7d': float(latest_metric.percent_change_7d) if latest_metric.percent_change_7d else None,
-                    'velocity': float(latest_metric.velocity) if latest_metric.velocity else None,
-                    'velocity_trend': data_service.calculate_velocity_trend(token.id),
-                    'velocity_1h': float(latest_metric.velocity_1h) if latest_metric.velocity_1h else None,
-                    'velocity_4h': float(latest_metric.velocity_4h) if latest_metric.velocity_4h else None,
-                    'velocity_12h': float(latest_metric.velocity_12h) if latest_metric.velocity_12h else None,
-                    'velocity_7d': float(latest_metric.velocity_7d) if latest_metric.velocity_7d else None
-                }
-            }
-            token_dict['last_updated'] = latest_metric.timestamp.isoformat()
-        else:
-            token_dict['quote'] = {convert: {}}
-            token_dict['last_updated'] = None
+        # Token row with its latest metrics
+        rows = db.session.execute(
+            data_service.latest_quote_query(selection).where(Token.id == internal_id)
+        ).all()
+        token_dict = data_service.serialize_quote_rows(rows[:1], selection, convert=convert)[0]
         
         response = {
             'status': {
                 'timestamp': datetime.utcnow().isoformat() + 'Z',
                 'error_code': 0,
                 'error_message': None,
-                'elapsed': 0,
+                'elapsed': elapsed_ms(),
                 'credit_count': 1
             },
             'data': token_dict
@@ -224,7 +262,7 @@ def get_token_details(token_id):
                 'timestamp': datetime.utcnow().isoformat() + 'Z',
                 'error_code': 500,
                 'error_message': str(e),
-                'elapsed': 0,
+                'elapsed': elapsed_ms(),
                 'credit_count': 0
             }
         }), 500
@@ -238,34 +276,28 @@ def get_token_velocity(token_id):
         include_trend = request.args.get('include_trend', 'true').lower() == 'true'
         
         # Find token
-        token = None
-        if token_id.isdigit():
-            token = Token.query.filter_by(cmc_id=int(token_id)).first()
-        if not token:
-            token = Token.query.filter_by(symbol=token_id.upper()).first()
-        if not token:
-            token = Token.query.filter_by(slug=token_id.lower()).first()
-        
-        if not token:
+        internal_id = data_service.resolve_token_id(token_id)
+        
+        if internal_id is None:
             return jsonify({
                 'status': {
                     'timestamp': datetime.utcnow().isoformat() + 'Z',
                     'error_code': 404,
                     'error_message': 'Token not found',
-                    'elapsed': 0,
+                    'elapsed': elapsed_ms(),
                     'credit_count': 0
                 }
             }), 404
         
         # Get velocity metrics
-        velocity_data = data_service.get_velocity_metrics(token.id, timeframe, include_trend)
+        velocity_data = data_service.get_velocity_metrics(internal_id, timeframe, include_trend)
         
         response = {
             'status': {
                 'timestamp': datetime.utcnow().isoformat() + 'Z',
                 'error_code': 0,
                 'error_message': None,
-                'elapsed': 0,
+                'elapsed': elapsed_ms(),
                 'credit_count': 1
             },
             'data': velocity_data
@@ -279,11 +311,157 @@ def get_token_velocity(token_id):
                 'timestamp': datetime.utcnow().isoformat() + 'Z',
                 'error_code': 500,
                 'error_message': str(e),
-                'elapsed': 0,
+                'elapsed': elapsed_ms(),
+                'credit_count': 0
+            }
+        }), 500
+
+@tokens_bp.route('/tokens/<token_id>/history', methods=['GET'])
+@require_api_key
+def get_token_history(token_id):
+    """Get historical quotes for a specific token"""
+    try:
+        interval = request.args.get('interval', '1d')
+        
+        try:
+            selection = parse_fields(request.args.get('fields'), HISTORY_SELECTION, allowed=tuple(QUOTE_FIELDS))
+            convert = data_service.parse_convert(request.args.get('convert'))
+            if interval not in data_service.HISTORY_INTERVALS:
+                raise ValueError(f"Invalid parameter: interval must be one of {', '.join(data_service.HISTORY_INTERVALS)}")
+            time_end = _parse_time(request.args.get('time_end')) or datetime.utcnow()
+            time_start = _parse_time(request.args.get('time_start')) or time_end - timedelta(days=30)
+        except RatesUnavailable as e:
+            return jsonify({'status': api_status(503, str(e))}), 503
+        except ValueError as e:
+            return jsonify({
+                'status': {
+                    'timestamp': datetime.utcnow().isoformat() + 'Z',
+                    'error_code': 400,
+                    'error_message': str(e),
+                    'elapsed': elapsed_ms(),
+                    'credit_count': 0
+                }
+            }), 400
+        
+        # Find token
+        internal_id = data_service.resolve_token_id(token_id)
+        
+        if internal_id is None:
+            return jsonify({
+                'status': {
+                    'timestamp': datetime.utcnow().isoformat() + 'Z',
+                    'error_code': 404,
+                    'error_message': 'Token not found',
+                    'elapsed': elapsed_ms(),
+                    'credit_count': 0
+                }
+            }), 404
+        
+        quotes = data_service.get_token_history(
+            internal_id, time_start, time_end, interval, selection, convert=convert
+        )
+        
+        response = {
+            'status': {
+                'timestamp': datetime.utcnow().isoformat() + 'Z',
+                'error_code': 0,
+                'error_message': None,
+                'elapsed': elapsed_ms(),
+                'credit_count': 1
+            },
+            'data': {
+                'token_id': internal_id,
+                'interval': interval,
+                'quotes': quotes
+            }
+        }
+        
+        return jsonify(response)
+        
+    except Exception as e:
+        return jsonify({
+            'status': {
+                'timestamp': datetime.utcnow().isoformat() + 'Z',
+                'error_code': 500,
+                'error_message': str(e),
+                'elapsed': elapsed_ms(),
+                'credit_count': 0
+            }
+        }), 500
+
+@tokens_bp.route('/tokens/export', methods=['GET'])
+@require_api_key
+def export_metrics():
+    """Stream historical metrics as NDJSON, CSV or Parquet"""
+    try:
+        identifiers = [value.strip() for value in request.args.get('ids', '').split(',') if value.strip()]
+        
+        try:
+            if len(identifiers) > MAX_EXPORT_IDS:
+                raise ValueError(f'Invalid parameter: at most {MAX_EXPORT_IDS} ids per export')
+            export_format = parse_export_format(request.args.get('format'))
+            selection = parse_fields(request.args.get('fields'), DETAIL_SELECTION, allowed=tuple(QUOTE_FIELDS))
+            time_end = _parse_time(request.args.get('time_end')) or datetime.utcnow()
+            time_start = _parse_time(request.args.get('time_start')) or time_end - timedelta(days=30)
+        except ValueError as e:
+            return jsonify({
+                'status': {
+                    'timestamp': datetime.utcnow().isoformat() + 'Z',
+                    'error_code': 400,
+                    'error_message': str(e),
+                    'elapsed': elapsed_ms(),
+                    'credit_count': 0
+                }
+            }), 400
+        
+        token_ids = None
+        if identifiers:
+            resolved = data_service.resolve_token_ids(identifiers)
+            not_found = [identifier for identifier in identifiers if identifier not in resolved]
+            if not_found:
+                return jsonify({
+                    'status': {
+                        'timestamp': datetime.utcnow().isoformat() + 'Z',
+                        'error_code': 404,
+                        'error_message': f"Token not found: {', '.join(not_found)}",
+                        'elapsed': elapsed_ms(),
+                        'credit_count': 0
+                    }
+                }), 404
+            token_ids = set(resolved.values())
+        
+        query = export_query(token_ids, time_start, time_end, selection.quote_fields)
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        
+        return Response(
+            stream_with_context(stream_export(query, selection.quote_fields, export_format)),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename=token_metrics.{extension}'}
+        )
+        
+    except Exception as e:
+        return jsonify({
+            'status': {
+                'timestamp': datetime.utcnow().isoformat() + 'Z',
+                'error_code': 500,
+                'error_message': str(e),
+                'elapsed': elapsed_ms(),
                 'credit_count': 0
             }
         }), 500
 
+def _parse_time(value):
+    """Parse an ISO 8601 query parameter into a naive UTC datetime"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"Invalid parameter: '{value}' is not an ISO 8601 date")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
 @tokens_bp.route('/tokens/search', methods=['GET'])
 @require_api_key
 def search_tokens():
@@ -291,6 +469,18 @@ def search_tokens():
     try:
         query_param = request.args.get('q', '').strip()
         limit = min(int(request.args.get('limit', 10)), 100)
+        try:
+            selection = parse_fields(request.args.get('fields'), SEARCH_SELECTION)
+        except ValueError as e:
+            return jsonify({
+                'status': {
+                    'timestamp': datetime.utcnow().isoformat() + 'Z',
+                    'error_code': 400,
+                    'error_message': str(e),
+                    'elapsed': elapsed_ms(),
+                    'credit_count': 0
+                }
+            }), 400
         
         if not query_param:
             return jsonify({
@@ -298,49 +488,33 @@ def search_tokens():
                     'timestamp': datetime.utcnow().isoformat() + 'Z',
                     'error_code': 400,
                     'error_message': 'Query parameter "q" is required',
-                    'elapsed': 0,
+                    'elapsed': elapsed_ms(),
                     'credit_count': 0
                 }
             }), 400
         
         # Search tokens by name or symbol
-        tokens = Token.query.filter(
-            db.and_(
-                Token.is_active == True,
-                db.or_(
-                    Token.name.ilike(f'%{query_param}%'),
-                    Token.symbol.ilike(f'%{query_param}%'),
-                    Token.slug.ilike(f'%{query_param}%')
+        rows = db.session.execute(
+            data_service.latest_quote_query(selection).where(
+                db.and_(
+                    Token.is_active == True,
+                    db.or_(
+                        Token.name.ilike(f'%{query_param}%'),
+                        Token.symbol.ilike(f'%{query_param}%'),
+                        Token.slug.ilike(f'%{query_param}%')
+                    )
                 )
-            )
-        ).limit(limit).all()
+            ).limit(limit)
+        ).all()
         
-        token_data = []
-        for token in tokens:
-            latest_metric = db.session.query(TokenMetric).filter(
-                TokenMetric.token_id == token.id
-            ).order_by(TokenMetric.timestamp.desc()).first()
-            
-            token_dict = token.to_dict()
-            if latest_metric:
-                token_dict['quote'] = {
-                    'USD': {
-                        'price': float(latest_metric.price_usd) if latest_metric.price_usd else None,
-                        'market_cap': float(latest_metric.market_cap_usd) if latest_metric.market_cap_usd else None,
-                        'velocity': float(latest_metric.velocity) if latest_metric.velocity else None
-                    }
-                }
-            else:
-                token_dict['quote'] = {'USD': {}}
-            
-            token_data.append(token_dict)
+        token_data = data_service.serialize_quote_rows(rows, selection)
         
         response = {
             'status': {
                 'timestamp': datetime.utcnow().isoformat() + 'Z',
                 'error_code': 0,
                 'error_message': None,
-                'elapsed': 0,
+                'elapsed': elapsed_ms(),
                 'credit_count': 1
             },
             'data': token_data
@@ -354,8 +528,79 @@ def search_tokens():
                 'timestamp': datetime.utcnow().isoformat() + 'Z',
                 'error_code': 500,
                 'error_message': str(e),
-                'elapsed': 0,
+                'elapsed': elapsed_ms(),
                 'credit_count': 0
             }
         }), 500
 
+@tokens_bp.route('/tokens/screener', methods=['GET'])
+@require_api_key
+def screen_tokens():
+    """Filter and rank active tokens against the in-memory market snapshot"""
+    try:
+        try:
+            limit = min(int(request.args.get('limit', 100)), 1000)
+            start = int(request.args.get('start', 1))
+            if limit < 1 or start < 1:
+                raise ValueError('Invalid parameter: start and limit must be positive')
+            filters = parse_filters(request.args.getlist('filter'))
+            sort = parse_sort(request.args.get('sort'))
+            selection = parse_fields(request.args.get('fields'), SCREENER_SELECTION, SCREENER_FIELDS)
+            convert = data_service.parse_convert(request.args.get('convert'))
+        except RatesUnavailable as e:
+            return jsonify({'status': api_status(503, str(e))}), 503
+        except ValueError as e:
+            return jsonify({
+                'status': {
+                    'timestamp': datetime.utcnow().isoformat() + 'Z',
+                    'error_code': 400,
+                    'error_message': str(e),
+                    'elapsed': elapsed_ms(),
+                    'credit_count': 0
+                }
+            }), 400
+        
+        # Filtering and sorting are array operations; no SQL unless the snapshot is stale
+        snapshot = get_services().screener.current(data_service)
+        positions = snapshot.screen(filters, sort)
+        total_count = len(positions)
+        page = positions[start - 1:start - 1 + limit]
+        
+        token_data = data_service.serialize_quote_rows(
+            snapshot.rows(page, selection), selection, convert=convert
+        )
+        
+        response = {
+            'status': {
+                'timestamp': datetime.utcnow().isoformat() + 'Z',
+                'error_code': 0,
+                'error_message': None,
+                'elapsed': elapsed_ms(),
+                'credit_count': 1
+            },
+            'data': token_data,
+            'pagination': {
+                'total_count': total_count,
+                'page': (start + limit - 1) // limit,
+                'per_page': limit,
+                'total_pages': (total_count + limit - 1) // limit
+            },
+            'snapshot': {
+                'built_at': snapshot.built_at.isoformat() + 'Z',
+                'last_updated': snapshot.latest.isoformat() if snapshot.latest else None,
+                'token_count': snapshot.size
+            }
+        }
+        
+        return jsonify(response)
+        
+    except Exception as e:
+        return jsonify({
+            'status': {
+                'timestamp': datetime.utcnow().isoformat() + 'Z',
+                'error_code': 500,
+                'error_message': str(e),
+                'elapsed': elapsed_ms(),
+                'credit_count': 0
+            }
+        }), 500
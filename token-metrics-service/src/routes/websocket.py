@@ -1,13 +1,26 @@
-from flask import Blueprint
-from flask_socketio import emit, join_room, leave_room, disconnect
-from src.services.data_service import DataService
+from flask import Blueprint, request
+from flask_socketio import emit as _socket_emit, join_room, leave_room, disconnect
+from src.services.alerts import alert_room
+from src.services.container import data_service, get_services
+from src.services.dashboard import parse_version, version_of
+from src.services.subscriptions import SubscriptionLimitError, token_room
+from src.utils.auth import hash_api_key
+from src.utils.metrics import WEBSOCKET_CONNECTIONS, count_emit
+from src.utils.profiling import forget_socket, opt_in_socket, profiled_event
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 socketio_bp = Blueprint('websocket', __name__)
-data_service = DataService()
 
-# Store active subscriptions
-active_subscriptions = {}
+# Upper bound on tokens accepted by one subscribe_tokens event
+MAX_BATCH_SUBSCRIPTIONS = 100
+
+def emit(event, *args, **kwargs):
+    """``flask_socketio.emit`` that counts emitted events"""
+    count_emit(event)
+    return _socket_emit(event, *args, **kwargs)
 
 @socketio_bp.route('/socket.io/')
 def handle_connect(auth):
@@ -20,40 +33,55 @@ def handle_connect(auth):
             return False
         
         # TODO: Validate API key against database
-        print(f"WebSocket client connected with API key: {api_key[:8]}...")
+        logger.info("WebSocket client connected", extra={'api_key_prefix': api_key[:8]})
+        # Alert rules and subscription limits are owned per API key
+        api_key_hash = hash_api_key(api_key)
+        join_room(alert_room(api_key_hash))
+        get_services().subscriptions.connect(request.sid, api_key_hash)
+        opt_in_socket(request.sid, api_key, auth)
         emit('connected', {'status': 'Connected to Token Metrics Service'})
+        WEBSOCKET_CONNECTIONS.inc()
         return True
         
     except Exception as e:
-        print(f"WebSocket connection error: {e}")
+        logger.exception("WebSocket connection error")
         disconnect()
         return False
 
 def handle_disconnect():
     """Handle WebSocket disconnection"""
     try:
-        # Clean up subscriptions for this client
-        # TODO: Implement subscription cleanup
-        print("WebSocket client disconnected")
+        # Socket.IO drops the client's rooms; drop its registry entries too
+        get_services().subscriptions.disconnect(request.sid)
+        forget_socket(request.sid)
+        WEBSOCKET_CONNECTIONS.dec()
+        logger.info("WebSocket client disconnected")
     except Exception as e:
-        print(f"WebSocket disconnection error: {e}")
+        logger.exception("WebSocket disconnection error")
+
+def _changed(payload, since_version):
+    """Whether a token payload is newer than a client's bootstrap version"""
+    return since_version is None or version_of(payload['timestamp']) > since_version
 
 def handle_subscribe_token(data):
     """Handle token subscription request"""
     try:
         token_id = data.get('token_id')
         metrics = data.get('metrics', ['price', 'volume', 'velocity'])
+        since_version = parse_version(data.get('since_version'))
         
         if not token_id:
             emit('error', {'message': 'token_id is required'})
             return
         
-        # Join room for this token
-        room_name = f"token_{token_id}"
-        join_room(room_name)
+        # Rooms are keyed by internal id, whichever identifier the client used
+        resolved = data_service.resolve_token_id(str(token_id))
+        if resolved is None:
+            emit('error', {'message': f'Token not found: {token_id}'})
+            return
         
-        # Store subscription info
-        # TODO: Implement subscription storage
+        get_services().subscriptions.subscribe(request.sid, [resolved])
+        join_room(token_room(resolved))
         
         emit('subscribed', {
             'token_id': token_id,
@@ -61,14 +89,91 @@ def handle_subscribe_token(data):
             'status': 'Successfully subscribed to token updates'
         })
         
-        # Send initial data
-        token_data = data_service.get_token_data(token_id)
-        if token_data:
+        # Send initial data, unless the client already holds it from a bootstrap
+        token_data = data_service.get_socket_payloads({resolved}).get(resolved)
+        if token_data and _changed(token_data, since_version):
             emit('token_update', token_data)
         
+    except SubscriptionLimitError as e:
+        emit('error', {'message': str(e)})
     except Exception as e:
         emit('error', {'message': f'Subscription error: {str(e)}'})
 
+def handle_subscribe_tokens(data):
+    """Handle subscription to several tokens with a single snapshot frame"""
+    try:
+        token_ids = data.get('token_ids') if data else None
+        metrics = data.get('metrics', ['price', 'volume', 'velocity']) if data else None
+        since_version = parse_version(data.get('since_version')) if data else None
+        
+        if not token_ids or not isinstance(token_ids, list):
+            emit('error', {'message': 'token_ids must be a non-empty list'})
+            return
+        
+        if len(token_ids) > MAX_BATCH_SUBSCRIPTIONS:
+            emit('error', {'message': f'At most {MAX_BATCH_SUBSCRIPTIONS} token_ids per subscription'})
+            return
+        
+        token_ids = [str(token_id) for token_id in token_ids]
+        resolved = data_service.resolve_token_ids(token_ids)
+        
+        # Register first so a rejected batch joins no rooms
+        get_services().subscriptions.subscribe(request.sid, resolved.values())
+        for internal_id in set(resolved.values()):
+            join_room(token_room(internal_id))
+        
+        emit('subscribed', {
+            'token_ids': token_ids,
+            'metrics': metrics,
+            'status': 'Successfully subscribed to token updates'
+        })
+        
+        # Send the initial data for every token as one frame
+        payloads = data_service.get_socket_payloads(set(resolved.values()))
+        snapshot = {
+            token_id: payloads[resolved[token_id]]
+            for token_id in token_ids if resolved.get(token_id) in payloads
+        }
+        # Tokens unchanged since the client's bootstrap version are only listed
+        emit('token_snapshot', {
+            'tokens': [
+                snapshot[token_id] for token_id in token_ids
+                if token_id in snapshot and _changed(snapshot[token_id], since_version)
+            ],
+            'unchanged': [
+                token_id for token_id in token_ids
+                if token_id in snapshot and not _changed(snapshot[token_id], since_version)
+            ],
+            'not_found': [token_id for token_id in token_ids if token_id not in snapshot]
+        })
+        
+    except SubscriptionLimitError as e:
+        emit('error', {'message': str(e)})
+    except Exception as e:
+        emit('error', {'message': f'Subscription error: {str(e)}'})
+
+def handle_unsubscribe_tokens(data):
+    """Handle unsubscription from several tokens"""
+    try:
+        token_ids = data.get('token_ids') if data else None
+        
+        if not token_ids or not isinstance(token_ids, list):
+            emit('error', {'message': 'token_ids must be a non-empty list'})
+            return
+        
+        token_ids = [str(token_id) for token_id in token_ids]
+        resolved = data_service.resolve_token_ids(token_ids)
+        for internal_id in get_services().subscriptions.unsubscribe(request.sid, resolved.values()):
+            leave_room(token_room(internal_id))
+        
+        emit('unsubscribed', {
+            'token_ids': token_ids,
+            'status': 'Successfully unsubscribed from token updates'
+        })
+        
+    except Exception as e:
+        emit('error', {'message': f'Unsubscription error: {str(e)}'})
+
 def handle_unsubscribe_token(data):
     """Handle token unsubscription request"""
     try:
@@ -78,12 +183,11 @@ def handle_unsubscribe_token(data):
             emit('error', {'message': 'token_id is required'})
             return
         
-        # Leave room for this token
-        room_name = f"token_{token_id}"
-        leave_room(room_name)
-        
-        # Remove subscription info
-        # TODO: Implement subscription removal
+        # Leave the canonical room for this token
+        resolved = data_service.resolve_token_id(str(token_id))
+        if resolved is not None:
+            for internal_id in get_services().subscriptions.unsubscribe(request.sid, [resolved]):
+                leave_room(token_room(internal_id))
         
         emit('unsubscribed', {
             'token_id': token_id,
@@ -96,6 +200,8 @@ def handle_unsubscribe_token(data):
 def handle_subscribe_market(data):
     """Handle market-wide subscription request"""
     try:
+        since_version = parse_version(data.get('since_version')) if data else None
+        
         # Join market updates room
         join_room('market_updates')
         
@@ -103,7 +209,11 @@ def handle_subscribe_market(data):
             'status': 'Successfully subscribed to market updates'
         })
         
-        # Send initial market data
+        # Send initial market data, unless a bootstrap at the current tick already carried it
+        if since_version is not None:
+            latest = get_services().screener.current(data_service).latest
+            if version_of(latest) <= since_version:
+                return
         market_data = data_service.get_market_overview()
         if market_data:
             emit('market_update', market_data)
@@ -124,13 +234,19 @@ def handle_unsubscribe_market():
     except Exception as e:
         emit('error', {'message': f'Market unsubscription error: {str(e)}'})
 
+def notify_profile(profile_id):
+    """Tell a profiling connection where the profile of its last event is"""
+    emit('profile', {'event': request.event['message'], 'profile_id': profile_id})
+
 # Register event handlers
 def register_socketio_events(socketio):
     """Register all WebSocket event handlers"""
     socketio.on_event('connect', handle_connect)
     socketio.on_event('disconnect', handle_disconnect)
-    socketio.on_event('subscribe_token', handle_subscribe_token)
-    socketio.on_event('unsubscribe_token', handle_unsubscribe_token)
-    socketio.on_event('subscribe_market', handle_subscribe_market)
-    socketio.on_event('unsubscribe_market', handle_unsubscribe_market)
+    socketio.on_event('subscribe_token', profiled_event(handle_subscribe_token, notify_profile))
+    socketio.on_event('unsubscribe_token', profiled_event(handle_unsubscribe_token, notify_profile))
+    socketio.on_event('subscribe_tokens', profiled_event(handle_subscribe_tokens, notify_profile))
+    socketio.on_event('unsubscribe_tokens', profiled_event(handle_unsubscribe_tokens, notify_profile))
+    socketio.on_event('subscribe_market', profiled_event(handle_subscribe_market, notify_profile))
+    socketio.on_event('unsubscribe_market', profiled_event(handle_unsubscribe_market, notify_profile))
 
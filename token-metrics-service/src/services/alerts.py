@@ -0,0 +1,216 @@
+"""Per-API-key alert rules evaluated once per ingest tick.
+
+Rules fire on transitions: ``above`` when a metric moves from at or below
+the threshold to above it, ``below`` for the opposite move, and
+``crosses`` for either. Each (token, metric) pair keeps its rules in
+threshold-sorted arrays. A tick that moves a value from ``previous`` to
+``current`` therefore finds the crossed rules with two bisections. The
+cost is proportional to the number of crossings, not the number of rules.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from sqlalchemy import update
+from src.models.token import db, Token, AlertRule
+from src.utils.serialization import LIST_QUOTE_FIELDS, FieldSelection
+
+ALERT_METRICS = LIST_QUOTE_FIELDS
+ALERT_CONDITIONS = ('above', 'below', 'crosses')
+
+# Upper bound on active rules per API key
+MAX_ALERTS_PER_KEY = 100
+
+_ALERT_SELECTION = FieldSelection(('cmc_id', 'symbol'), ALERT_METRICS, False, False)
+
+
+def alert_room(api_key_hash):
+    """Socket.IO room joined by every connection of one API key"""
+    return f'alerts_{api_key_hash}'
+
+
+class _SortedThresholds:
+    """Parallel arrays of thresholds and rule ids, ordered by threshold"""
+
+    __slots__ = ('thresholds', 'rule_ids')
+
+    def __init__(self):
+        self.thresholds = []
+        self.rule_ids = []
+
+    def add(self, threshold, rule_id):
+        position = bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(position, threshold)
+        self.rule_ids.insert(position, rule_id)
+
+    def remove(self, threshold, rule_id):
+        position = bisect_left(self.thresholds, threshold)
+        while position < len(self.thresholds) and self.thresholds[position] == threshold:
+            if self.rule_ids[position] == rule_id:
+                del self.thresholds[position]
+                del self.rule_ids[position]
+                return
+            position += 1
+
+    def __len__(self):
+        return len(self.thresholds)
+
+
+class ThresholdIndex:
+    """Rules for one (token, metric) pair, split by crossing direction"""
+
+    __slots__ = ('rising', 'falling')
+
+    def __init__(self):
+        self.rising = _SortedThresholds()   # 'above' and 'crosses'
+        self.falling = _SortedThresholds()  # 'below' and 'crosses'
+
+    def _sides(self, condition):
+        if condition == 'above':
+            return (self.rising,)
+        if condition == 'below':
+            return (self.falling,)
+        return (self.rising, self.falling)
+
+    def add(self, rule):
+        for side in self._sides(rule['condition']):
+            side.add(rule['threshold'], rule['id'])
+
+    def remove(self, rule):
+        for side in self._sides(rule['condition']):
+            side.remove(rule['threshold'], rule['id'])
+
+    def crossed(self, previous, current):
+        """Ids of rules whose threshold lies between ``previous`` and ``current``"""
+        if current > previous:
+            side = self.rising
+            # previous <= threshold < current
+            start = bisect_left(side.thresholds, previous)
+            end = bisect_left(side.thresholds, current)
+        elif current < previous:
+            side = self.falling
+            # current < threshold <= previous
+            start = bisect_right(side.thresholds, current)
+            end = bisect_right(side.thresholds, previous)
+        else:
+            return []
+        return side.rule_ids[start:end]
+
+    def __len__(self):
+        return len(self.rising) + len(self.falling)
+
+
+class AlertEngine:
+    """In-memory index over all active rules, loaded from the database once"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rules = {}
+        self._indexes = {}
+        self._last_values = {}
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        rules = db.session.query(AlertRule).filter(AlertRule.is_active == True).all()
+        with self._lock:
+            if not self._loaded:
+                for rule in rules:
+                    self._add(rule)
+                self._loaded = True
+
+    def _add(self, rule):
+        if rule.id in self._rules:
+            return
+        entry = {
+            'id': rule.id,
+            'api_key_hash': rule.api_key_hash,
+            'token_id': rule.token_id,
+            'metric': rule.metric,
+            'condition': rule.condition,
+            'threshold': rule.threshold
+        }
+        self._rules[rule.id] = entry
+        self._indexes.setdefault((rule.token_id, rule.metric), ThresholdIndex()).add(entry)
+
+    def add(self, rule):
+        """Index a newly committed ``AlertRule``"""
+        self._ensure_loaded()
+        with self._lock:
+            self._add(rule)
+
+    def remove(self, rule_id):
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._rules.pop(rule_id, None)
+            if entry is None:
+                return
+            key = (entry['token_id'], entry['metric'])
+            index = self._indexes[key]
+            index.remove(entry)
+            if not len(index):
+                del self._indexes[key]
+
+    def evaluate(self, values, timestamp=None):
+        """Match ``{token_id: {metric: value, ...}}`` against the index.
+
+        Returns ``[(api_key_hash, alert payload)]`` for every rule crossed
+        since the previous evaluation. The first value seen for a pair only
+        primes it.
+        """
+        timestamp = timestamp or datetime.utcnow()
+        alerts = []
+        with self._lock:
+            for (token_id, metric), index in self._indexes.items():
+                token_values = values.get(token_id)
+                current = token_values.get(metric) if token_values else None
+                if current is None:
+                    continue
+                previous = self._last_values.get((token_id, metric))
+                self._last_values[(token_id, metric)] = current
+                if previous is None:
+                    continue
+
+                for rule_id in index.crossed(previous, current):
+                    rule = self._rules[rule_id]
+                    alerts.append((rule['api_key_hash'], {
+                        'rule_id': rule_id,
+                        'token_id': token_id,
+                        'cmc_id': token_values.get('cmc_id'),
+                        'symbol': token_values.get('symbol'),
+                        'metric': metric,
+                        'condition': rule['condition'],
+                        'threshold': rule['threshold'],
+                        'previous': previous,
+                        'value': current,
+                        'timestamp': timestamp.isoformat()
+                    }))
+        return alerts
+
+    def evaluate_latest(self, data_service):
+        """Evaluate the latest stored metrics of every watched token"""
+        self._ensure_loaded()
+        with self._lock:
+            token_ids = {token_id for token_id, _ in self._indexes}
+        if not token_ids:
+            return []
+
+        rows = db.session.execute(
+            data_service.latest_quote_query(_ALERT_SELECTION).where(Token.id.in_(token_ids))
+        )
+        keys = ('cmc_id', 'symbol') + ALERT_METRICS
+        values = {row[0]: dict(zip(keys, row[1:-1])) for row in rows if row[-1] is not None}
+
+        now = datetime.utcnow()
+        alerts = self.evaluate(values, now)
+        if alerts:
+            db.session.execute(
+                update(AlertRule)
+                .where(AlertRule.id.in_({payload['rule_id'] for _, payload in alerts}))
+                .values(last_triggered_at=now)
+            )
+            db.session.commit()
+        return alerts
+
+    def __len__(self):
+        return len(self._rules)
@@ -0,0 +1,403 @@
+"""Resumable backfill of historical quotes into ``token_metrics``.
+
+A fresh deployment has no history, so the 1h-7d velocity windows stay
+empty and trends report ``insufficient_data`` until enough ticks have been
+ingested. ``Backfill`` fills the gap from CoinMarketCap's
+``/cryptocurrency/quotes/historical``:
+
+- the token set and date range are split into units of one token and at
+  most ``MAX_POINTS_PER_REQUEST`` intervals
+- up to ``concurrency`` units are fetched at once on worker threads, each
+  with its own HTTP session, retrying 429 and 5xx responses with backoff
+- the main thread, the only one touching the database session, writes
+  each unit with multi-row inserts of ``chunk_size`` rows and commits
+- after every commit the unit is recorded in a JSON checkpoint file, so
+  an interrupted run picks up where it stopped; timestamps already stored
+  are skipped, so replaying a unit never duplicates rows
+- finally the velocity_1h..velocity_7d columns of every affected row are
+  recomputed in one vectorized pass per token
+
+Historical rows bypass the ingest quality gate (``src.services.quality``):
+they are not scored, jump-checked or quarantined, and all carry the fixed
+``BACKFILL_QUALITY_SCORE``.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+import numpy as np
+import requests
+from sqlalchemy import bindparam, select
+from src.models.token import db, Token, TokenMetric
+
+logger = logging.getLogger(__name__)
+
+# Supported sampling intervals, named as CoinMarketCap names them
+BACKFILL_INTERVALS = {
+    '5m': timedelta(minutes=5),
+    '15m': timedelta(minutes=15),
+    '30m': timedelta(minutes=30),
+    '1h': timedelta(hours=1),
+    '2h': timedelta(hours=2),
+    '6h': timedelta(hours=6),
+    '12h': timedelta(hours=12),
+    '1d': timedelta(days=1)
+}
+
+# Historical velocity column -> averaging window, matching the ingester's windows
+VELOCITY_WINDOWS = {
+    'velocity_1h': timedelta(hours=1),
+    'velocity_4h': timedelta(hours=4),
+    'velocity_12h': timedelta(hours=12),
+    'velocity_7d': timedelta(days=7)
+}
+
+# Upper bound on quotes requested in one call
+MAX_POINTS_PER_REQUEST = 500
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_CHUNK_SIZE = 1000
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 0.5
+
+# Same cap as ``DataService._calculate_velocity``
+MAX_VELOCITY = 100.0
+
+# Fixed quality score of backfilled rows, which are not scored; live rows
+# get the score computed by the ingest quality gate
+BACKFILL_QUALITY_SCORE = 0.9
+
+CHECKPOINT_VERSION = 1
+
+# Quote payload key -> TokenMetric column, for the fields the upstream may carry
+_QUOTE_COLUMNS = {
+    'price': 'price_usd',
+    'market_cap': 'market_cap_usd',
+    'volume_24h': 'volume_24h_usd',
+    'circulating_supply': 'circulating_supply',
+    'total_supply': 'total_supply',
+    'percent_change_1h': 'percent_change_1h',
+    'percent_change_24h': 'percent_change_24h',
+    'percent_change_7d': 'percent_change_7d'
+}
+
+_EPOCH = np.datetime64('1970-01-01T00:00:00', 'us')
+
+
+class BackfillError(Exception):
+    pass
+
+
+def _iso(value):
+    return value.isoformat(timespec='seconds')
+
+
+def _parse_timestamp(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+
+
+def plan_units(cmc_ids, time_start, time_end, interval):
+    """``(cmc_id, window_start, window_end)`` units covering ``[time_start, time_end)``"""
+    step = BACKFILL_INTERVALS[interval] * MAX_POINTS_PER_REQUEST
+    units = []
+    for cmc_id in cmc_ids:
+        window_start = time_start
+        while window_start < time_end:
+            window_end = min(window_start + step, time_end)
+            units.append((cmc_id, window_start, window_end))
+            window_start = window_end
+    return units
+
+
+def quote_rows(token_id, quotes, window_start, window_end, created_at):
+    """``token_metrics`` insert rows for the upstream quotes inside the window.
+
+    Velocity uses the ingester's formula and cap. As in the ingester, an
+    undefined velocity or a missing quote value is stored as NULL and a
+    real zero is kept.
+    """
+    rows = []
+    for entry in quotes:
+        timestamp = _parse_timestamp(entry['timestamp'])
+        if not window_start <= timestamp < window_end:
+            continue
+        quote = entry.get('quote', {}).get('USD', {})
+        row = {'token_id': token_id, 'timestamp': timestamp, 'created_at': created_at,
+               'data_quality_score': BACKFILL_QUALITY_SCORE}
+        for key, column in _QUOTE_COLUMNS.items():
+            row[column] = quote.get(key)
+        volume, market_cap = row['volume_24h_usd'], row['market_cap_usd']
+        velocity = None
+        if volume is not None and market_cap is not None and market_cap > 0:
+            velocity = min(round(volume / market_cap, 8), MAX_VELOCITY)
+        row['velocity'] = velocity
+        rows.append(row)
+    return rows
+
+
+def window_averages(timestamps, values, window):
+    """Average of the earlier non-zero ``values`` within ``window`` of each timestamp.
+
+    ``timestamps`` must be sorted. Row ``i`` averages the rows ``j`` with
+    ``t_i - window <= t_j < t_i`` whose value is set and non-zero: what
+    ``DataService._calculate_historical_velocity`` returns when row ``i``
+    is ingested. ``NaN`` where no such row exists.
+    """
+    present = ~np.isnan(values) & (values != 0)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(present, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(present)))
+    lower = np.searchsorted(timestamps, timestamps - np.timedelta64(window), side='left')
+    upper = np.searchsorted(timestamps, timestamps, side='left')
+    count = counts[upper] - counts[lower]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(count > 0, (sums[upper] - sums[lower]) / count, np.nan)
+
+
+def recompute_velocity_windows(token_ids, time_start, time_end, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Rewrite the historical velocity columns of rows affected by a backfill.
+
+    Rows from ``time_start`` up to a week past ``time_end`` can have windows
+    reaching into the backfilled range; their windows are read from a week
+    before ``time_start``. Returns the number of rows updated.
+    """
+    longest = max(VELOCITY_WINDOWS.values())
+    columns = tuple(VELOCITY_WINDOWS)
+    update = TokenMetric.__table__.update().where(
+        TokenMetric.__table__.c.id == bindparam('_id')
+    ).values({column: bindparam(column) for column in columns})
+
+    updated = 0
+    for token_id in token_ids:
+        rows = db.session.execute(
+            select(TokenMetric.id, TokenMetric.timestamp, TokenMetric.velocity)
+            .where(
+                TokenMetric.token_id == token_id,
+                TokenMetric.timestamp >= time_start - longest,
+                TokenMetric.timestamp < time_end + longest
+            )
+            .order_by(TokenMetric.timestamp, TokenMetric.id)
+        ).all()
+        if not rows:
+            continue
+
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        timestamps = np.array([row[1] for row in rows], dtype='datetime64[us]')
+        velocity = np.array([np.nan if row[2] is None else float(row[2]) for row in rows])
+        averages = {column: window_averages(timestamps, velocity, window)
+                    for column, window in VELOCITY_WINDOWS.items()}
+
+        targets = np.flatnonzero(timestamps >= np.datetime64(time_start, 'us'))
+        parameters = []
+        for position in targets.tolist():
+            entry = {'_id': int(ids[position])}
+            for column in columns:
+                value = averages[column][position]
+                entry[column] = None if np.isnan(value) else float(value)
+            parameters.append(entry)
+        for offset in range(0, len(parameters), chunk_size):
+            db.session.execute(update, parameters[offset:offset + chunk_size])
+        db.session.commit()
+        updated += len(parameters)
+    return updated
+
+
+class Checkpoint:
+    """Completed units of one backfill, persisted as JSON after every commit"""
+
+    def __init__(self, path, parameters):
+        self.path = path
+        self.parameters = parameters
+        self.done = set()
+
+    @classmethod
+    def open(cls, path, parameters, restart=False):
+        checkpoint = cls(path, parameters)
+        if path and os.path.exists(path) and not restart:
+            with open(path) as handle:
+                state = json.load(handle)
+            if state.get('version') != CHECKPOINT_VERSION or state.get('parameters') != parameters:
+                raise BackfillError(
+                    f'Checkpoint {path} belongs to a different backfill; pass --restart to discard it'
+                )
+            checkpoint.done = {tuple(unit) for unit in state['done']}
+        return checkpoint
+
+    def key(self, unit):
+        cmc_id, window_start, _ = unit
+        return (cmc_id, _iso(window_start))
+
+    def is_done(self, unit):
+        return self.key(unit) in self.done
+
+    def mark(self, unit):
+        self.done.add(self.key(unit))
+        if not self.path:
+            return
+        # Write-then-rename so an interruption never leaves a torn file
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as handle:
+            json.dump({
+                'version': CHECKPOINT_VERSION,
+                'parameters': self.parameters,
+                'done': sorted(self.done)
+            }, handle)
+        os.replace(temporary, self.path)
+
+
+class Backfill:
+    """Fetch, store and post-process historical quotes for a set of tokens"""
+
+    def __init__(self, data_service, tokens, time_start, time_end, interval='1h',
+                 concurrency=DEFAULT_CONCURRENCY, chunk_size=DEFAULT_CHUNK_SIZE,
+                 checkpoint_path=None, restart=False):
+        if interval not in BACKFILL_INTERVALS:
+            raise ValueError(f"Invalid parameter: interval must be one of {', '.join(BACKFILL_INTERVALS)}")
+        if time_start >= time_end:
+            raise ValueError('Invalid parameter: start must be before end')
+        if concurrency < 1 or chunk_size < 1:
+            raise ValueError('Invalid parameter: concurrency and chunk size must be positive')
+        self.base_url = data_service.cmc_base_url
+        self.headers = dict(data_service.session.headers)
+        self.column_store = data_service.column_store
+        self.tokens = dict(tokens)   # cmc_id -> internal token id
+        self.time_start = time_start
+        self.time_end = time_end
+        self.interval = interval
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.checkpoint = Checkpoint.open(checkpoint_path, {
+            'cmc_ids': sorted(self.tokens),
+            'time_start': _iso(time_start),
+            'time_end': _iso(time_end),
+            'interval': interval
+        }, restart)
+        self.units = plan_units(sorted(self.tokens), time_start, time_end, interval)
+        self._local = threading.local()
+        self.stats = {'units': len(self.units), 'skipped': 0, 'fetched': 0, 'inserted': 0,
+                      'duplicates': 0, 'retries': 0, 'recomputed': 0}
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers.update(self.headers)
+        return session
+
+    def fetch(self, unit):
+        """Quotes of one unit, retrying rate limits and server errors"""
+        cmc_id, window_start, window_end = unit
+        parameters = {
+            'id': cmc_id,
+            'time_start': _iso(window_start),
+            'time_end': _iso(window_end),
+            'interval': self.interval,
+            'count': MAX_POINTS_PER_REQUEST,
+            'convert': 'USD'
+        }
+        url = f'{self.base_url}/cryptocurrency/quotes/historical'
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                response = self._session().get(url, params=parameters, timeout=30)
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise requests.HTTPError(f'HTTP {response.status_code}', response=response)
+                response.raise_for_status()
+                data = response.json()
+                if data.get('status', {}).get('error_code') != 0:
+                    raise BackfillError(data.get('status', {}).get('error_message'))
+                return data.get('data', {}).get('quotes', [])
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                status = getattr(e.response, 'status_code', None)
+                if attempt == MAX_ATTEMPTS or (status is not None and status < 500 and status != 429):
+                    raise BackfillError(f'Fetching {cmc_id} from {_iso(window_start)} failed: {e}')
+                self.stats['retries'] += 1
+                time.sleep(RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+
+    def store(self, unit, quotes):
+        """Insert a unit's quotes that are not stored yet; returns rows inserted"""
+        cmc_id, window_start, window_end = unit
+        token_id = self.tokens[cmc_id]
+        rows = quote_rows(token_id, quotes, window_start, window_end, datetime.utcnow())
+        existing = set(db.session.execute(
+            select(TokenMetric.timestamp).where(
+                TokenMetric.token_id == token_id,
+                TokenMetric.timestamp >= window_start,
+                TokenMetric.timestamp < window_end
+            )
+        ).scalars())
+        fresh = []
+        for row in rows:
+            if row['timestamp'] not in existing:
+                existing.add(row['timestamp'])
+                fresh.append(row)
+        self.stats['duplicates'] += len(rows) - len(fresh)
+        for offset in range(0, len(fresh), self.chunk_size):
+            db.session.execute(TokenMetric.__table__.insert(), fresh[offset:offset + self.chunk_size])
+        db.session.commit()
+        return len(fresh)
+
+    def run(self, progress=None):
+        """Backfill every pending unit, then recompute the velocity windows.
+
+        ``progress(unit, inserted)`` is called after each unit is committed
+        and checkpointed. Returns ``self.stats``.
+        """
+        pending = [unit for unit in self.units if not self.checkpoint.is_done(unit)]
+        self.stats['skipped'] = len(self.units) - len(pending)
+
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='backfill')
+        try:
+            queued = iter(pending)
+            in_flight = {}
+            # Keep at most ``concurrency`` requests outstanding
+            for unit in queued:
+                in_flight[executor.submit(self.fetch, unit)] = unit
+                if len(in_flight) >= self.concurrency:
+                    break
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    unit = in_flight.pop(future)
+                    quotes = future.result()
+                    self.stats['fetched'] += len(quotes)
+                    inserted = self.store(unit, quotes)
+                    self.stats['inserted'] += inserted
+                    self.checkpoint.mark(unit)
+                    if progress:
+                        progress(unit, inserted)
+                    following = next(queued, None)
+                    if following is not None:
+                        in_flight[executor.submit(self.fetch, following)] = following
+        except BaseException:
+            db.session.rollback()
+            raise
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        self.stats['recomputed'] = recompute_velocity_windows(
+            self.tokens.values(), self.time_start, self.time_end, self.chunk_size
+        )
+        # Backfilled rows land before the stored ones, so the column store is rewritten
+        if self.column_store is not None:
+            self.column_store.rebuild(sorted(self.tokens.values()))
+        logger.info("Backfill complete", extra=self.stats)
+        return self.stats
+
+
+def resolve_backfill_tokens(data_service, identifiers):
+    """``{cmc_id: token_id}`` for identifiers, or every active token when none are given.
+
+    Raises ``LookupError`` listing the identifiers that are not known.
+    """
+    if identifiers:
+        resolved = data_service.resolve_token_ids(identifiers)
+        not_found = [identifier for identifier in identifiers if identifier not in resolved]
+        if not_found:
+            raise LookupError(', '.join(not_found))
+        condition = Token.id.in_(set(resolved.values()))
+    else:
+        condition = Token.is_active == True
+    return dict(db.session.execute(select(Token.cmc_id, Token.id).where(condition)).all())
@@ -0,0 +1,280 @@
+"""Append-only, memory-mapped columnar copy of ``token_metrics``.
+
+Enabled by ``COLUMN_STORE_DIR``. Each token gets a directory holding one
+fixed-width file per column: ``timestamp.i64`` (microseconds since the
+epoch) and ``<column>.f64`` for every quote column, with NaN for NULL.
+The ingester appends each committed tick to the files. Readers map them
+with ``np.memmap`` and binary-search the timestamp index, so a range read
+is a set of zero-copy array slices with no row decoding.
+
+An append writes the value columns before the timestamp, and the row count
+is the shortest file's length, so a torn append is invisible and is cut
+off before the next one. Rows must arrive in time order. Writes that would
+land before a token's last row (backfills) rebuild that token from SQL
+instead.
+
+The store holds the whole history only once it has been built from SQL
+(``flask column-store rebuild``) or started on an empty table.
+``MANIFEST.json`` records that, and reads fall back to SQL until it
+exists.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import func, select, true
+from src.models.token import db, TokenMetric
+from src.utils.serialization import QUOTE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Stored value columns, as TokenMetric column names
+STORE_COLUMNS = tuple(QUOTE_FIELDS.values())
+
+# Decimal places kept per column, as declared on TokenMetric
+COLUMN_SCALES = {name: getattr(TokenMetric, name).type.scale for name in STORE_COLUMNS}
+
+MANIFEST = 'MANIFEST.json'
+STORE_VERSION = 1
+
+# Rows read per round trip when rebuilding from SQL
+REBUILD_CHUNK_SIZE = 10000
+
+TIMESTAMP_FILE = 'timestamp.i64'
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_micros(timestamp):
+    return (timestamp - _EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(value):
+    return _EPOCH + timedelta(microseconds=int(value))
+
+
+def _round(column, value):
+    return np.nan if value is None else round(float(value), COLUMN_SCALES[column])
+
+
+class TokenColumns:
+    """Read-only mapped columns of one token; arrays are views into the files"""
+
+    def __init__(self, directory):
+        sizes = [os.path.getsize(os.path.join(directory, TIMESTAMP_FILE)) // 8]
+        sizes += [os.path.getsize(os.path.join(directory, f'{column}.f64')) // 8 for column in STORE_COLUMNS]
+        self.length = min(sizes)
+        self.timestamps = self._map(os.path.join(directory, TIMESTAMP_FILE), np.int64)
+        self.columns = {
+            column: self._map(os.path.join(directory, f'{column}.f64'), np.float64) for column in STORE_COLUMNS
+        }
+
+    def _map(self, path, dtype):
+        if not self.length:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(self.length,))
+
+    def bounds(self, time_start=None, time_end=None):
+        """Positions ``[lo, hi)`` of rows with ``time_start <= timestamp <= time_end``"""
+        lo = 0 if time_start is None else int(np.searchsorted(self.timestamps, to_micros(time_start), 'left'))
+        hi = self.length if time_end is None else int(np.searchsorted(self.timestamps, to_micros(time_end), 'right'))
+        return lo, max(lo, hi)
+
+
+class ColumnStore:
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._maps = {}   # token_id -> (timestamp file size, TokenColumns)
+        os.makedirs(root, exist_ok=True)
+
+    def _directory(self, token_id):
+        return os.path.join(self.root, str(int(token_id)))
+
+    @property
+    def complete(self):
+        """Whether the store holds every row of the SQL table"""
+        return os.path.exists(os.path.join(self.root, MANIFEST))
+
+    def mark_complete(self):
+        temporary = os.path.join(self.root, f'{MANIFEST}.tmp')
+        with open(temporary, 'w') as handle:
+            json.dump({'version': STORE_VERSION, 'columns': list(STORE_COLUMNS),
+                       'built_at': datetime.utcnow().isoformat()}, handle)
+        os.replace(temporary, os.path.join(self.root, MANIFEST))
+
+    def initialize(self):
+        """Mark an empty store complete when the SQL table is empty too"""
+        if not self.complete and not db.session.execute(select(TokenMetric.id).limit(1)).first():
+            self.mark_complete()
+
+    def token(self, token_id):
+        """Mapped columns of a token, or None when it has no rows; remapped after appends"""
+        path = os.path.join(self._directory(token_id), TIMESTAMP_FILE)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        cached = self._maps.get(token_id)
+        if cached is not None and cached[0] == size:
+            return cached[1]
+        try:
+            columns = TokenColumns(self._directory(token_id))
+        except OSError:
+            # First append still in progress
+            return None
+        with self._lock:
+            self._maps[token_id] = (size, columns)
+        return columns
+
+    def _forget(self, token_id):
+        with self._lock:
+            self._maps.pop(token_id, None)
+
+    def readable(self, token_id):
+        """Mapped columns for serving reads of a token, or None to use SQL"""
+        return self.token(token_id) if self.complete else None
+
+    def append(self, rows):
+        """Append ``(token_id, timestamp, {column: value})`` rows, in time order per token.
+
+        Returns the token ids whose rows were out of order and not written.
+        """
+        by_token = {}
+        for token_id, timestamp, values in rows:
+            by_token.setdefault(token_id, []).append((timestamp, values))
+
+        out_of_order = []
+        for token_id, entries in by_token.items():
+            directory = self._directory(token_id)
+            os.makedirs(directory, exist_ok=True)
+            length = self._repair(directory)
+            timestamps = np.array([to_micros(timestamp) for timestamp, _ in entries], dtype=np.int64)
+            last = self._last_timestamp(directory, length)
+            if np.any(np.diff(timestamps) < 0) or (last is not None and timestamps[0] < last):
+                out_of_order.append(token_id)
+                continue
+            for column in STORE_COLUMNS:
+                values = np.array([_round(column, values.get(column)) for _, values in entries], dtype=np.float64)
+                with open(os.path.join(directory, f'{column}.f64'), 'ab') as handle:
+                    handle.write(values.tobytes())
+            # The timestamp file is written last; its length publishes the rows
+            with open(os.path.join(directory, TIMESTAMP_FILE), 'ab') as handle:
+                handle.write(timestamps.tobytes())
+        return out_of_order
+
+    def _repair(self, directory):
+        """Cut every file of a token back to the common row count; returns it"""
+        paths = [os.path.join(directory, TIMESTAMP_FILE)]
+        paths += [os.path.join(directory, f'{column}.f64') for column in STORE_COLUMNS]
+        sizes = [os.path.getsize(path) // 8 if os.path.exists(path) else 0 for path in paths]
+        length = min(sizes)
+        for path, size in zip(paths, sizes):
+            if size > length or not os.path.exists(path):
+                with open(path, 'ab') as handle:
+                    handle.truncate(length * 8)
+        return length
+
+    def _last_timestamp(self, directory, length):
+        if not length:
+            return None
+        with open(os.path.join(directory, TIMESTAMP_FILE), 'rb') as handle:
+            handle.seek((length - 1) * 8)
+            return int(np.frombuffer(handle.read(8), dtype=np.int64)[0])
+
+    def range(self, token_id, time_start, time_end):
+        """``(timestamps, {column: values})`` slices for a time range, or None to use SQL"""
+        columns = self.readable(token_id)
+        if columns is None:
+            return None
+        lo, hi = columns.bounds(time_start, time_end)
+        return columns.timestamps[lo:hi], {name: values[lo:hi] for name, values in columns.columns.items()}
+
+    def window_mean(self, token_id, column, since):
+        """Mean of the set, non-zero values of ``column`` from ``since`` on.
+
+        Returns ``(found, mean)``; ``found`` is False when reads must go to SQL.
+        """
+        columns = self.readable(token_id)
+        if columns is None:
+            return False, None
+        lo, hi = columns.bounds(since, None)
+        values = columns.columns[column][lo:hi]
+        values = values[~np.isnan(values) & (values != 0)]
+        return True, float(values.mean()) if values.size else None
+
+    def rebuild(self, token_ids=None):
+        """Rewrite tokens (default: all) from SQL; returns rows written per token"""
+        if token_ids is None:
+            token_ids = db.session.execute(select(TokenMetric.token_id).distinct()).scalars().all()
+        written = {}
+        for token_id in token_ids:
+            directory = self._directory(token_id)
+            staging = f'{directory}.rebuild'
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            handles = {column: open(os.path.join(staging, f'{column}.f64'), 'wb') for column in STORE_COLUMNS}
+            handles['timestamp'] = open(os.path.join(staging, TIMESTAMP_FILE), 'wb')
+            count = 0
+            try:
+                result = db.session.execute(
+                    select(TokenMetric.timestamp, *(getattr(TokenMetric, column) for column in STORE_COLUMNS))
+                    .where(TokenMetric.token_id == token_id)
+                    .order_by(TokenMetric.timestamp, TokenMetric.id)
+                    .execution_options(yield_per=REBUILD_CHUNK_SIZE)
+                )
+                for chunk in result.partitions():
+                    handles['timestamp'].write(
+                        np.array([to_micros(row[0]) for row in chunk], dtype=np.int64).tobytes()
+                    )
+                    for index, column in enumerate(STORE_COLUMNS, start=1):
+                        handles[column].write(np.array(
+                            [_round(column, row[index]) for row in chunk], dtype=np.float64
+                        ).tobytes())
+                    count += len(chunk)
+            finally:
+                for handle in handles.values():
+                    handle.close()
+            # Swap the rebuilt files in; readers holding old maps keep the old inodes
+            retired = f'{directory}.old'
+            shutil.rmtree(retired, ignore_errors=True)
+            if os.path.exists(directory):
+                os.replace(directory, retired)
+            os.replace(staging, directory)
+            shutil.rmtree(retired, ignore_errors=True)
+            self._forget(token_id)
+            written[token_id] = count
+        return written
+
+    def check(self, token_ids=None):
+        """Compare the store with SQL; returns ``[(token_id, problem)]`` for mismatches"""
+        sql = {
+            row[0]: row[1:] for row in db.session.execute(
+                select(
+                    TokenMetric.token_id, func.count(TokenMetric.id),
+                    func.min(TokenMetric.timestamp), func.max(TokenMetric.timestamp)
+                )
+                .where(TokenMetric.token_id.in_(token_ids) if token_ids is not None else true())
+                .group_by(TokenMetric.token_id)
+            )
+        }
+        stored = set(token_ids) if token_ids is not None else {
+            int(name) for name in os.listdir(self.root) if name.isdigit()
+        }
+        problems = []
+        for token_id in sorted(stored | set(sql)):
+            count, first, last = sql.get(token_id, (0, None, None))
+            columns = self.token(token_id)
+            length = columns.length if columns is not None else 0
+            if length != count:
+                problems.append((token_id, f'{length} rows stored, {count} in SQL'))
+            elif count and (from_micros(columns.timestamps[0]) != first or from_micros(columns.timestamps[-1]) != last):
+                problems.append((token_id, 'first or last timestamp differs from SQL'))
+            elif count and np.any(np.diff(columns.timestamps) < 0):
+                problems.append((token_id, 'timestamps out of order'))
+        if not self.complete:
+            problems.append((None, 'store not built from SQL yet'))
+        return problems
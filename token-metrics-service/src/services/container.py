@@ -0,0 +1,149 @@
+"""Per-application service container.
+
+``create_app`` attaches one ``ServiceContainer`` to ``app.extensions``; routes,
+socket handlers and the ingest loop all reach the same instances through it.
+Services are built on first use so importing modules and creating the app
+stay cheap.
+"""
+import threading
+from flask import current_app
+from werkzeug.local import LocalProxy
+
+EXTENSION_KEY = 'token_metrics'
+
+
+class ServiceContainer:
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self._data_service = None
+        self._column_store = None
+        self._static_files = None
+        self._alert_engine = None
+        self._screener = None
+        self._subscriptions = None
+        self._correlations = None
+        self._dashboard = None
+        self._leaderboards = None
+        self._metadata_enricher = None
+
+    @property
+    def data_service(self):
+        """The shared ``DataService`` (and its HTTP session), created lazily"""
+        if self._data_service is None:
+            column_store = self.column_store
+            with self._lock:
+                if self._data_service is None:
+                    from src.services.data_service import DataService
+                    self._data_service = DataService(column_store=column_store)
+        return self._data_service
+
+    @property
+    def column_store(self):
+        """Memory-mapped copy of the metric history, or None unless ``COLUMN_STORE_DIR`` is set"""
+        if self._column_store is None and self.app.config.get('COLUMN_STORE_DIR'):
+            with self._lock:
+                if self._column_store is None:
+                    from src.services.column_store import ColumnStore
+                    column_store = ColumnStore(self.app.config['COLUMN_STORE_DIR'])
+                    with self.app.app_context():
+                        column_store.initialize()
+                    self._column_store = column_store
+        return self._column_store
+
+    @property
+    def static_files(self):
+        """Index of the static folder, built once on the first static request"""
+        if self._static_files is None:
+            with self._lock:
+                if self._static_files is None:
+                    from src.utils.static_files import StaticIndex
+                    self._static_files = StaticIndex(self.app.static_folder)
+        return self._static_files
+
+    @property
+    def alert_engine(self):
+        """In-memory alert rule index; rules are loaded from the database on first use"""
+        if self._alert_engine is None:
+            with self._lock:
+                if self._alert_engine is None:
+                    from src.services.alerts import AlertEngine
+                    self._alert_engine = AlertEngine()
+        return self._alert_engine
+
+    @property
+    def screener(self):
+        """Holder of the columnar market snapshot used by the screener"""
+        if self._screener is None:
+            with self._lock:
+                if self._screener is None:
+                    from src.services.screener import Screener
+                    self._screener = Screener()
+        return self._screener
+
+    @property
+    def subscriptions(self):
+        """Registry of WebSocket token subscriptions for this process"""
+        if self._subscriptions is None:
+            with self._lock:
+                if self._subscriptions is None:
+                    from src.services.subscriptions import SubscriptionRegistry
+                    self._subscriptions = SubscriptionRegistry()
+        return self._subscriptions
+
+    @property
+    def correlations(self):
+        """Per-window correlation results, dropped after every ingest tick"""
+        if self._correlations is None:
+            with self._lock:
+                if self._correlations is None:
+                    from src.services.correlation import CorrelationCache
+                    self._correlations = CorrelationCache()
+        return self._correlations
+
+    @property
+    def dashboard(self):
+        """Dashboard bootstrap views cached against the current market snapshot"""
+        if self._dashboard is None:
+            with self._lock:
+                if self._dashboard is None:
+                    from src.services.dashboard import DashboardViews
+                    self._dashboard = DashboardViews()
+        return self._dashboard
+
+    @property
+    def leaderboards(self):
+        """Top-mover boards ranked once per market snapshot"""
+        if self._leaderboards is None:
+            with self._lock:
+                if self._leaderboards is None:
+                    from src.services.leaderboards import Leaderboards
+                    self._leaderboards = Leaderboards()
+        return self._leaderboards
+
+    @property
+    def metadata_enricher(self):
+        """Fetches token metadata for new and stale tokens, with the budget from the app config"""
+        if self._metadata_enricher is None:
+            data_service = self.data_service
+            with self._lock:
+                if self._metadata_enricher is None:
+                    from datetime import timedelta
+                    from src.services.metadata import MetadataEnricher
+                    config = self.app.config
+                    self._metadata_enricher = MetadataEnricher(
+                        data_service,
+                        ttl=timedelta(hours=config['METADATA_TTL_HOURS']),
+                        batch_size=config['METADATA_BATCH_SIZE'],
+                        max_calls=config['METADATA_CALLS_PER_RUN']
+                    )
+        return self._metadata_enricher
+
+
+def get_services(app=None):
+    """The container of ``app``, or of the current application"""
+    return (app or current_app).extensions[EXTENSION_KEY]
+
+
+# Module-level handle for routes and socket handlers; resolves per app context
+data_service = LocalProxy(lambda: get_services().data_service)
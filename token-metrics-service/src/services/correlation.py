@@ -0,0 +1,195 @@
+"""Cross-token correlation and beta over aligned return series.
+
+For a window, one aggregate query averages each token's price and velocity
+per time bucket. The averages are laid out as ``tokens x buckets`` arrays,
+from which price log returns and velocity changes are taken. Correlations
+use pairwise-complete observations: with ``X`` the returns (missing set to
+zero) and ``M`` the presence mask, every pairwise sum is one matrix
+product. The whole universe then costs a few ``N x T @ T x N`` products
+rather than ``N^2`` Python loops. Results are cached per window until the
+next ingest tick.
+"""
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import Float, Integer, cast, func, select
+from src.models.token import db, Token, TokenMetric
+from src.utils.metrics import record_cache
+from src.utils.singleflight import SingleFlight
+
+# Window name -> (span, bucket size)
+CORRELATION_WINDOWS = {
+    '24h': (timedelta(hours=24), timedelta(hours=1)),
+    '7d': (timedelta(days=7), timedelta(hours=6)),
+    '30d': (timedelta(days=30), timedelta(days=1))
+}
+CORRELATION_METRICS = ('price', 'velocity')
+
+# Pairs with fewer overlapping returns than this get no coefficient
+MIN_OBSERVATIONS = 3
+
+# Cached results older than this are recomputed, for processes without the ingester
+CACHE_MAX_AGE = timedelta(seconds=120)
+
+Returns = namedtuple('Returns', 'values mask')
+
+
+def _epoch_seconds(column):
+    if db.engine.dialect.name == 'sqlite':
+        return cast(func.strftime('%s', column), Integer)
+    return cast(func.extract('epoch', column), Integer)
+
+
+def pairwise_moments(returns):
+    """Pairwise-complete covariance and variances of the rows of ``returns``.
+
+    Returns ``(count, cov, var)`` where ``var[i, j]`` is the variance of
+    row ``i`` over the observations it shares with row ``j``.
+    """
+    x, m = returns.values, returns.mask.astype(np.float64)
+    count = m @ m.T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sum_x = x @ m.T                      # sum of x_i where j is present
+        mean_x = sum_x / count
+        cov = (x @ x.T) / count - mean_x * mean_x.T
+        var = ((x * x) @ m.T) / count - mean_x * mean_x
+    return count, cov, var
+
+
+def correlation_matrix(returns):
+    count, cov, var = pairwise_moments(returns)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = cov / np.sqrt(var * var.T)
+    corr[count < MIN_OBSERVATIONS] = np.nan
+    np.clip(corr, -1.0, 1.0, out=corr)
+    return corr
+
+
+def betas(returns, benchmark):
+    """Beta of every row against row ``benchmark``, over their shared observations"""
+    x, m = returns.values, returns.mask
+    b, b_mask = x[benchmark], m[benchmark]
+    shared = m & b_mask
+    count = shared.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_x = (x * shared).sum(axis=1) / count
+        mean_b = (b * shared).sum(axis=1) / count
+        cov = (x * b * shared).sum(axis=1) / count - mean_x * mean_b
+        var_b = (b * b * shared).sum(axis=1) / count - mean_b * mean_b
+        beta = cov / var_b
+    beta[(count < MIN_OBSERVATIONS) | (var_b <= 0)] = np.nan
+    return beta
+
+
+def _returns(levels, log):
+    if log:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            levels = np.where(levels > 0, np.log(levels), np.nan)
+    changes = np.diff(levels, axis=1)
+    mask = ~np.isnan(changes)
+    return Returns(np.where(mask, changes, 0.0), mask)
+
+
+class CorrelationSet:
+    """Return series and correlation matrices for every token in one window"""
+
+    def __init__(self, window, token_ids, tokens, time_start, time_end, price, velocity):
+        self.window = window
+        self.built_at = datetime.utcnow()
+        self.token_ids = token_ids
+        self.positions = {token_id: index for index, token_id in enumerate(token_ids)}
+        self.tokens = tokens
+        self.time_start = time_start
+        self.time_end = time_end
+        self.returns = {
+            'price': _returns(price, log=True),
+            'velocity': _returns(velocity, log=False)
+        }
+        self.matrices = {metric: correlation_matrix(self.returns[metric]) for metric in CORRELATION_METRICS}
+
+    @classmethod
+    def load(cls, window):
+        span, bucket = CORRELATION_WINDOWS[window]
+        time_end = db.session.execute(select(func.max(TokenMetric.timestamp))).scalar()
+        if time_end is None:
+            return cls(window, [], {}, None, None, np.empty((0, 0)), np.empty((0, 0)))
+        time_start = time_end - span
+
+        bucket_seconds = int(bucket.total_seconds())
+        bucket_expr = _epoch_seconds(TokenMetric.timestamp) // bucket_seconds
+        rows = db.session.execute(
+            select(
+                TokenMetric.token_id,
+                bucket_expr.label('bucket'),
+                func.avg(TokenMetric.price_usd, type_=Float),
+                func.avg(TokenMetric.velocity, type_=Float)
+            )
+            .join(Token, Token.id == TokenMetric.token_id)
+            .where(
+                Token.is_active == True,
+                TokenMetric.timestamp > time_start,
+                TokenMetric.timestamp <= time_end
+            )
+            .group_by(TokenMetric.token_id, bucket_expr)
+        ).all()
+
+        token_ids = sorted({row[0] for row in rows})
+        tokens = {
+            row[0]: {'id': row[0], 'cmc_id': row[1], 'symbol': row[2]}
+            for row in db.session.execute(
+                select(Token.id, Token.cmc_id, Token.symbol).where(Token.id.in_(token_ids))
+            )
+        } if token_ids else {}
+
+        first_bucket = int((time_start - datetime(1970, 1, 1)).total_seconds()) // bucket_seconds
+        columns = int(span.total_seconds()) // bucket_seconds + 1
+        price = np.full((len(token_ids), columns), np.nan)
+        velocity = np.full((len(token_ids), columns), np.nan)
+        if rows:
+            data = np.array([
+                (row[1], np.nan if row[2] is None else row[2], np.nan if row[3] is None else row[3])
+                for row in rows
+            ], dtype=np.float64)
+            row_index = np.searchsorted(token_ids, [row[0] for row in rows])
+            column_index = data[:, 0].astype(np.int64) - first_bucket
+            inside = (column_index >= 0) & (column_index < columns)
+            price[row_index[inside], column_index[inside]] = data[inside, 1]
+            velocity[row_index[inside], column_index[inside]] = data[inside, 2]
+
+        return cls(window, token_ids, tokens, time_start, time_end, price, velocity)
+
+    def observations(self, metric, positions):
+        return self.returns[metric].mask[positions].sum(axis=1)
+
+
+class CorrelationCache:
+    """Per-window ``CorrelationSet`` cache, invalidated by each ingest tick"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self._sets = {}
+        self._generation = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._sets.clear()
+
+    def get(self, window):
+        entry = self._sets.get(window)
+        hit = entry is not None and datetime.utcnow() - entry.built_at <= CACHE_MAX_AGE
+        record_cache('correlation', hit)
+        if hit:
+            return entry
+        # Concurrent misses for one window compute it once
+        return self._flights.do('correlation', window, lambda: self._build(window))
+
+    def _build(self, window):
+        generation = self._generation
+        entry = CorrelationSet.load(window)
+        with self._lock:
+            if generation == self._generation:
+                self._sets[window] = entry
+        return entry
@@ -0,0 +1,177 @@
+"""Dashboard bootstrap views built from the market snapshot.
+
+A dashboard's first paint needs the top tokens, the market overview and
+the selected token's detail, velocity and recent series. ``DashboardViews``
+assembles all of them from the screener's ``MarketSnapshot`` in one
+payload and caches it per snapshot, so every client opening the dashboard
+during a tick shares one computation.
+
+Each view carries a version: the time of the latest tick in the snapshot,
+in milliseconds since the epoch. Clients pass it as ``since_version`` when
+they subscribe, and the socket handlers then skip the initial frame for
+tokens that have not changed since.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import numpy as np
+from src.services.screener import SNAPSHOT_QUOTE_FIELDS, SNAPSHOT_TOKEN_FIELDS
+from src.utils.metrics import record_cache
+from src.utils.serialization import FieldSelection, LIST_QUOTE_FIELDS
+from src.utils.singleflight import SingleFlight
+
+EPOCH = datetime(1970, 1, 1)
+
+DEFAULT_DASHBOARD_LIMIT = 20
+MAX_DASHBOARD_LIMIT = 100
+
+# Span and interval of the selected token's recent series
+SERIES_SPAN = timedelta(hours=24)
+SERIES_INTERVAL = '1h'
+
+# Default projection of the top-N list, and of the selected token
+DASHBOARD_SELECTION = FieldSelection(SNAPSHOT_TOKEN_FIELDS, LIST_QUOTE_FIELDS, True, True)
+SELECTED_SELECTION = FieldSelection(SNAPSHOT_TOKEN_FIELDS, SNAPSHOT_QUOTE_FIELDS, True, True)
+SERIES_SELECTION = FieldSelection((), ('price', 'volume_24h', 'velocity'), False, False)
+
+# Views kept for the current snapshot, across limits, projections and selected tokens
+MAX_CACHED_VIEWS = 64
+
+
+def version_of(timestamp):
+    """Version token of a tick timestamp; ``0`` when there is none"""
+    if timestamp is None:
+        return 0
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    return int((timestamp - EPOCH).total_seconds() * 1000)
+
+
+def parse_version(value):
+    """Parse a client's ``since_version``; ``None`` when absent"""
+    if value in (None, ''):
+        return None
+    try:
+        version = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid parameter: since_version must be an integer')
+    if version < 0:
+        raise ValueError('Invalid parameter: since_version must be an integer')
+    return version
+
+
+def market_overview(snapshot):
+    """Market totals over the snapshot, shaped like ``get_market_overview``"""
+    columns = snapshot.columns
+    velocity = columns['velocity'][~np.isnan(columns['velocity'])]
+    return {
+        'timestamp': snapshot.latest.isoformat() if snapshot.latest else None,
+        'total_market_cap': float(np.nansum(columns['market_cap'])),
+        'total_volume_24h': float(np.nansum(columns['volume_24h'])),
+        'average_velocity': float(velocity.mean()) if velocity.size else 0.0,
+        'active_tokens': snapshot.size
+    }
+
+
+class DashboardViews:
+    """Bootstrap payloads for the current snapshot, cached until it changes"""
+
+    def __init__(self, capacity=MAX_CACHED_VIEWS):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self._snapshot = None
+        self._views = OrderedDict()
+
+    def get(self, data_service, snapshot, limit, selection, convert, token_id=None):
+        """Bootstrap payload for the top ``limit`` tokens.
+
+        ``token_id`` selects the detailed token by internal id and defaults
+        to the first of the list. Raises ``LookupError`` when it is not in
+        the snapshot.
+        """
+        key = (limit, selection, tuple(convert), token_id)
+        with self._lock:
+            if self._snapshot is not snapshot:
+                self._snapshot = snapshot
+                self._views.clear()
+            view = self._views.get(key)
+            if view is not None:
+                self._views.move_to_end(key)
+        record_cache('dashboard', view is not None)
+        if view is not None:
+            return view
+        # Concurrent misses for one view build it once
+        return self._flights.do(
+            'dashboard', (id(snapshot),) + key,
+            lambda: self._build(data_service, snapshot, key)
+        )
+
+    def warm(self, data_service, snapshot):
+        """Build the default view, so the first bootstrap after a tick is a hit"""
+        return self.get(data_service, snapshot, DEFAULT_DASHBOARD_LIMIT, DASHBOARD_SELECTION,
+                        data_service.parse_convert(None))
+
+    def restore(self, data_service, snapshot, view):
+        """Install a default view saved for the tick ``snapshot`` was restored from"""
+        view = dict(view, snapshot=dict(view['snapshot'], built_at=snapshot.built_at.isoformat() + 'Z'))
+        key = (DEFAULT_DASHBOARD_LIMIT, DASHBOARD_SELECTION, tuple(data_service.parse_convert(None)), None)
+        with self._lock:
+            self._snapshot = snapshot
+            self._views.clear()
+            self._views[key] = view
+
+    def _build(self, data_service, snapshot, key):
+        limit, selection, convert, token_id = key
+        convert = list(convert)
+        ranked = snapshot.screen()
+        tokens = data_service.serialize_quote_rows(
+            snapshot.rows(ranked[:limit], selection), selection, convert=convert
+        )
+
+        if token_id is None and len(ranked):
+            token_id = int(snapshot.ids[ranked[0]])
+        selected = None
+        if token_id is not None:
+            positions = np.flatnonzero(snapshot.ids == token_id)
+            if not len(positions):
+                raise LookupError(f'Token {token_id} is not in the market snapshot')
+            selected = self._selected(data_service, snapshot, token_id, positions[:1], convert)
+
+        view = {
+            'version': version_of(snapshot.latest),
+            'snapshot': {
+                'built_at': snapshot.built_at.isoformat() + 'Z',
+                'last_updated': snapshot.latest.isoformat() if snapshot.latest else None,
+                'token_count': snapshot.size
+            },
+            'overview': market_overview(snapshot),
+            'tokens': tokens,
+            'selected': selected
+        }
+        with self._lock:
+            if self._snapshot is snapshot:
+                self._views[key] = view
+                while len(self._views) > self.capacity:
+                    self._views.popitem(last=False)
+        return view
+
+    def _selected(self, data_service, snapshot, token_id, positions, convert):
+        token = data_service.serialize_quote_rows(
+            snapshot.rows(positions, SELECTED_SELECTION), SELECTED_SELECTION, convert=convert
+        )[0]
+        # The series ends at the snapshot's tick, not at whatever was ingested since
+        time_end = snapshot.latest
+        time_start = time_end - SERIES_SPAN
+        return {
+            'token': token,
+            'velocity': data_service.get_velocity_metrics(token_id),
+            'series': {
+                'interval': SERIES_INTERVAL,
+                'time_start': time_start.isoformat(),
+                'time_end': time_end.isoformat(),
+                'data': data_service.get_token_history(
+                    token_id, time_start, time_end, SERIES_INTERVAL, SERIES_SELECTION, convert=convert
+                )
+            }
+        }
@@ -1,19 +1,56 @@
 import requests
 import time
+from collections import defaultdict
 from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import Float, inspect, select, type_coerce
 from src.models.token import db, Token, TokenMetric
+from src.services.column_store import STORE_COLUMNS, from_micros
+from src.services.quality import QualityGate
+from src.services.rates import rate_table, CRYPTO_QUOTE_IDS, SUPPORTED_FIAT
+from src.utils.metrics import time_stage
+from src.utils.singleflight import SingleFlight
+from src.utils.serialization import (
+    LIST_SELECTION, HISTORY_SELECTION, QUOTE_FIELDS, SOCKET_FIELDS,
+    compile_row_serializer, metric_columns, token_columns, quote_mapping
+)
 from decimal import Decimal
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+# How often fiat cross rates are refetched; crypto rates follow every tick
+FIAT_REFRESH_INTERVAL = timedelta(hours=1)
+# Before the first successful load, requests retry the fiat fetch at most this often
+FIAT_RETRY_INTERVAL = timedelta(seconds=30)
+
+
+def _decimal(value):
+    """Upstream number as ``Decimal``; only a missing value becomes NULL, 0 is kept"""
+    return None if value is None else Decimal(str(value))
+
 class DataService:
-    def __init__(self):
+    def __init__(self, clock=datetime.utcnow, column_store=None):
+        # Source of ingest timestamps; replays substitute a simulated clock
+        self.clock = clock
+        # Optional memory-mapped copy of the history, appended after each commit
+        self.column_store = column_store
         self.cmc_api_key = os.getenv('CMC_API_KEY', '818acf4e-ce65-4d5e-8c2d-81135b5572e5')  # Default to sandbox key
         self.cmc_base_url = os.getenv('CMC_BASE_URL', 'https://sandbox-api.coinmarketcap.com/v1')
+        self.listings_limit = int(os.getenv('CMC_LISTINGS_LIMIT', '100'))
+        # Concurrent identical reads share one execution
+        self.flights = SingleFlight()
+        # Scores each fetched batch and sets outliers aside
+        self.quality = QualityGate()
         self.session = requests.Session()
         self.session.headers.update({
             'Accepts': 'application/json',
             'X-CMC_PRO_API_KEY': self.cmc_api_key,
         })
+        self._fiat_attempted_at = None
     
     def update_token_data(self):
         """Fetch latest data from CoinMarketCap and update database"""
@@ -22,30 +59,132 @@ class DataService:
             url = f"{self.cmc_base_url}/cryptocurrency/listings/latest"
             parameters = {
                 'start': '1',
-                'limit': '100',  # Get top 100 tokens
+                'limit': str(self.listings_limit),  # Top N tokens, 100 by default
                 'convert': 'USD'
             }
             
-            response = self.session.get(url, params=parameters)
-            response.raise_for_status()
-            data = response.json()
+            with time_stage('fetch'):
+                response = self.session.get(url, params=parameters)
+                response.raise_for_status()
+                data = response.json()
             
             if data.get('status', {}).get('error_code') != 0:
-                print(f"CoinMarketCap API error: {data.get('status', {}).get('error_message')}")
+                logger.error("CoinMarketCap API error", extra={'error_message': data.get('status', {}).get('error_message')})
                 return
             
-            # Process each token
-            for token_data in data.get('data', []):
-                self._process_token_data(token_data)
+            # Score the batch; outliers never reach the history
+            with time_stage('validate'):
+                accepted, quarantined = self.quality.check(self, data.get('data', []), self.clock())
             
-            db.session.commit()
-            print(f"Updated data for {len(data.get('data', []))} tokens")
+            # Process each token
+            with time_stage('process'):
+                metrics = [self._process_token_data(token_data, score) for token_data, score in accepted]
+                self.quality.quarantine(quarantined, self.clock())
+                # Column values captured before the commit expires the instances
+                store_rows = [
+                    (metric, metric.token_id, metric.timestamp,
+                     {column: getattr(metric, column) for column in STORE_COLUMNS})
+                    for metric in metrics if metric is not None
+                ] if self.column_store is not None else []
+            
+            with time_stage('commit'):
+                db.session.commit()
+            
+            if store_rows:
+                with time_stage('column_store'):
+                    self._append_to_column_store(store_rows)
+            logger.info("Updated token data", extra={
+                'token_count': len(accepted), 'quarantined_count': len(quarantined)
+            })
+            
+            with time_stage('rates'):
+                self._update_crypto_rates([token_data for token_data, _ in accepted])
+                self._refresh_fiat_rates()
             
         except Exception as e:
-            print(f"Error updating token data: {e}")
+            logger.exception("Error updating token data")
             db.session.rollback()
     
-    def _process_token_data(self, token_data):
+    def _append_to_column_store(self, store_rows):
+        """Append committed rows to the column store; a failure only costs a rebuild"""
+        try:
+            # Rows dropped by a rollback during processing were never committed
+            rows = [row[1:] for row in store_rows if inspect(row[0]).persistent]
+            out_of_order = self.column_store.append(rows)
+            if out_of_order:
+                self.column_store.rebuild(out_of_order)
+        except Exception:
+            logger.exception("Error appending to the column store")
+    
+    def _update_crypto_rates(self, listings):
+        """Refresh BTC/ETH cross rates from the prices in a listings payload"""
+        quote_symbols = {cmc_id: symbol for symbol, cmc_id in CRYPTO_QUOTE_IDS.items()}
+        rates = {}
+        for token_data in listings:
+            symbol = quote_symbols.get(token_data.get('id'))
+            price = token_data.get('quote', {}).get('USD', {}).get('price') if symbol else None
+            if price:
+                rates[symbol] = 1 / price
+        if rates:
+            rate_table.update(rates, 'crypto')
+    
+    def _refresh_fiat_rates(self, force=False):
+        """Fetch USD fiat cross rates when the cached ones are stale"""
+        if not force and rate_table.fiat_updated_at and \
+                datetime.utcnow() - rate_table.fiat_updated_at < FIAT_REFRESH_INTERVAL:
+            return
+        
+        self._fiat_attempted_at = datetime.utcnow()
+        try:
+            response = self.session.get(f"{self.cmc_base_url}/tools/price-conversion", params={
+                'amount': 1,
+                'symbol': 'USD',
+                'convert': ','.join(SUPPORTED_FIAT)
+            }, timeout=10)
+            response.raise_for_status()
+            data = response.json()
+            
+            if data.get('status', {}).get('error_code') != 0:
+                logger.error("CoinMarketCap API error", extra={'error_message': data.get('status', {}).get('error_message')})
+                return
+            
+            quotes = data.get('data', {}).get('quote', {})
+            rate_table.update({
+                currency: quote.get('price') for currency, quote in quotes.items()
+                if currency in SUPPORTED_FIAT
+            }, 'fiat')
+            
+        except Exception as e:
+            logger.exception("Error refreshing fiat rates")
+    
+    def load_crypto_rates(self):
+        """Seed BTC/ETH cross rates from the latest stored prices"""
+        rows = db.session.execute(
+            self._latest_metric_join(select(
+                Token.cmc_id, type_coerce(TokenMetric.price_usd, Float)
+            )).where(Token.cmc_id.in_(CRYPTO_QUOTE_IDS.values()))
+        )
+        prices = dict(rows.all())
+        rate_table.update({
+            symbol: 1 / prices[cmc_id] for symbol, cmc_id in CRYPTO_QUOTE_IDS.items()
+            if prices.get(cmc_id)
+        }, 'crypto')
+    
+    def parse_convert(self, value):
+        """Validate a ``convert`` parameter against the in-memory rate table"""
+        currencies = {currency.strip().upper() for currency in (value or '').split(',')} - {'', 'USD'}
+        if currencies:
+            # Cold start before the first ingest tick
+            if rate_table.crypto_updated_at is None:
+                self.load_crypto_rates()
+            if rate_table.fiat_updated_at is None and currencies & set(SUPPORTED_FIAT) and (
+                    self._fiat_attempted_at is None
+                    or datetime.utcnow() - self._fiat_attempted_at >= FIAT_RETRY_INTERVAL):
+                # Concurrent cold requests wait for one fetch
+                self.flights.do('fiat_rates', None, self._refresh_fiat_rates)
+        return rate_table.parse_convert(value)
+    
+    def _process_token_data(self, token_data, quality_score):
         """Process individual token data and update database"""
         try:
             cmc_id = token_data['id']
@@ -74,7 +213,7 @@ class DataService:
                 token.name = token_data['name']
                 token.symbol = token_data['symbol']
                 token.slug = token_data['slug']
-                token.updated_at = datetime.utcnow()
+                token.updated_at = self.clock()
             
             # Extract quote data
             quote_data = token_data.get('quote', {}).get('USD', {})
@@ -82,7 +221,9 @@ class DataService:
             # Calculate velocity
             market_cap = quote_data.get('market_cap')
             volume_24h = quote_data.get('volume_24h')
-            velocity = self._calculate_velocity(volume_24h, market_cap)
+            # Undefined without a volume and a positive market cap; a real 0 is kept
+            velocity = self._calculate_velocity(volume_24h, market_cap) \
+                if volume_24h is not None and market_cap is not None and market_cap > 0 else None
             
             # Calculate historical velocities for trend analysis
             velocity_1h = self._calculate_historical_velocity(token.id, hours=1)
@@ -93,29 +234,31 @@ class DataService:
             # Create new metric record
             metric = TokenMetric(
                 token_id=token.id,
-                timestamp=datetime.utcnow(),
-                price_usd=Decimal(str(quote_data.get('price', 0))) if quote_data.get('price') else None,
-                market_cap_usd=Decimal(str(market_cap)) if market_cap else None,
-                volume_24h_usd=Decimal(str(volume_24h)) if volume_24h else None,
-                circulating_supply=Decimal(str(token_data.get('circulating_supply', 0))) if token_data.get('circulating_supply') else None,
-                total_supply=Decimal(str(token_data.get('total_supply', 0))) if token_data.get('total_supply') else None,
-                max_supply=Decimal(str(token_data.get('max_supply', 0))) if token_data.get('max_supply') else None,
-                percent_change_1h=Decimal(str(quote_data.get('percent_change_1h', 0))) if quote_data.get('percent_change_1h') else None,
-                percent_change_24h=Decimal(str(quote_data.get('percent_change_24h', 0))) if quote_data.get('percent_change_24h') else None,
-                percent_change_7d=Decimal(str(quote_data.get('percent_change_7d', 0))) if quote_data.get('percent_change_7d') else None,
-                velocity=Decimal(str(velocity)) if velocity else None,
-                velocity_1h=Decimal(str(velocity_1h)) if velocity_1h else None,
-                velocity_4h=Decimal(str(velocity_4h)) if velocity_4h else None,
-                velocity_12h=Decimal(str(velocity_12h)) if velocity_12h else None,
-                velocity_7d=Decimal(str(velocity_7d)) if velocity_7d else None,
-                data_quality_score=Decimal('0.95')  # Default quality score
+                timestamp=self.clock(),
+                price_usd=_decimal(quote_data.get('price')),
+                market_cap_usd=_decimal(market_cap),
+                volume_24h_usd=_decimal(volume_24h),
+                circulating_supply=_decimal(token_data.get('circulating_supply')),
+                total_supply=_decimal(token_data.get('total_supply')),
+                max_supply=_decimal(token_data.get('max_supply')),
+                percent_change_1h=_decimal(quote_data.get('percent_change_1h')),
+                percent_change_24h=_decimal(quote_data.get('percent_change_24h')),
+                percent_change_7d=_decimal(quote_data.get('percent_change_7d')),
+                velocity=_decimal(velocity),
+                velocity_1h=_decimal(velocity_1h),
+                velocity_4h=_decimal(velocity_4h),
+                velocity_12h=_decimal(velocity_12h),
+                velocity_7d=_decimal(velocity_7d),
+                data_quality_score=Decimal(str(quality_score))
             )
             
             db.session.add(metric)
+            return metric
             
         except Exception as e:
-            print(f"Error processing token {token_data.get('symbol', 'Unknown')}: {e}")
+            logger.exception("Error processing token", extra={'symbol': token_data.get('symbol', 'Unknown')})
             db.session.rollback()
+            return None
     
     def _calculate_velocity(self, volume_24h, market_cap):
         """Calculate token velocity using the standard formula"""
@@ -134,12 +277,17 @@ class DataService:
         """Calculate velocity for a specific historical timeframe"""
         try:
             if hours:
-                time_threshold = datetime.utcnow() - timedelta(hours=hours)
+                time_threshold = self.clock() - timedelta(hours=hours)
             elif days:
-                time_threshold = datetime.utcnow() - timedelta(days=days)
+                time_threshold = self.clock() - timedelta(days=days)
             else:
                 return None
             
+            if self.column_store is not None:
+                found, velocity = self.column_store.window_mean(token_id, 'velocity', time_threshold)
+                if found:
+                    return velocity
+            
             # Get metrics from the specified timeframe
             metrics = db.session.query(TokenMetric).filter(
                 TokenMetric.token_id == token_id,
@@ -157,78 +305,318 @@ class DataService:
             return sum(velocities) / len(velocities)
             
         except Exception as e:
-            print(f"Error calculating historical velocity: {e}")
+            logger.exception("Error calculating historical velocity")
             return None
     
     def calculate_velocity_trend(self, token_id):
         """Determine velocity trend based on recent historical data"""
         try:
-            # Get recent metrics (last 24 hours)
-            time_threshold = datetime.utcnow() - timedelta(hours=24)
-            metrics = db.session.query(TokenMetric).filter(
-                TokenMetric.token_id == token_id,
-                TokenMetric.timestamp >= time_threshold,
-                TokenMetric.velocity.isnot(None)
-            ).order_by(TokenMetric.timestamp.desc()).limit(10).all()
-            
-            if len(metrics) < 3:
-                return "insufficient_data"
-            
-            velocities = [float(m.velocity) for m in metrics]
-            
-            # Compare recent average with older average
-            recent_avg = sum(velocities[:3]) / 3
-            older_avg = sum(velocities[3:6]) / 3 if len(velocities) >= 6 else recent_avg
-            
-            change_threshold = 0.05  # 5% change threshold
-            
-            if older_avg == 0:
-                return "stable"
-            
-            change_ratio = (recent_avg - older_avg) / older_avg
-            
-            if change_ratio > change_threshold:
-                return "increasing"
-            elif change_ratio < -change_threshold:
-                return "decreasing"
-            else:
-                return "stable"
+            return self.calculate_velocity_trends([token_id])[token_id]
                 
         except Exception as e:
-            print(f"Error calculating velocity trend: {e}")
+            logger.exception("Error calculating velocity trend")
             return "unknown"
     
+    def calculate_velocity_trends(self, token_ids):
+        """Determine velocity trends for several tokens with one windowed query"""
+        token_ids = list(token_ids)
+        if not token_ids:
+            return {}
+        
+        # Last 10 non-null velocities per token from the last 24 hours
+        time_threshold = datetime.utcnow() - timedelta(hours=24)
+        ranked = select(
+            TokenMetric.token_id,
+            type_coerce(TokenMetric.velocity, Float).label('velocity'),
+            db.func.row_number().over(
+                partition_by=TokenMetric.token_id,
+                order_by=TokenMetric.timestamp.desc()
+            ).label('position')
+        ).where(
+            TokenMetric.token_id.in_(token_ids),
+            TokenMetric.timestamp >= time_threshold,
+            TokenMetric.velocity.isnot(None)
+        ).subquery()
+        
+        rows = db.session.execute(
+            select(ranked.c.token_id, ranked.c.velocity)
+            .where(ranked.c.position <= 10)
+            .order_by(ranked.c.token_id, ranked.c.position)
+        )
+        
+        velocities = defaultdict(list)
+        for token_id, velocity in rows:
+            velocities[token_id].append(velocity)
+        
+        return {token_id: self._velocity_trend(velocities.get(token_id, [])) for token_id in token_ids}
+    
+    def _velocity_trend(self, velocities):
+        """Classify a newest-first list of velocities"""
+        if len(velocities) < 3:
+            return "insufficient_data"
+        
+        # Compare recent average with older average
+        recent_avg = sum(velocities[:3]) / 3
+        older_avg = sum(velocities[3:6]) / 3 if len(velocities) >= 6 else recent_avg
+        
+        change_threshold = 0.05  # 5% change threshold
+        
+        if older_avg == 0:
+            return "stable"
+        
+        change_ratio = (recent_avg - older_avg) / older_avg
+        
+        if change_ratio > change_threshold:
+            return "increasing"
+        elif change_ratio < -change_threshold:
+            return "decreasing"
+        else:
+            return "stable"
+    
+    def _latest_metric_join(self, stmt):
+        """Outer-join ``stmt`` (selecting from Token) to each token's latest metric"""
+        latest = select(
+            TokenMetric.token_id,
+            db.func.max(TokenMetric.timestamp).label('latest_timestamp')
+        ).group_by(TokenMetric.token_id).subquery()
+        
+        return stmt.select_from(Token).outerjoin(
+            latest, latest.c.token_id == Token.id
+        ).outerjoin(
+            TokenMetric,
+            db.and_(
+                TokenMetric.token_id == latest.c.token_id,
+                TokenMetric.timestamp == latest.c.latest_timestamp
+            )
+        )
+    
+    def latest_quote_query(self, selection=LIST_SELECTION):
+        """Core select of token columns joined to each token's latest metric.
+        
+        Only the columns named by ``selection`` are selected. Rows are
+        ``(token_id, *token_fields, *quote_fields, last_updated)``; tokens
+        without metrics are kept with ``None`` quote values.
+        """
+        return self._latest_metric_join(select(
+            Token.id.label('_token_id'),
+            *token_columns(selection.token_fields),
+            *metric_columns(quote_mapping(selection.quote_fields)),
+            TokenMetric.timestamp.label('last_updated')
+        ))
+    
+    def serialize_quote_rows(self, rows, selection=LIST_SELECTION, convert='USD'):
+        """Turn ``latest_quote_query`` rows into API token payloads.
+        
+        ``convert`` is a currency code or list of codes; quotes for the whole
+        page are converted in one pass through the rate table.
+        """
+        rows = list(rows)
+        currencies = [convert] if isinstance(convert, str) else list(convert)
+        token_fields, quote_fields, include_trend, include_last_updated = selection
+        serialize_token = compile_row_serializer(token_fields)
+        serialize_quote = compile_row_serializer(quote_fields)
+        include_quote = bool(quote_fields) or include_trend
+        quote_start = 1 + len(token_fields)
+        quote_end = quote_start + len(quote_fields)
+        
+        trends = {}
+        if include_trend:
+            trends = self.calculate_velocity_trends(row[0] for row in rows if row[-1] is not None)
+        
+        payloads = []
+        quoted = []
+        for row in rows:
+            token_dict = serialize_token(row[1:quote_start])
+            last_updated = row[-1]
+            if not include_quote:
+                pass
+            elif last_updated is not None:
+                quote = serialize_quote(row[quote_start:quote_end])
+                if include_trend:
+                    quote['velocity_trend'] = trends[row[0]]
+                quoted.append((token_dict, quote))
+            else:
+                token_dict['quote'] = {currency: {} for currency in currencies}
+            if include_last_updated:
+                token_dict['last_updated'] = last_updated.isoformat() if last_updated is not None else None
+            payloads.append(token_dict)
+        
+        if quoted:
+            converted = rate_table.convert_quotes([quote for _, quote in quoted], currencies)
+            for (token_dict, _), quote in zip(quoted, converted):
+                token_dict['quote'] = quote
+        
+        return payloads
+    
+    def resolve_token_id(self, identifier):
+        """Resolve a CMC id, symbol or slug to the internal token id"""
+        return self.resolve_token_ids([identifier]).get(str(identifier))
+    
+    def resolve_token_ids(self, identifiers):
+        """Resolve a mix of CMC ids, symbols and slugs with a single query.
+        
+        Returns ``{identifier: token_id}`` for the identifiers that matched.
+        Each identifier is tried as a CMC id, then a symbol, then a slug.
+        """
+        identifiers = [str(identifier) for identifier in identifiers]
+        if not identifiers:
+            return {}
+        
+        cmc_ids = {int(identifier) for identifier in identifiers if identifier.isdigit()}
+        symbols = {identifier.upper() for identifier in identifiers}
+        slugs = {identifier.lower() for identifier in identifiers}
+        
+        conditions = [Token.symbol.in_(symbols), Token.slug.in_(slugs)]
+        if cmc_ids:
+            conditions.append(Token.cmc_id.in_(cmc_ids))
+        
+        rows = db.session.execute(
+            select(Token.id, Token.cmc_id, Token.symbol, Token.slug)
+            .where(db.or_(*conditions))
+            .order_by(Token.id)
+        )
+        
+        # The lowest id wins when symbols or slugs are shared
+        by_cmc_id, by_symbol, by_slug = {}, {}, {}
+        for token_id, cmc_id, symbol, slug in rows:
+            by_cmc_id.setdefault(cmc_id, token_id)
+            by_symbol.setdefault(symbol, token_id)
+            by_slug.setdefault(slug, token_id)
+        
+        resolved = {}
+        for identifier in identifiers:
+            token_id = None
+            if identifier.isdigit():
+                token_id = by_cmc_id.get(int(identifier))
+            if token_id is None:
+                token_id = by_symbol.get(identifier.upper())
+            if token_id is None:
+                token_id = by_slug.get(identifier.lower())
+            if token_id is not None:
+                resolved[identifier] = token_id
+        return resolved
+    
+    def _latest_metric_row(self, token_id, mapping):
+        """Latest metric of a token as a dict keyed by ``mapping``'s keys"""
+        keys = tuple(mapping) + ('timestamp',)
+        row = db.session.execute(
+            select(*metric_columns(mapping), TokenMetric.timestamp)
+            .where(TokenMetric.token_id == token_id)
+            .order_by(TokenMetric.timestamp.desc())
+            .limit(1)
+        ).first()
+        if row is None:
+            return None
+        return compile_row_serializer(keys)(row)
+    
+    HISTORY_INTERVALS = {
+        '1h': timedelta(hours=1),
+        '4h': timedelta(hours=4),
+        '12h': timedelta(hours=12),
+        '1d': timedelta(days=1),
+        '7d': timedelta(days=7)
+    }
+    
+    def get_token_history(self, token_id, time_start, time_end, interval='1d', selection=HISTORY_SELECTION,
+                          convert='USD'):
+        """Get historical quotes for a token, one sample per interval.
+        
+        Only the quote columns in ``selection`` are read. Each interval
+        bucket is represented by its most recent metric.
+        """
+        bucket_seconds = self.HISTORY_INTERVALS[interval].total_seconds()
+        quote_fields = selection.quote_fields
+        serialize_quote = compile_row_serializer(quote_fields)
+        currencies = [convert] if isinstance(convert, str) else list(convert)
+        
+        stored = self.column_store.range(token_id, time_start, time_end) if self.column_store is not None else None
+        if stored is not None:
+            return self._stored_history(stored, bucket_seconds, quote_fields, serialize_quote, currencies)
+        
+        rows = db.session.execute(
+            select(TokenMetric.timestamp, *metric_columns(quote_mapping(quote_fields)))
+            .where(
+                TokenMetric.token_id == token_id,
+                TokenMetric.timestamp >= time_start,
+                TokenMetric.timestamp <= time_end
+            )
+            .order_by(TokenMetric.timestamp.asc())
+        )
+        
+        # Rows arrive in time order, so the last row seen per bucket wins
+        buckets = {}
+        for row in rows:
+            timestamp = row[0]
+            buckets[int((timestamp - EPOCH).total_seconds() // bucket_seconds)] = row
+        
+        quotes = rate_table.convert_quotes([serialize_quote(row[1:]) for row in buckets.values()], currencies)
+        return [
+            {
+                'timestamp': row[0].isoformat(),
+                'quote': quote
+            }
+            for row, quote in zip(buckets.values(), quotes)
+        ]
+    
+    def _stored_history(self, stored, bucket_seconds, quote_fields, serialize_quote, currencies):
+        """``get_token_history`` over column store slices; the last row per bucket wins"""
+        timestamps, columns = stored
+        if not len(timestamps):
+            return []
+        buckets = timestamps // int(bucket_seconds * 1_000_000)
+        last = np.flatnonzero(np.append(buckets[1:] != buckets[:-1], True))
+        values = [columns[QUOTE_FIELDS[field]][last] for field in quote_fields]
+        rows = zip(*([None if value != value else value for value in column.tolist()] for column in values)) \
+            if values else ((),) * len(last)
+        quotes = rate_table.convert_quotes([serialize_quote(row) for row in rows], currencies)
+        return [
+            {
+                'timestamp': from_micros(timestamp).isoformat(),
+                'quote': quote
+            }
+            for timestamp, quote in zip(timestamps[last].tolist(), quotes)
+        ]
+    
     def get_velocity_metrics(self, token_id, timeframe='24h', include_trend=True):
         """Get detailed velocity metrics for a token"""
         try:
             # Get latest metric
-            latest_metric = db.session.query(TokenMetric).filter(
-                TokenMetric.token_id == token_id
-            ).order_by(TokenMetric.timestamp.desc()).first()
+            latest_metric = self._latest_metric_row(token_id, {
+                'velocity': 'velocity',
+                'velocity_1h': 'velocity_1h',
+                'velocity_4h': 'velocity_4h',
+                'velocity_12h': 'velocity_12h',
+                'velocity_7d': 'velocity_7d',
+                'volume_24h': 'volume_24h_usd',
+                'market_cap': 'market_cap_usd',
+                'data_quality_score': 'data_quality_score'
+            })
             
             if not latest_metric:
                 return None
             
-            token = Token.query.get(token_id)
-            if not token:
+            symbol = db.session.execute(
+                select(Token.symbol).where(Token.id == token_id)
+            ).scalar()
+            if symbol is None:
                 return None
             
             velocity_data = {
                 'token_id': token_id,
-                'symbol': token.symbol,
+                'symbol': symbol,
                 'velocity_metrics': {
-                    'current_velocity': float(latest_metric.velocity) if latest_metric.velocity else None,
-                    'velocity_1h': float(latest_metric.velocity_1h) if latest_metric.velocity_1h else None,
-                    'velocity_4h': float(latest_metric.velocity_4h) if latest_metric.velocity_4h else None,
-                    'velocity_12h': float(latest_metric.velocity_12h) if latest_metric.velocity_12h else None,
-                    'velocity_24h': float(latest_metric.velocity) if latest_metric.velocity else None,
-                    'velocity_7d': float(latest_metric.velocity_7d) if latest_metric.velocity_7d else None
+                    'current_velocity': latest_metric['velocity'],
+                    'velocity_1h': latest_metric['velocity_1h'],
+                    'velocity_4h': latest_metric['velocity_4h'],
+                    'velocity_12h': latest_metric['velocity_12h'],
+                    'velocity_24h': latest_metric['velocity'],
+                    'velocity_7d': latest_metric['velocity_7d']
                 },
                 'calculation_details': {
-                    'volume_24h': float(latest_metric.volume_24h_usd) if latest_metric.volume_24h_usd else None,
-                    'market_cap': float(latest_metric.market_cap_usd) if latest_metric.market_cap_usd else None,
-                    'calculation_time': latest_metric.timestamp.isoformat(),
-                    'data_quality_score': float(latest_metric.data_quality_score) if latest_metric.data_quality_score else None
+                    'volume_24h': latest_metric['volume_24h'],
+                    'market_cap': latest_metric['market_cap'],
+                    'calculation_time': latest_metric['timestamp'],
+                    'data_quality_score': latest_metric['data_quality_score']
                 }
             }
             
@@ -242,82 +630,73 @@ class DataService:
             return velocity_data
             
         except Exception as e:
-            print(f"Error getting velocity metrics: {e}")
+            logger.exception("Error getting velocity metrics")
             return None
     
     def get_token_data(self, token_id):
         """Get current token data for WebSocket updates"""
         try:
-            # Find token
-            token = None
-            if str(token_id).isdigit():
-                token = Token.query.filter_by(cmc_id=int(token_id)).first()
-            if not token:
-                token = Token.query.filter_by(symbol=str(token_id).upper()).first()
-            if not token:
-                token = Token.query.filter_by(slug=str(token_id).lower()).first()
-            
-            if not token:
-                return None
-            
-            # Get latest metric
-            latest_metric = db.session.query(TokenMetric).filter(
-                TokenMetric.token_id == token.id
-            ).order_by(TokenMetric.timestamp.desc()).first()
-            
-            if not latest_metric:
-                return None
-            
-            return {
-                'token_id': token.id,
-                'symbol': token.symbol,
-                'timestamp': latest_metric.timestamp.isoformat(),
-                'data': {
-                    'price': float(latest_metric.price_usd) if latest_metric.price_usd else None,
-                    'volume_24h': float(latest_metric.volume_24h_usd) if latest_metric.volume_24h_usd else None,
-                    'market_cap': float(latest_metric.market_cap_usd) if latest_metric.market_cap_usd else None,
-                    'velocity': float(latest_metric.velocity) if latest_metric.velocity else None,
-                    'change_24h': float(latest_metric.percent_change_24h) if latest_metric.percent_change_24h else None
-                }
-            }
+            return self.get_tokens_data([token_id]).get(str(token_id))
             
         except Exception as e:
-            print(f"Error getting token data: {e}")
+            logger.exception("Error getting token data")
             return None
     
-    def get_market_update(self):
-        """Get market-wide update data for WebSocket broadcast"""
-        try:
-            # Get latest metrics for top tokens
-            latest_time = datetime.utcnow() - timedelta(minutes=5)
-            
-            metrics = db.session.query(TokenMetric, Token).join(
-                Token, TokenMetric.token_id == Token.id
-            ).filter(
-                TokenMetric.timestamp >= latest_time
-            ).order_by(TokenMetric.market_cap_usd.desc()).limit(20).all()
-            
-            tokens_data = []
-            for metric, token in metrics:
-                tokens_data.append({
-                    'id': token.id,
-                    'symbol': token.symbol,
-                    'price': float(metric.price_usd) if metric.price_usd else None,
-                    'velocity': float(metric.velocity) if metric.velocity else None,
-                    'change_24h': float(metric.percent_change_24h) if metric.percent_change_24h else None
-                })
-            
-            return {
-                'timestamp': datetime.utcnow().isoformat(),
-                'tokens': tokens_data
+    def get_tokens_data(self, identifiers):
+        """Get current WebSocket token data for several tokens at once.
+        
+        Returns ``{identifier: payload}`` for identifiers that resolved to a
+        token with at least one metric; two queries regardless of count.
+        """
+        resolved = self.resolve_token_ids(identifiers)
+        if not resolved:
+            return {}
+        
+        payloads = self.get_socket_payloads(set(resolved.values()))
+        
+        return {
+            identifier: payloads[token_id]
+            for identifier, token_id in resolved.items()
+            if token_id in payloads
+        }
+    
+    def get_socket_payloads(self, token_ids):
+        """``{token_id: token_update payload}`` by internal id, with one query"""
+        if not token_ids:
+            return {}
+        
+        keys = ('token_id', 'symbol') + tuple(SOCKET_FIELDS) + ('timestamp',)
+        serialize = compile_row_serializer(keys)
+        rows = db.session.execute(
+            self._latest_metric_join(select(
+                Token.id.label('token_id'),
+                Token.symbol.label('symbol'),
+                *metric_columns(SOCKET_FIELDS),
+                TokenMetric.timestamp.label('timestamp')
+            )).where(
+                Token.id.in_(token_ids),
+                TokenMetric.id.isnot(None)
+            )
+        )
+        
+        payloads = {}
+        for row in rows:
+            data = serialize(row)
+            token_id = data.pop('token_id')
+            payloads[token_id] = {
+                'token_id': token_id,
+                'symbol': data.pop('symbol'),
+                'timestamp': data.pop('timestamp'),
+                'data': data
             }
-            
-        except Exception as e:
-            print(f"Error getting market update: {e}")
-            return None
+        
+        return payloads
     
     def get_market_overview(self):
-        """Get market overview data"""
+        """Get market overview data; concurrent callers share one computation"""
+        return self.flights.do('market_overview', None, self._compute_market_overview)
+    
+    def _compute_market_overview(self):
         try:
             # Calculate market statistics
             latest_time = datetime.utcnow() - timedelta(minutes=5)
@@ -350,6 +729,6 @@ class DataService:
             }
             
         except Exception as e:
-            print(f"Error getting market overview: {e}")
+            logger.exception("Error getting market overview")
             return None
 
@@ -0,0 +1,160 @@
+"""Streaming export of ``token_metrics`` history.
+
+Rows are read through a server-side cursor (``yield_per``) in chunks of
+``EXPORT_CHUNK_SIZE`` and encoded chunk by chunk. Memory stays bounded by
+one chunk whatever the time range. NDJSON and CSV are always available;
+Parquet needs the optional ``pyarrow`` package and writes one row group
+per chunk.
+"""
+import csv
+import io
+import json
+import logging
+from sqlalchemy import select
+from src.models.token import db, Token, TokenMetric
+from src.utils.serialization import compile_row_serializer, metric_columns, quote_mapping
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = 1000
+
+# Leading columns of every export row, before the selected quote fields
+EXPORT_KEY_FIELDS = ('cmc_id', 'symbol', 'timestamp')
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet')
+}
+
+
+def parse_export_format(value):
+    """Validate an export ``format`` parameter"""
+    export_format = (value or 'ndjson').lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Invalid parameter: format must be one of {', '.join(EXPORT_FORMATS)}")
+    if export_format == 'parquet' and pa is None:
+        raise ValueError("Parquet export requires the pyarrow package")
+    return export_format
+
+
+def export_query(token_ids, time_start, time_end, quote_fields):
+    """Metrics for ``token_ids`` (all tokens when None) in ``[time_start, time_end]``"""
+    query = select(
+        Token.cmc_id, Token.symbol, TokenMetric.timestamp,
+        *metric_columns(quote_mapping(quote_fields))
+    ).join(Token, Token.id == TokenMetric.token_id).where(
+        TokenMetric.timestamp >= time_start,
+        TokenMetric.timestamp <= time_end
+    ).order_by(TokenMetric.token_id, TokenMetric.timestamp)
+
+    if token_ids is not None:
+        query = query.where(TokenMetric.token_id.in_(token_ids))
+    return query
+
+
+def iter_chunks(query, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield lists of row tuples from a server-side cursor"""
+    result = db.session.execute(query, execution_options={'yield_per': chunk_size})
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def _ndjson(chunks, keys):
+    serialize = compile_row_serializer(keys)
+    for chunk in chunks:
+        yield ''.join(json.dumps(serialize(row)) + '\n' for row in chunk).encode()
+
+
+def _csv(chunks, keys):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(keys)
+    for chunk in chunks:
+        writer.writerows(
+            (row[0], row[1], row[2].isoformat()) + tuple(row[3:]) for row in chunk
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back in pieces.
+
+    The Parquet writer records column chunk offsets with ``tell()``, so the
+    position keeps counting while the buffer is drained.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _parquet(chunks, keys):
+    schema = pa.schema(
+        [('cmc_id', pa.int64()), ('symbol', pa.string()), ('timestamp', pa.timestamp('us'))] +
+        [(key, pa.float64()) for key in keys[len(EXPORT_KEY_FIELDS):]]
+    )
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema)
+    try:
+        for chunk in chunks:
+            columns = list(zip(*chunk))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            ))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+_ENCODERS = {'ndjson': _ndjson, 'csv': _csv, 'parquet': _parquet}
+
+
+def stream_export(query, quote_fields, export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """Encode the rows of ``query`` as an iterator of byte strings"""
+    keys = EXPORT_KEY_FIELDS + tuple(quote_fields)
+    try:
+        yield from _ENCODERS[export_format](iter_chunks(query, chunk_size), keys)
+    except Exception:
+        # Headers are already sent; the truncated body is the only signal left
+        logger.exception("Error streaming export", extra={'format': export_format})
+        raise
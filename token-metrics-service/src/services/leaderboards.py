@@ -0,0 +1,115 @@
+"""Top movers and leaderboards ranked once per market snapshot.
+
+Each board orders the snapshot's tokens by one metric: gainers and losers
+by 1h, 24h and 7d change, and the highest velocity, volume and market
+cap. ``Leaderboards.update`` ranks every board when the ingest loop builds
+a new snapshot, so a request reads the top N of a board as a slice of a
+ranked position array, whatever the size of the universe.
+
+Boards are only read up to ``MAX_MOVERS_LIMIT`` deep, so ranking keeps
+just that many: a partition finds them in linear time and only they are
+sorted. Ties are broken by token id, as in ``MarketSnapshot.screen``.
+"""
+import threading
+from datetime import datetime
+import numpy as np
+
+# board -> (metric, descending, which values qualify)
+BOARDS = {
+    'gainers_1h': ('percent_change_1h', True, 'positive'),
+    'losers_1h': ('percent_change_1h', False, 'negative'),
+    'gainers_24h': ('percent_change_24h', True, 'positive'),
+    'losers_24h': ('percent_change_24h', False, 'negative'),
+    'gainers_7d': ('percent_change_7d', True, 'positive'),
+    'losers_7d': ('percent_change_7d', False, 'negative'),
+    'velocity': ('velocity', True, 'present'),
+    'volume_24h': ('volume_24h', True, 'present'),
+    'market_cap': ('market_cap', True, 'present')
+}
+
+DEFAULT_MOVERS_LIMIT = 10
+MAX_MOVERS_LIMIT = 100
+
+# Tokens in each ``market_update`` broadcast, by market cap
+MARKET_UPDATE_TOKENS = 20
+
+_QUALIFY = {
+    'positive': lambda values: values > 0,
+    'negative': lambda values: values < 0,
+    'present': lambda values: ~np.isnan(values)
+}
+
+
+def parse_boards(value):
+    """Parse ``board=gainers_24h,velocity``; every board when empty"""
+    boards = [board.strip() for board in (value or '').split(',') if board.strip()]
+    for board in boards:
+        if board not in BOARDS:
+            raise ValueError(f"Invalid parameter: board must be one of {', '.join(BOARDS)}")
+    return list(dict.fromkeys(boards)) or list(BOARDS)
+
+
+def rank(values, ids, descending, qualify, depth=MAX_MOVERS_LIMIT):
+    """Positions of the first ``depth`` qualifying ``values`` in board order"""
+    with np.errstate(invalid='ignore'):
+        candidates = np.flatnonzero(_QUALIFY[qualify](values))
+    keys = -values[candidates] if descending else values[candidates]
+    if len(candidates) > depth:
+        # Everything up to the depth-th key, ties at the boundary included
+        threshold = np.partition(keys, depth - 1)[depth - 1]
+        within = keys <= threshold
+        candidates, keys = candidates[within], keys[within]
+    return candidates[np.lexsort((ids[candidates], keys))[:depth]]
+
+
+class Leaderboards:
+    """Ranked boards for the current snapshot; readers always see a complete set"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (snapshot, {board: ranked positions}), swapped as one
+        self._ranked = (None, {})
+
+    def update(self, snapshot):
+        """Rank every board for ``snapshot``; returns ``{board: positions}``"""
+        with self._lock:
+            current, boards = self._ranked
+            if current is snapshot:
+                return boards
+            boards = {
+                board: rank(snapshot.columns[metric], snapshot.ids, descending, qualify)
+                for board, (metric, descending, qualify) in BOARDS.items()
+            }
+            # A request still holding an older snapshot must not replace the newer ranking
+            if current is None or snapshot.built_at >= current.built_at:
+                self._ranked = (snapshot, boards)
+            return boards
+
+    def top(self, snapshot, board, limit):
+        """Snapshot positions of the first ``limit`` tokens of ``board``"""
+        ranked_snapshot, boards = self._ranked
+        if ranked_snapshot is not snapshot:
+            boards = self.update(snapshot)
+        return boards[board][:limit]
+
+    def market_update(self, snapshot):
+        """``market_update`` broadcast: the largest tokens by market cap"""
+        positions = self.top(snapshot, 'market_cap', MARKET_UPDATE_TOKENS)
+        columns = snapshot.columns
+        tokens = []
+        for position in positions.tolist():
+            tokens.append({
+                'id': snapshot.tokens['id'][position],
+                'symbol': snapshot.tokens['symbol'][position],
+                'price': _value(columns['price'][position]),
+                'velocity': _value(columns['velocity'][position]),
+                'change_24h': _value(columns['percent_change_24h'][position])
+            })
+        return {
+            'timestamp': datetime.utcnow().isoformat(),
+            'tokens': tokens
+        }
+
+
+def _value(value):
+    return None if value != value else float(value)
@@ -0,0 +1,202 @@
+"""Token metadata enrichment from CoinMarketCap's ``/cryptocurrency/info``.
+
+The listings the ingester fetches every tick carry no description, logo or
+project links, so those ``tokens`` columns start empty. ``MetadataEnricher``
+fills them from the info endpoint outside the ingest loop:
+
+- only tokens that were never fetched, or whose last fetch is older than
+  the TTL, are requested; ``token_enrichment`` records when each token was
+  last fetched, so a new token is picked up on the next run
+- up to ``batch_size`` ids go into one upstream call, the newest tokens
+  first and then the stalest
+- each run makes at most ``max_calls`` calls, spaced ``min_interval``
+  seconds apart, on its own HTTP session; a 429 or upstream error ends
+  the run and the remaining tokens wait for the next one
+- metadata is written to the token row only when it changed, so a
+  refresh of unchanged tokens only touches ``token_enrichment``
+
+List endpoints leave the metadata fields out unless ``fields=`` asks for
+them; token details always include them.
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+import requests
+from sqlalchemy import or_, select, update
+from src.models.token import db, Token, TokenEnrichment
+from src.utils.metrics import METADATA_REQUESTS
+from src.utils.serialization import METADATA_FIELDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METADATA_TTL = timedelta(days=7)
+# The info endpoint accepts many ids per call and bills one credit per 100
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_CALLS = 5
+DEFAULT_MIN_INTERVAL = 2.0
+
+# Longest value each metadata column accepts; longer upstream values are cut
+_COLUMN_LENGTHS = {
+    name: getattr(Token.__table__.c[name].type, 'length', None) for name in METADATA_FIELDS
+}
+
+
+class MetadataError(Exception):
+    pass
+
+
+def _first(urls, key, contains=None):
+    values = [url for url in urls.get(key) or [] if url]
+    if contains:
+        values = [url for url in values if contains in url] or values
+    return values[0] if values else None
+
+
+def _twitter_handle(entry, urls):
+    handle = entry.get('twitter_username')
+    if not handle:
+        url = _first(urls, 'twitter')
+        handle = url.rstrip('/').rsplit('/', 1)[-1] if url else None
+    return handle.lstrip('@') if handle else None
+
+
+def metadata_from_info(entry):
+    """Metadata column values of one ``/cryptocurrency/info`` entry"""
+    urls = entry.get('urls') or {}
+    values = {
+        'description': (entry.get('description') or '').strip() or None,
+        'logo_url': entry.get('logo') or None,
+        'website_url': _first(urls, 'website'),
+        'twitter_handle': _twitter_handle(entry, urls),
+        'reddit_url': _first(urls, 'reddit'),
+        'github_url': _first(urls, 'source_code', contains='github.com'),
+        'whitepaper_url': _first(urls, 'technical_doc')
+    }
+    for name, length in _COLUMN_LENGTHS.items():
+        if length and values[name] and len(values[name]) > length:
+            values[name] = values[name][:length]
+    return values
+
+
+class MetadataEnricher:
+    """Fetch and store metadata for tokens that are new or past the TTL"""
+
+    def __init__(self, data_service, ttl=DEFAULT_METADATA_TTL, batch_size=DEFAULT_BATCH_SIZE,
+                 max_calls=DEFAULT_MAX_CALLS, min_interval=DEFAULT_MIN_INTERVAL, clock=datetime.utcnow):
+        if batch_size < 1 or max_calls < 1 or min_interval < 0:
+            raise ValueError('Invalid parameter: batch size and calls must be positive')
+        self.base_url = data_service.cmc_base_url
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.max_calls = max_calls
+        self.min_interval = min_interval
+        self.clock = clock
+        # Separate from the ingest session: runs happen on another thread
+        self.session = requests.Session()
+        self.session.headers.update(data_service.session.headers)
+        self._last_call = None
+
+    def due(self, cutoff, limit, token_ids=None):
+        """``[(token_id, cmc_id)]`` of tokens not fetched since ``cutoff``, never-fetched first"""
+        query = select(Token.id, Token.cmc_id).outerjoin(
+            TokenEnrichment, TokenEnrichment.token_id == Token.id
+        ).where(or_(TokenEnrichment.fetched_at.is_(None), TokenEnrichment.fetched_at < cutoff))
+        if token_ids is not None:
+            query = query.where(Token.id.in_(token_ids))
+        else:
+            query = query.where(Token.is_active == True)
+        query = query.order_by(TokenEnrichment.fetched_at.asc().nulls_first(), Token.id).limit(limit)
+        return db.session.execute(query).all()
+
+    def fetch(self, cmc_ids):
+        """``{cmc_id: info entry}`` for one batch; ids the upstream does not know are absent"""
+        if self._last_call is not None:
+            wait = self.min_interval - (time.monotonic() - self._last_call)
+            if wait > 0:
+                time.sleep(wait)
+        self._last_call = time.monotonic()
+        try:
+            response = self.session.get(f'{self.base_url}/cryptocurrency/info', params={
+                'id': ','.join(str(cmc_id) for cmc_id in cmc_ids),
+                'aux': 'urls,logo,description',
+                'skip_invalid': 'true'
+            }, timeout=30)
+            if response.status_code == 429:
+                METADATA_REQUESTS.labels(result='rate_limited').inc()
+                raise MetadataError('Rate limited by the info endpoint')
+            response.raise_for_status()
+            data = response.json()
+        except requests.RequestException as e:
+            METADATA_REQUESTS.labels(result='error').inc()
+            raise MetadataError(f'Fetching token metadata failed: {e}')
+        if data.get('status', {}).get('error_code') != 0:
+            METADATA_REQUESTS.labels(result='error').inc()
+            raise MetadataError(data.get('status', {}).get('error_message'))
+        METADATA_REQUESTS.labels(result='ok').inc()
+        return {int(key): entry for key, entry in (data.get('data') or {}).items()}
+
+    def store(self, batch, entries, fetched_at):
+        """Write one fetched batch; returns the number of token rows changed"""
+        token_ids = [token_id for token_id, _ in batch]
+        current = {
+            row[0]: dict(zip(METADATA_FIELDS, row[1:]))
+            for row in db.session.execute(
+                select(Token.id, *(getattr(Token, name) for name in METADATA_FIELDS))
+                .where(Token.id.in_(token_ids))
+            )
+        }
+        changed = []
+        for token_id, cmc_id in batch:
+            entry = entries.get(cmc_id)
+            if entry is None:
+                continue
+            values = metadata_from_info(entry)
+            if values != current.get(token_id):
+                changed.append(dict(values, id=token_id))
+        if changed:
+            db.session.execute(update(Token), changed)
+
+        fetched = set(db.session.execute(
+            select(TokenEnrichment.token_id).where(TokenEnrichment.token_id.in_(token_ids))
+        ).scalars())
+        rows = [
+            {'token_id': token_id, 'fetched_at': fetched_at, 'found': cmc_id in entries}
+            for token_id, cmc_id in batch
+        ]
+        inserted = [row for row in rows if row['token_id'] not in fetched]
+        if inserted:
+            db.session.execute(TokenEnrichment.__table__.insert(), inserted)
+        updated = [row for row in rows if row['token_id'] in fetched]
+        if updated:
+            db.session.execute(update(TokenEnrichment), updated)
+        db.session.commit()
+        return len(changed)
+
+    def run(self, token_ids=None, force=False, max_calls=None):
+        """Enrich due tokens within the call budget; returns counts.
+
+        ``token_ids`` limits the run to those tokens, active or not.
+        ``force`` refetches them whatever their age. ``max_calls``
+        overrides the per-run budget.
+        """
+        started = self.clock()
+        cutoff = started if force else started - self.ttl
+        max_calls = max_calls or self.max_calls
+        stats = {'calls': 0, 'requested': 0, 'found': 0, 'changed': 0, 'error': None}
+        while stats['calls'] < max_calls:
+            batch = self.due(cutoff, self.batch_size, token_ids)
+            if not batch:
+                break
+            stats['calls'] += 1
+            try:
+                entries = self.fetch([cmc_id for _, cmc_id in batch])
+            except MetadataError as e:
+                stats['error'] = str(e)
+                logger.warning("Token metadata enrichment stopped", extra={'error_message': str(e)})
+                break
+            stats['changed'] += self.store(batch, entries, self.clock())
+            stats['requested'] += len(batch)
+            stats['found'] += sum(1 for _, cmc_id in batch if cmc_id in entries)
+        if stats['calls']:
+            logger.info("Enriched token metadata", extra=stats)
+        return stats
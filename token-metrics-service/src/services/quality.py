@@ -0,0 +1,251 @@
+"""Data-quality scoring and quarantine for ingested listings.
+
+Every fetched batch is checked as a whole before anything is written. The
+listings are laid out as column arrays next to each token's latest stored
+quote, fetched with one query, and every check is a vectorized expression:
+
+- staleness: age of the upstream ``last_updated`` at ingest time
+- jumps: log change of price and volume against the latest stored row
+- consistency: market cap against price x circulating supply
+- sanity: a positive price, a market cap that did not vanish, and a
+  volume/market cap ratio under the velocity cap
+
+Each check takes a weighted share off a score of 1.0, which is stored as
+``data_quality_score``. Records failing a check outright, or scoring under
+``MIN_QUALITY_SCORE``, go to the ``quarantined_metrics`` table instead of
+``token_metrics``. They never enter the history, the rolling velocity
+averages or any read model, so nothing downstream needs recomputing.
+
+A jump that persists is a real move rather than a bad tick. When the
+next tick lands near the quarantined value instead of the stored one, it
+is accepted.
+"""
+import json
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+import numpy as np
+from src.models.token import db, Token, QuarantinedMetric
+from src.utils.metrics import QUARANTINED_RECORDS
+from src.utils.serialization import FieldSelection
+
+# Same cap as ``DataService._calculate_velocity``
+MAX_VELOCITY = 100.0
+
+# Staleness: no penalty up to STALE_AFTER, quarantined past STALE_LIMIT
+STALE_AFTER = timedelta(minutes=10)
+STALE_LIMIT = timedelta(hours=1)
+
+# Largest accepted absolute log change between consecutive ticks
+PRICE_JUMP_LIMIT = np.log(3.0)
+VOLUME_JUMP_LIMIT = np.log(20.0)
+
+# Jumps are only judged against stored quotes at most this old
+JUMP_HORIZON = timedelta(hours=24)
+
+# Largest accepted relative gap between market cap and price x circulating supply
+CONSISTENCY_LIMIT = 0.25
+
+# Share of the score each check can take away
+PENALTY_WEIGHTS = {
+    'stale': 0.2,
+    'price_jump': 0.3,
+    'volume_spike': 0.2,
+    'inconsistent_market_cap': 0.3,
+    'missing_market_cap': 0.2
+}
+
+MIN_QUALITY_SCORE = 0.5
+
+# Checks that quarantine a record outright when they fail
+QUARANTINE_REASONS = (
+    'missing_price', 'market_cap_dropped', 'velocity_cap',
+    'stale', 'price_jump', 'volume_spike', 'inconsistent_market_cap', 'low_score'
+)
+
+BatchScore = namedtuple('BatchScore', 'scores quarantined reasons')
+
+_PREVIOUS_SELECTION = FieldSelection(('cmc_id',), ('price', 'market_cap', 'volume_24h'), False, True)
+
+
+def _number(value):
+    return np.nan if value is None else float(value)
+
+
+def _log_change(current, previous):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = np.abs(np.log(current / previous))
+    return np.where(np.isfinite(change), change, np.nan)
+
+
+def _share(values, start, limit):
+    """0 at or below ``start``, rising to 1 at ``limit``; 0 where missing"""
+    with np.errstate(invalid='ignore'):
+        share = np.clip((values - start) / (limit - start), 0.0, 1.0)
+    return np.nan_to_num(share)
+
+
+def score_batch(columns, previous, pending):
+    """Score a batch laid out as arrays.
+
+    ``columns`` holds ``price``, ``market_cap``, ``volume_24h``,
+    ``circulating_supply`` and ``age_seconds`` (upstream staleness);
+    ``previous`` holds ``price``, ``market_cap``, ``volume_24h`` and
+    ``age_seconds`` of each token's latest stored quote (NaN when none);
+    ``pending`` holds ``price`` and ``volume_24h`` of each token's last
+    quarantined jump (NaN when none). Returns a ``BatchScore`` with the
+    scores, the quarantine mask and a ``{reason: mask}`` dict.
+    """
+    price, market_cap = columns['price'], columns['market_cap']
+    volume, supply = columns['volume_24h'], columns['circulating_supply']
+    reasons = {}
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        reasons['missing_price'] = ~(price > 0)
+        reasons['market_cap_dropped'] = ~(market_cap > 0) & (previous['market_cap'] > 0)
+        # Zero or missing market caps are left to market_cap_dropped and the
+        # missing_market_cap penalty; volume / 0 would quarantine them for good
+        reasons['velocity_cap'] = (market_cap > 0) & (volume / market_cap > MAX_VELOCITY)
+
+        age = columns['age_seconds']
+        stale_after, stale_limit = STALE_AFTER.total_seconds(), STALE_LIMIT.total_seconds()
+        reasons['stale'] = age > stale_limit
+
+        # Only recent stored quotes say anything about the size of a move
+        recent = previous['age_seconds'] <= JUMP_HORIZON.total_seconds()
+        price_jump = np.where(recent, _log_change(price, previous['price']), np.nan)
+        volume_jump = np.where(recent, _log_change(volume, previous['volume_24h']), np.nan)
+        # A move confirmed by the following tick is accepted
+        price_confirmed = _log_change(price, pending['price']) <= PRICE_JUMP_LIMIT
+        volume_confirmed = _log_change(volume, pending['volume_24h']) <= VOLUME_JUMP_LIMIT
+        reasons['price_jump'] = (price_jump > PRICE_JUMP_LIMIT) & ~price_confirmed
+        reasons['volume_spike'] = (volume_jump > VOLUME_JUMP_LIMIT) & ~volume_confirmed
+
+        implied = price * supply
+        gap = np.abs(market_cap - implied) / market_cap
+        checked = (market_cap > 0) & (implied > 0)
+        gap = np.where(checked, gap, np.nan)
+        reasons['inconsistent_market_cap'] = gap > CONSISTENCY_LIMIT
+
+    penalty = (
+        PENALTY_WEIGHTS['stale'] * _share(age, stale_after, stale_limit)
+        + PENALTY_WEIGHTS['price_jump'] * np.where(price_confirmed, 0.0, _share(price_jump, 0.0, PRICE_JUMP_LIMIT))
+        + PENALTY_WEIGHTS['volume_spike'] * np.where(volume_confirmed, 0.0, _share(volume_jump, 0.0, VOLUME_JUMP_LIMIT))
+        + PENALTY_WEIGHTS['inconsistent_market_cap'] * _share(gap, 0.0, CONSISTENCY_LIMIT)
+        + PENALTY_WEIGHTS['missing_market_cap'] * ~(market_cap > 0)
+    )
+    scores = np.round(np.clip(1.0 - penalty, 0.0, 1.0), 2)
+    reasons['low_score'] = scores < MIN_QUALITY_SCORE
+
+    quarantined = np.zeros(len(price), dtype=bool)
+    for reason in QUARANTINE_REASONS:
+        quarantined |= reasons[reason]
+    return BatchScore(scores, quarantined, reasons)
+
+
+class QualityGate:
+    """Scores listings batches and sets outliers aside"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # cmc_id -> (price, volume) of the last record quarantined for a jump
+        self._pending = {}
+
+    def check(self, data_service, listings, now):
+        """Split a listings batch into accepted and quarantined records.
+
+        Returns ``(accepted, quarantined)``: ``[(token_data, score)]`` and
+        ``[(token_data, score, reasons)]``, in batch order.
+        """
+        if not listings:
+            return [], []
+        cmc_ids = [token_data.get('id') for token_data in listings]
+        quotes = [token_data.get('quote', {}).get('USD', {}) for token_data in listings]
+
+        ages = []
+        for token_data, quote in zip(listings, quotes):
+            last_updated = quote.get('last_updated') or token_data.get('last_updated')
+            if last_updated:
+                timestamp = datetime.fromisoformat(last_updated.replace('Z', '+00:00')).replace(tzinfo=None)
+                ages.append((now - timestamp).total_seconds())
+            else:
+                ages.append(np.nan)
+        columns = {
+            'price': np.array([_number(quote.get('price')) for quote in quotes]),
+            'market_cap': np.array([_number(quote.get('market_cap')) for quote in quotes]),
+            'volume_24h': np.array([_number(quote.get('volume_24h')) for quote in quotes]),
+            'circulating_supply': np.array([_number(token_data.get('circulating_supply')) for token_data in listings]),
+            'age_seconds': np.array(ages)
+        }
+
+        stored = {
+            row[1]: row[2:] for row in db.session.execute(
+                data_service.latest_quote_query(_PREVIOUS_SELECTION).where(Token.cmc_id.in_(cmc_ids))
+            ) if row[-1] is not None
+        }
+        previous = {
+            name: np.array([_number(stored[cmc_id][index]) if cmc_id in stored else np.nan for cmc_id in cmc_ids])
+            for index, name in enumerate(('price', 'market_cap', 'volume_24h'))
+        }
+        previous['age_seconds'] = np.array([
+            (now - stored[cmc_id][-1]).total_seconds() if cmc_id in stored else np.nan for cmc_id in cmc_ids
+        ])
+        with self._lock:
+            held = [self._pending.get(cmc_id, (np.nan, np.nan)) for cmc_id in cmc_ids]
+        pending = {
+            'price': np.array([entry[0] for entry in held]),
+            'volume_24h': np.array([entry[1] for entry in held])
+        }
+
+        result = score_batch(columns, previous, pending)
+        jumped = result.reasons['price_jump'] | result.reasons['volume_spike']
+
+        accepted, quarantined = [], []
+        with self._lock:
+            for index, token_data in enumerate(listings):
+                cmc_id = cmc_ids[index]
+                score = float(result.scores[index])
+                if not result.quarantined[index]:
+                    self._pending.pop(cmc_id, None)
+                    accepted.append((token_data, score))
+                    continue
+                if jumped[index]:
+                    self._pending[cmc_id] = (columns['price'][index], columns['volume_24h'][index])
+                reasons = [reason for reason in QUARANTINE_REASONS if result.reasons[reason][index]]
+                quarantined.append((token_data, score, reasons))
+        for _, _, reasons in quarantined:
+            for reason in reasons:
+                QUARANTINED_RECORDS.labels(reason=reason).inc()
+        return accepted, quarantined
+
+    def pending(self):
+        """Copy of the quarantined jumps awaiting confirmation"""
+        with self._lock:
+            return dict(self._pending)
+
+    def restore_pending(self, pending):
+        with self._lock:
+            self._pending = dict(pending)
+
+    def quarantine(self, records, now):
+        """Add quarantined records to the session; committed with the tick"""
+        if not records:
+            return
+        db.session.execute(QuarantinedMetric.__table__.insert(), [
+            {
+                'cmc_id': token_data.get('id'),
+                'symbol': token_data.get('symbol'),
+                'timestamp': now,
+                'score': score,
+                'reasons': ','.join(reasons),
+                'payload': json.dumps(token_data),
+                'created_at': now
+            }
+            for token_data, score, reasons in records
+        ])
+
+
+def recent_quarantine(limit):
+    """Newest quarantined records, without their raw payloads"""
+    rows = QuarantinedMetric.query.order_by(QuarantinedMetric.id.desc()).limit(limit).all()
+    return [row.to_dict() for row in rows]
@@ -0,0 +1,136 @@
+import threading
+from datetime import datetime
+import numpy as np
+
+# Quote currencies clients may request through ``convert``
+SUPPORTED_FIAT = ('EUR', 'GBP', 'JPY', 'CAD', 'AUD', 'CHF', 'CNY', 'INR', 'KRW', 'BRL')
+CRYPTO_QUOTE_IDS = {'BTC': 1, 'ETH': 1027}  # symbol -> CoinMarketCap id
+SUPPORTED_CURRENCIES = ('USD',) + SUPPORTED_FIAT + tuple(CRYPTO_QUOTE_IDS)
+
+# Quote fields denominated in the quote currency; everything else is copied
+MONETARY_FIELDS = ('price', 'volume_24h', 'market_cap')
+
+# Maximum number of currencies per ``convert`` parameter
+MAX_CONVERT = 5
+
+
+class RatesUnavailable(ValueError):
+    """A supported currency was requested before its rate could be loaded"""
+
+
+class RateTable:
+    """In-memory USD cross rates used to convert quotes.
+
+    Rates are units of the target currency per 1 USD. The ingester refreshes
+    crypto rates every tick and fiat rates on a slower schedule; readers only
+    ever see a complete table because updates swap the dict atomically.
+    """
+
+    def __init__(self):
+        self._rates = {'USD': 1.0}
+        self._lock = threading.Lock()
+        self.crypto_updated_at = None
+        self.fiat_updated_at = None
+
+    def update(self, rates, kind):
+        """Merge ``{currency: rate}`` into the table; ``kind`` is 'crypto' or 'fiat'"""
+        with self._lock:
+            merged = dict(self._rates)
+            merged.update({currency: float(rate) for currency, rate in rates.items() if rate})
+            self._rates = merged
+            if kind == 'crypto':
+                self.crypto_updated_at = datetime.utcnow()
+            else:
+                self.fiat_updated_at = datetime.utcnow()
+
+    def get(self, currency):
+        return self._rates.get(currency)
+
+    def state(self):
+        """JSON-ready rates and refresh times, for the warm-restart file"""
+        return {
+            'rates': dict(self._rates),
+            'crypto_updated_at': self.crypto_updated_at.isoformat() if self.crypto_updated_at else None,
+            'fiat_updated_at': self.fiat_updated_at.isoformat() if self.fiat_updated_at else None
+        }
+
+    def restore(self, state, crypto=True):
+        """Load rates saved by ``state``; crypto rates only when ``crypto`` is set"""
+        kinds = [('fiat', SUPPORTED_FIAT)] + ([('crypto', tuple(CRYPTO_QUOTE_IDS))] if crypto else [])
+        with self._lock:
+            merged = dict(self._rates)
+            for kind, currencies in kinds:
+                updated_at = state.get(f'{kind}_updated_at')
+                if updated_at is None:
+                    continue
+                merged.update({
+                    currency: float(rate) for currency, rate in state['rates'].items() if currency in currencies
+                })
+                setattr(self, f'{kind}_updated_at', datetime.fromisoformat(updated_at))
+            self._rates = merged
+
+    def parse_convert(self, value):
+        """Parse a comma-separated ``convert`` parameter into currency codes.
+
+        Raises ``ValueError`` for unsupported currencies and
+        ``RatesUnavailable`` for ones whose rate has not been loaded yet.
+        """
+        currencies = []
+        for currency in (value or 'USD').split(','):
+            currency = currency.strip().upper()
+            if currency and currency not in currencies:
+                currencies.append(currency)
+
+        if not currencies:
+            currencies = ['USD']
+        if len(currencies) > MAX_CONVERT:
+            raise ValueError(f"Invalid parameter: at most {MAX_CONVERT} convert currencies")
+
+        rates = self._rates
+        for currency in currencies:
+            if currency not in SUPPORTED_CURRENCIES:
+                raise ValueError(f"Invalid parameter: unsupported convert currency {currency}")
+            if currency not in rates:
+                raise RatesUnavailable(f"Conversion rate for {currency} is not available yet")
+        return currencies
+
+    def convert_quotes(self, quotes, currencies):
+        """Convert USD quote dicts into ``{currency: quote}`` dicts.
+
+        All monetary values of the page are converted in one vectorized
+        multiply against the rate vector; non-monetary fields are copied
+        to every currency unchanged.
+        """
+        if currencies == ['USD']:
+            return [{'USD': quote} for quote in quotes]
+        if not quotes:
+            return []
+
+        rates = self._rates
+        rate_vector = np.array([rates[currency] for currency in currencies], dtype=np.float64)
+        fields = [field for field in MONETARY_FIELDS if any(field in quote for quote in quotes)]
+
+        # rows x fields matrix of USD values, missing values as NaN
+        usd = np.array(
+            [[quote.get(field) for field in fields] for quote in quotes],
+            dtype=np.float64
+        )
+        converted = usd[:, :, np.newaxis] * rate_vector
+        missing = np.isnan(converted)
+        converted = converted.tolist()
+        missing = missing.tolist()
+
+        result = []
+        for row, quote in enumerate(quotes):
+            converted_quote = {}
+            for column, currency in enumerate(currencies):
+                target = dict(quote)
+                for index, field in enumerate(fields):
+                    if field in quote:
+                        target[field] = None if missing[row][index][column] else converted[row][index][column]
+                converted_quote[currency] = target
+            result.append(converted_quote)
+        return result
+
+
+rate_table = RateTable()
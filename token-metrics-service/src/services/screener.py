@@ -0,0 +1,180 @@
+"""Screener over an in-memory, column-oriented snapshot of the market.
+
+``MarketSnapshot`` holds the latest quote of every active token as one
+numpy array per metric, plus a few derived ratios. It is rebuilt with a
+single query after each ingest tick. Screens (compound filters and
+multi-key sorts) then run as vectorized array operations without
+touching SQL.
+"""
+import re
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+from src.models.token import db, Token
+from src.utils.serialization import QUOTE_FIELDS, LIST_QUOTE_FIELDS, EXTRA_FIELDS, FieldSelection
+
+SNAPSHOT_TOKEN_FIELDS = ('id', 'cmc_id', 'name', 'symbol', 'slug')
+SNAPSHOT_QUOTE_FIELDS = tuple(QUOTE_FIELDS)
+
+# Ratios computed from the stored columns when the snapshot is built
+DERIVED_FIELDS = ('circulating_supply_ratio', 'max_supply_ratio', 'volume_to_market_cap')
+
+SCREENER_METRICS = SNAPSHOT_QUOTE_FIELDS + DERIVED_FIELDS
+
+# Payload fields available from the snapshot, and the default projection
+SCREENER_FIELDS = SNAPSHOT_TOKEN_FIELDS + SNAPSHOT_QUOTE_FIELDS + EXTRA_FIELDS
+SCREENER_SELECTION = FieldSelection(SNAPSHOT_TOKEN_FIELDS, LIST_QUOTE_FIELDS, False, True)
+
+# Snapshots older than this are rebuilt on read, for processes that do not run the ingester
+SNAPSHOT_MAX_AGE = timedelta(seconds=120)
+
+MAX_FILTERS = 20
+MAX_SORT_KEYS = 5
+
+_FILTER = re.compile(r'^\s*([a-z0-9_]+)\s*(>=|<=|!=|=|>|<)\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*$')
+
+_OPERATORS = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '=': np.equal,
+    '!=': np.not_equal
+}
+
+_SNAPSHOT_SELECTION = FieldSelection(SNAPSHOT_TOKEN_FIELDS[1:], SNAPSHOT_QUOTE_FIELDS, False, True)
+
+
+def _ratio(numerator, denominator):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = numerator / denominator
+    ratio[~np.isfinite(ratio)] = np.nan
+    return ratio
+
+
+class MarketSnapshot:
+    """Column arrays for the latest quote of every active token"""
+
+    def __init__(self, rows, built_at=None):
+        rows = [row for row in rows if row[-1] is not None]
+        self.built_at = built_at or datetime.utcnow()
+        self.size = len(rows)
+
+        token_count = len(SNAPSHOT_TOKEN_FIELDS)
+        self.tokens = {
+            name: [row[index] for row in rows] for index, name in enumerate(SNAPSHOT_TOKEN_FIELDS)
+        }
+        self.columns = {
+            name: np.array([row[token_count + index] for row in rows], dtype=np.float64)
+            for index, name in enumerate(SNAPSHOT_QUOTE_FIELDS)
+        }
+        self.ids = np.array(self.tokens['id'], dtype=np.int64)
+        self.last_updated = [row[-1] for row in rows]
+        self.latest = max(self.last_updated) if rows else None
+
+        columns = self.columns
+        columns['circulating_supply_ratio'] = _ratio(columns['circulating_supply'], columns['total_supply'])
+        columns['max_supply_ratio'] = _ratio(columns['circulating_supply'], columns['max_supply'])
+        columns['volume_to_market_cap'] = _ratio(columns['volume_24h'], columns['market_cap'])
+
+    @classmethod
+    def load(cls, data_service):
+        rows = db.session.execute(
+            data_service.latest_quote_query(_SNAPSHOT_SELECTION).where(Token.is_active == True)
+        ).all()
+        return cls(rows)
+
+    def screen(self, filters=(), sort=(('market_cap', True),)):
+        """Positions of rows matching every filter, ordered by ``sort``.
+
+        ``filters`` are ``(metric, operator, value)`` triples; ``sort`` is a
+        sequence of ``(metric, descending)`` pairs, most significant first.
+        Missing values never match a filter and sort last in either direction.
+        """
+        mask = np.ones(self.size, dtype=bool)
+        for metric, operator, value in filters:
+            with np.errstate(invalid='ignore'):
+                mask &= _OPERATORS[operator](self.columns[metric], value)
+        positions = np.flatnonzero(mask)
+
+        # lexsort treats its last key as the most significant one
+        keys = [self.ids[positions]]
+        for metric, descending in reversed(tuple(sort)):
+            values = self.columns[metric][positions]
+            missing = np.isnan(values)
+            keys.append(np.where(missing, 0.0, -values if descending else values))
+            keys.append(missing)
+        return positions[np.lexsort(keys)]
+
+    def rows(self, positions, selection):
+        """``latest_quote_query``-shaped row tuples for ``positions``.
+
+        The rows can go straight through ``DataService.serialize_quote_rows``,
+        so screener payloads match the token list endpoint.
+        """
+        token_fields, quote_fields = selection.token_fields, selection.quote_fields
+        columns = [self.tokens['id']] + [self.tokens[name] for name in token_fields]
+        columns = [[column[position] for position in positions] for column in columns]
+        for name in quote_fields:
+            values = self.columns[name][positions]
+            columns.append([None if value != value else value for value in values.tolist()])
+        columns.append([self.last_updated[position] for position in positions])
+        return list(zip(*columns))
+
+
+def parse_filters(values):
+    """Parse ``filter`` parameters like ``velocity>0.1,percent_change_24h<-5``"""
+    filters = []
+    for value in values:
+        for clause in value.split(','):
+            if not clause.strip():
+                continue
+            match = _FILTER.match(clause)
+            if not match:
+                raise ValueError(f"Invalid parameter: cannot parse filter '{clause.strip()}'")
+            metric, operator, number = match.groups()
+            if metric not in SCREENER_METRICS:
+                raise ValueError(f"Invalid parameter: unknown filter metric {metric}")
+            filters.append((metric, operator, float(number)))
+    if len(filters) > MAX_FILTERS:
+        raise ValueError(f"Invalid parameter: at most {MAX_FILTERS} filters")
+    return filters
+
+
+def parse_sort(value):
+    """Parse ``sort=-velocity,market_cap`` into ``(metric, descending)`` pairs"""
+    sort = []
+    for key in (value or '-market_cap').split(','):
+        key = key.strip()
+        if not key:
+            continue
+        descending = key.startswith('-')
+        metric = key.lstrip('-+')
+        if metric not in SCREENER_METRICS:
+            raise ValueError(f"Invalid parameter: unknown sort metric {metric}")
+        sort.append((metric, descending))
+    if not sort or len(sort) > MAX_SORT_KEYS:
+        raise ValueError(f"Invalid parameter: between 1 and {MAX_SORT_KEYS} sort keys")
+    return sort
+
+
+class Screener:
+    """Holds the current snapshot; readers always see a complete one"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.snapshot = None
+
+    def rebuild(self, data_service):
+        snapshot = MarketSnapshot.load(data_service)
+        self.snapshot = snapshot
+        return snapshot
+
+    def current(self, data_service):
+        snapshot = self.snapshot
+        if snapshot is None or datetime.utcnow() - snapshot.built_at > SNAPSHOT_MAX_AGE:
+            with self._lock:
+                snapshot = self.snapshot
+                if snapshot is None or datetime.utcnow() - snapshot.built_at > SNAPSHOT_MAX_AGE:
+                    snapshot = self.rebuild(data_service)
+        return snapshot
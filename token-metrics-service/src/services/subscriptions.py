@@ -0,0 +1,116 @@
+"""Registry of WebSocket token subscriptions.
+
+Subscriptions are keyed by internal token id, whatever identifier (CMC id,
+symbol or slug) the client used, so every client interested in an asset
+shares one ``token_<id>`` room. The registry keeps both directions of the
+relation (client -> tokens and token -> clients) as sets of ints. A
+disconnect removes each of the client's subscriptions in constant time
+without scanning other clients. The live interest set is the key set of
+the token -> clients map.
+"""
+import threading
+
+# Upper bound on token subscriptions held by all connections of one API key
+MAX_SUBSCRIPTIONS_PER_KEY = 500
+
+
+class SubscriptionLimitError(ValueError):
+    pass
+
+
+def token_room(token_id):
+    """Socket.IO room for updates of one token, by internal id"""
+    return f'token_{token_id}'
+
+
+class SubscriptionRegistry:
+    def __init__(self, max_per_key=MAX_SUBSCRIPTIONS_PER_KEY):
+        self.max_per_key = max_per_key
+        self._lock = threading.Lock()
+        self._client_tokens = {}   # sid -> {token_id}
+        self._token_clients = {}   # token_id -> {sid}
+        self._client_keys = {}     # sid -> api_key_hash
+        self._key_counts = {}      # api_key_hash -> subscriptions across its connections
+
+    def connect(self, sid, api_key_hash):
+        with self._lock:
+            self._client_keys[sid] = api_key_hash
+            self._client_tokens.setdefault(sid, set())
+
+    def subscribe(self, sid, token_ids):
+        """Add subscriptions; returns the ids that were not already held.
+
+        All-or-nothing: raises ``SubscriptionLimitError`` when the new
+        subscriptions would take the client's API key over its limit.
+        """
+        with self._lock:
+            tokens = self._client_tokens.setdefault(sid, set())
+            added = [token_id for token_id in dict.fromkeys(token_ids) if token_id not in tokens]
+            key = self._client_keys.get(sid)
+            held = self._key_counts.get(key, 0)
+            if held + len(added) > self.max_per_key:
+                raise SubscriptionLimitError(
+                    f'At most {self.max_per_key} token subscriptions per API key ({held} held)'
+                )
+            for token_id in added:
+                tokens.add(token_id)
+                self._token_clients.setdefault(token_id, set()).add(sid)
+            self._key_counts[key] = held + len(added)
+            return added
+
+    def unsubscribe(self, sid, token_ids):
+        """Remove subscriptions; returns the ids that were held"""
+        with self._lock:
+            tokens = self._client_tokens.get(sid)
+            if not tokens:
+                return []
+            removed = [token_id for token_id in dict.fromkeys(token_ids) if token_id in tokens]
+            for token_id in removed:
+                tokens.discard(token_id)
+                self._drop(token_id, sid)
+            self._release(self._client_keys.get(sid), len(removed))
+            return removed
+
+    def disconnect(self, sid):
+        """Forget a client; returns the token ids it was subscribed to"""
+        with self._lock:
+            tokens = self._client_tokens.pop(sid, None) or set()
+            for token_id in tokens:
+                self._drop(token_id, sid)
+            self._release(self._client_keys.pop(sid, None), len(tokens))
+            return tokens
+
+    def _drop(self, token_id, sid):
+        clients = self._token_clients.get(token_id)
+        if clients is not None:
+            clients.discard(sid)
+            if not clients:
+                del self._token_clients[token_id]
+
+    def _release(self, key, count):
+        remaining = self._key_counts.get(key, 0) - count
+        if remaining > 0:
+            self._key_counts[key] = remaining
+        else:
+            self._key_counts.pop(key, None)
+
+    def interest(self):
+        """Token ids with at least one subscriber"""
+        with self._lock:
+            return frozenset(self._token_clients)
+
+    def subscriptions(self, sid):
+        with self._lock:
+            return frozenset(self._client_tokens.get(sid, ()))
+
+    def subscriber_count(self, token_id):
+        with self._lock:
+            return len(self._token_clients.get(token_id, ()))
+
+    def key_count(self, api_key_hash):
+        with self._lock:
+            return self._key_counts.get(api_key_hash, 0)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._client_tokens)
@@ -0,0 +1,129 @@
+"""Warm-restart state file.
+
+With ``WARM_STATE_PATH`` set, the ingest loop writes the state it derives
+from each tick to that file, and ``create_app`` loads it on boot, so a
+restarted worker starts with what the last tick built instead of cold
+queries:
+
+- the market snapshot behind the screener, leaderboards, movers,
+  ``market_update`` and dashboard
+- the default dashboard bootstrap view
+- the quality gate's pending jumps
+- the crypto and fiat cross rates
+
+All but the fiat rates describe one tick. The file records the id and
+timestamp of the newest ``token_metrics`` row when it was written. Those
+sections are only restored while the database still ends at that row; a
+tick or backfill since then discards them and the worker starts cold.
+Fiat rates are restored regardless and refreshed on their own schedule.
+
+The file is an uncompressed ``.npz`` archive: numpy columns plus a JSON
+header, loaded without pickle. It is written to a temporary name and
+renamed, so a crash mid-write leaves the previous file.
+"""
+import json
+import logging
+import os
+from datetime import datetime
+import numpy as np
+from sqlalchemy import select
+from src.models.token import db, TokenMetric
+from src.services.column_store import from_micros, to_micros
+from src.services.rates import rate_table
+from src.services.screener import SNAPSHOT_QUOTE_FIELDS, SNAPSHOT_TOKEN_FIELDS, MarketSnapshot
+
+logger = logging.getLogger(__name__)
+
+WARM_STATE_VERSION = 1
+
+# Snapshot token fields stored as JSON strings rather than arrays
+_TEXT_FIELDS = ('name', 'symbol', 'slug')
+
+
+def latest_tick():
+    """``[id, timestamp]`` of the newest ``token_metrics`` row, or None"""
+    row = db.session.execute(
+        select(TokenMetric.id, TokenMetric.timestamp).order_by(TokenMetric.id.desc()).limit(1)
+    ).first()
+    return [row[0], row[1].isoformat()] if row else None
+
+
+def save(path, services, snapshot, dashboard_view=None):
+    """Write the state derived from the latest tick; returns the file size"""
+    pending = services.data_service.quality.pending()
+    header = {
+        'version': WARM_STATE_VERSION,
+        'saved_at': datetime.utcnow().isoformat(),
+        'tick': latest_tick(),
+        'token_fields': list(SNAPSHOT_TOKEN_FIELDS),
+        'quote_fields': list(SNAPSHOT_QUOTE_FIELDS),
+        'tokens': {name: snapshot.tokens[name] for name in _TEXT_FIELDS},
+        'dashboard': dashboard_view,
+        'rates': rate_table.state()
+    }
+    arrays = {
+        'ids': snapshot.ids,
+        'cmc_ids': np.array(snapshot.tokens['cmc_id'], dtype=np.int64),
+        'last_updated': np.array([to_micros(timestamp) for timestamp in snapshot.last_updated], dtype=np.int64),
+        'pending_cmc_ids': np.array(list(pending), dtype=np.int64),
+        'pending_values': np.array(list(pending.values()), dtype=np.float64).reshape(-1, 2)
+    }
+    for name in SNAPSHOT_QUOTE_FIELDS:
+        arrays[f'quote_{name}'] = snapshot.columns[name]
+
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as handle:
+        np.savez(handle, header=np.array(json.dumps(header)), **arrays)
+    os.replace(temporary, path)
+    return os.path.getsize(path)
+
+
+def restore(path, services):
+    """Load a state file into the services; returns the restored sections"""
+    try:
+        with np.load(path, allow_pickle=False) as archive:
+            header = json.loads(str(archive['header']))
+            arrays = {name: archive[name] for name in archive.files if name != 'header'}
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError, KeyError):
+        logger.warning("Warm state file is unreadable; starting cold", exc_info=True, extra={'path': path})
+        return []
+
+    if header.get('version') != WARM_STATE_VERSION or \
+            header.get('token_fields') != list(SNAPSHOT_TOKEN_FIELDS) or \
+            header.get('quote_fields') != list(SNAPSHOT_QUOTE_FIELDS):
+        logger.info("Warm state file has another layout; starting cold", extra={'path': path})
+        return []
+
+    current = header.get('tick') is not None and header['tick'] == latest_tick()
+    rate_table.restore(header['rates'], crypto=current)
+    restored = ['fiat_rates']
+    if not current:
+        logger.info("Warm state file predates the latest tick; starting cold",
+                    extra={'path': path, 'saved_tick': header.get('tick')})
+        return restored
+
+    data_service = services.data_service
+    tokens = header['tokens']
+    rows = zip(
+        arrays['ids'].tolist(), arrays['cmc_ids'].tolist(),
+        *(tokens[name] for name in _TEXT_FIELDS),
+        *(arrays[f'quote_{name}'].tolist() for name in SNAPSHOT_QUOTE_FIELDS),
+        (from_micros(value) for value in arrays['last_updated'].tolist())
+    )
+    snapshot = MarketSnapshot(list(rows))
+    services.screener.snapshot = snapshot
+    services.leaderboards.update(snapshot)
+    restored += ['crypto_rates', 'snapshot', 'leaderboards']
+
+    if header.get('dashboard') is not None:
+        services.dashboard.restore(data_service, snapshot, header['dashboard'])
+        restored.append('dashboard')
+
+    data_service.quality.restore_pending(dict(zip(
+        arrays['pending_cmc_ids'].tolist(), map(tuple, arrays['pending_values'].tolist())
+    )))
+    restored.append('quality')
+    logger.info("Warm state restored", extra={'path': path, 'tokens': snapshot.size, 'sections': restored})
+    return restored
@@ -1,9 +1,13 @@
 from functools import wraps
-from flask import request, jsonify
+from flask import current_app, request, jsonify
 from src.models.token import ApiKey
+from src.utils.metrics import elapsed_ms
 import hashlib
+import logging
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 def require_api_key(f):
     """Decorator to require API key authentication"""
     @wraps(f)
@@ -16,7 +20,7 @@ def require_api_key(f):
                     'timestamp': datetime.utcnow().isoformat() + 'Z',
                     'error_code': 401,
                     'error_message': 'API key is required. Please include X-API-Key header.',
-                    'elapsed': 0,
+                    'elapsed': elapsed_ms(),
                     'credit_count': 0
                 }
             }), 401
@@ -29,7 +33,7 @@ def require_api_key(f):
                     'timestamp': datetime.utcnow().isoformat() + 'Z',
                     'error_code': 401,
                     'error_message': 'Invalid API key format.',
-                    'elapsed': 0,
+                    'elapsed': elapsed_ms(),
                     'credit_count': 0
                 }
             }), 401
@@ -59,6 +63,36 @@ def validate_api_key(api_key):
         # return key_record is not None
         
     except Exception as e:
-        print(f"Error validating API key: {e}")
+        logger.exception("Error validating API key")
         return False
 
+
+def hash_api_key(api_key):
+    """Stable identifier for an API key, used to own per-key resources"""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def is_admin_key(api_key):
+    """Whether ``api_key`` is one of the configured ``ADMIN_API_KEYS``"""
+    return bool(api_key) and hash_api_key(api_key) in current_app.config['ADMIN_API_KEY_HASHES']
+
+
+def require_admin_key(f):
+    """Decorator restricting an endpoint to admin API keys"""
+    @require_api_key
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not is_admin_key(request.headers.get('X-API-Key')):
+            return jsonify({
+                'status': {
+                    'timestamp': datetime.utcnow().isoformat() + 'Z',
+                    'error_code': 403,
+                    'error_message': 'This endpoint requires an admin API key.',
+                    'elapsed': elapsed_ms(),
+                    'credit_count': 0
+                }
+            }), 403
+        
+        return f(*args, **kwargs)
+    
+    return decorated_function
@@ -0,0 +1,38 @@
+"""Structured JSON logging for the service.
+
+Every record is emitted as a single JSON object; fields passed through
+``extra=`` are included as top-level keys so logs can be filtered on them.
+"""
+import json
+import logging
+import os
+from datetime import datetime, timezone
+
+# Attributes every LogRecord carries; anything else came from ``extra=``
+_RESERVED = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def configure_logging(level=None):
+    """Send all logs to stderr as JSON; level defaults to ``LOG_LEVEL`` or INFO"""
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level or os.getenv('LOG_LEVEL', 'INFO'))
@@ -0,0 +1,193 @@
+"""Prometheus metrics, SQL query accounting and per-request timing.
+
+``init_app`` wires request hooks, the ``/metrics`` endpoint and SQLAlchemy
+cursor events; the module-level helpers are what the rest of the service
+calls to record ingest stages, cache lookups and socket emits.
+"""
+import time
+from contextlib import contextmanager
+from flask import Response, g, has_request_context, request
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+REQUEST_LATENCY = Histogram(
+    'tms_http_request_duration_seconds', 'HTTP request latency',
+    ['method', 'route', 'status']
+)
+REQUEST_SQL_QUERIES = Histogram(
+    'tms_http_request_sql_queries', 'SQL statements executed per HTTP request',
+    ['route'], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+)
+REQUEST_SQL_TIME = Histogram(
+    'tms_http_request_sql_seconds', 'Time spent in SQL per HTTP request',
+    ['route']
+)
+SQL_QUERY_DURATION = Histogram(
+    'tms_sql_query_duration_seconds', 'Duration of individual SQL statements'
+)
+INGEST_STAGE_DURATION = Histogram(
+    'tms_ingest_stage_duration_seconds', 'Duration of ingest pipeline stages',
+    ['stage'], buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+CACHE_REQUESTS = Counter(
+    'tms_cache_requests_total', 'Cache lookups by cache and result',
+    ['cache', 'result']
+)
+SINGLE_FLIGHT_CALLS = Counter(
+    'tms_single_flight_calls_total',
+    'Coalesced computations by operation; role is leader (executed) or follower (shared the result)',
+    ['operation', 'role']
+)
+QUARANTINED_RECORDS = Counter(
+    'tms_ingest_quarantined_total', 'Listing records quarantined by the quality checks, by failed check',
+    ['reason']
+)
+METADATA_REQUESTS = Counter(
+    'tms_metadata_requests_total', 'Token metadata info requests by result (ok, rate_limited, error)',
+    ['result']
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    'tms_websocket_connections', 'Currently connected WebSocket clients'
+)
+WEBSOCKET_EMITS = Counter(
+    'tms_websocket_emits_total', 'WebSocket events emitted', ['event']
+)
+
+# Registered once per process; later apps only repoint it at their server
+_room_collector = None
+
+# Set by ``profiling.init_app``; statements at least this slow go to the log
+slow_query_seconds = float('inf')
+slow_query_log = None
+
+
+def elapsed_ms():
+    """Milliseconds since the current request started, for ``status.elapsed``"""
+    if has_request_context() and 'request_started' in g:
+        return int((time.perf_counter() - g.request_started) * 1000)
+    return 0
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache=cache, result='hit' if hit else 'miss').inc()
+
+
+def record_flight(operation, shared):
+    SINGLE_FLIGHT_CALLS.labels(operation=operation, role='follower' if shared else 'leader').inc()
+
+
+def count_emit(event_name, count=1):
+    WEBSOCKET_EMITS.labels(event=event_name).inc(count)
+
+
+@contextmanager
+def time_stage(stage):
+    """Record the duration of an ingest stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        INGEST_STAGE_DURATION.labels(stage=stage).observe(time.perf_counter() - started)
+
+
+def _route_label():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_started'].pop()
+    SQL_QUERY_DURATION.observe(duration)
+    if duration >= slow_query_seconds:
+        slow_query_log.record(statement, parameters, duration)
+    if has_request_context() and 'request_started' in g:
+        g.sql_queries += 1
+        g.sql_seconds += duration
+
+
+def _handle_error(context):
+    # Failed statements never reach after_cursor_execute
+    if context.connection is not None and context.connection.info.get('query_started'):
+        context.connection.info['query_started'].pop()
+
+
+def _before_request():
+    g.request_started = time.perf_counter()
+    g.sql_queries = 0
+    g.sql_seconds = 0.0
+
+
+def _after_request(response):
+    if 'request_started' not in g:
+        return response
+
+    duration = time.perf_counter() - g.request_started
+    route = _route_label()
+    REQUEST_LATENCY.labels(method=request.method, route=route, status=response.status_code).observe(duration)
+    REQUEST_SQL_QUERIES.labels(route=route).observe(g.sql_queries)
+    REQUEST_SQL_TIME.labels(route=route).observe(g.sql_seconds)
+
+    response.headers['Server-Timing'] = (
+        f'app;dur={duration * 1000:.1f}, '
+        f'db;dur={g.sql_seconds * 1000:.1f};desc="{g.sql_queries} queries"'
+    )
+    return response
+
+
+class _SocketRoomCollector:
+    """Reports Socket.IO room counts at scrape time from the room manager"""
+
+    def __init__(self, socketio):
+        self.socketio = socketio
+
+    def collect(self):
+        rooms = GaugeMetricFamily('tms_websocket_rooms', 'Socket.IO rooms with at least one member')
+        members = GaugeMetricFamily(
+            'tms_websocket_room_members', 'Socket.IO room memberships by room kind', labels=['kind']
+        )
+        server = getattr(self.socketio, 'server', None)
+        namespace_rooms = server.manager.rooms.get('/', {}) if server is not None else {}
+
+        # Skip the default room and the per-client rooms named after each sid
+        counts = {}
+        total = 0
+        for name, sids in namespace_rooms.items():
+            if name is None or name in sids:
+                continue
+            kind = str(name).split('_', 1)[0]
+            counts[kind] = counts.get(kind, 0) + len(sids)
+            total += 1
+        rooms.add_metric([], total)
+        for kind, count in counts.items():
+            members.add_metric([kind], count)
+        yield rooms
+        yield members
+
+
+def metrics_view():
+    return Response(generate_latest(REGISTRY), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_app(app, socketio=None):
+    """Install request timing hooks, SQL listeners and the ``/metrics`` route"""
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+    global _room_collector
+    if socketio is not None:
+        if _room_collector is None:
+            _room_collector = _SocketRoomCollector(socketio)
+            REGISTRY.register(_room_collector)
+        else:
+            _room_collector.socketio = socketio
@@ -0,0 +1,224 @@
+"""Opt-in call-graph profiling and the slow-query log.
+
+Profiling is off unless asked for. An admin API key can send
+``X-Profile: 1`` on an HTTP request, or pass ``profile: true`` in the
+Socket.IO connect auth to profile every event handler on that connection.
+``PROFILE_SAMPLE_RATE`` additionally profiles that fraction of all
+requests and events. Captured profiles are kept in a small in-memory ring
+(and written to ``PROFILE_DIR`` as ``.prof`` files when set), readable
+through the admin endpoints.
+
+Statements slower than ``SLOW_QUERY_MS`` are logged with their parameters,
+duration and originating route or socket event; the check is a single
+comparison in the existing SQL timing listener.
+"""
+import cProfile
+import io
+import itertools
+import logging
+import marshal
+import os
+import pstats
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from functools import wraps
+from flask import g, has_request_context, request
+from src.utils import metrics
+from src.utils.auth import is_admin_key
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+MAX_STORED_PROFILES = 50
+MAX_SLOW_QUERIES = 200
+
+# Rows of the cumulative-time table kept per profile
+PROFILE_STAT_LINES = 40
+
+MAX_STATEMENT_LENGTH = 2000
+MAX_PARAMETERS_LENGTH = 500
+
+_settings = {
+    'sample_rate': 0.0,
+    'profile_dir': None
+}
+
+# Socket.IO connections that opted in to profiling
+_profiled_sids = set()
+
+
+class ProfileStore:
+    """Ring of the most recent captured profiles"""
+
+    def __init__(self, capacity=MAX_STORED_PROFILES):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._profiles = OrderedDict()
+        self._ids = itertools.count(1)
+
+    def add(self, profiler, target, duration, sampled):
+        profiler.create_stats()
+        # Serialize first: building a ``pstats.Stats`` from the profiler empties it
+        raw = marshal.dumps(profiler.stats)
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(PROFILE_STAT_LINES)
+        entry = {
+            'id': f'{os.getpid()}-{next(self._ids)}',
+            'target': target,
+            'captured_at': datetime.utcnow().isoformat() + 'Z',
+            'duration_ms': round(duration * 1000, 3),
+            'sampled': sampled,
+            'stats': stream.getvalue(),
+            'pstats': raw
+        }
+        with self._lock:
+            self._profiles[entry['id']] = entry
+            while len(self._profiles) > self.capacity:
+                self._profiles.popitem(last=False)
+
+        if _settings['profile_dir']:
+            try:
+                with open(os.path.join(_settings['profile_dir'], f"{entry['id']}.prof"), 'wb') as handle:
+                    handle.write(entry['pstats'])
+            except OSError:
+                logger.exception("Could not write profile", extra={'profile_id': entry['id']})
+        return entry['id']
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def summaries(self):
+        with self._lock:
+            entries = list(self._profiles.values())
+        return [
+            {key: entry[key] for key in ('id', 'target', 'captured_at', 'duration_ms', 'sampled')}
+            for entry in reversed(entries)
+        ]
+
+
+class SlowQueryLog:
+    """Ring of the most recent statements over the slow-query threshold"""
+
+    def __init__(self, capacity=MAX_SLOW_QUERIES):
+        self._entries = deque(maxlen=capacity)
+
+    def record(self, statement, parameters, duration):
+        entry = {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'duration_ms': round(duration * 1000, 3),
+            'origin': origin(),
+            'statement': statement[:MAX_STATEMENT_LENGTH],
+            'parameters': repr(parameters)[:MAX_PARAMETERS_LENGTH]
+        }
+        self._entries.append(entry)
+        logger.warning("Slow query", extra=entry)
+
+    def entries(self):
+        return list(reversed(self._entries))
+
+
+profiles = ProfileStore()
+slow_queries = SlowQueryLog()
+
+
+def origin():
+    """Route rule or ``socket:<event>`` of the code running in this context"""
+    if not has_request_context():
+        return 'background'
+    # Socket.IO handlers run in a request context for the /socket.io/ URL
+    event = getattr(request, 'event', None)
+    if event:
+        return f"socket:{event['message']}"
+    if request.url_rule is not None:
+        return request.url_rule.rule
+    return 'unmatched'
+
+
+def _sampled():
+    rate = _settings['sample_rate']
+    return rate > 0 and random.random() < rate
+
+
+def _start():
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is already active on this thread
+        return None
+    return profiler
+
+
+def _before_request():
+    requested = PROFILE_HEADER in request.headers
+    if not requested and not _settings['sample_rate']:
+        return
+    if requested:
+        requested = is_admin_key(request.headers.get('X-API-Key'))
+    if requested or _sampled():
+        profiler = _start()
+        if profiler is not None:
+            g.profile = (profiler, time.perf_counter(), not requested)
+
+
+def _after_request(response):
+    if 'profile' not in g:
+        return response
+    profiler, started, sampled = g.pop('profile')
+    profiler.disable()
+    profile_id = profiles.add(profiler, origin(), time.perf_counter() - started, sampled)
+    if not sampled:
+        response.headers[PROFILE_ID_HEADER] = profile_id
+    return response
+
+
+def opt_in_socket(sid, api_key, auth):
+    """Profile this connection's events when an admin key asks for it"""
+    if auth.get('profile') and is_admin_key(api_key):
+        _profiled_sids.add(sid)
+
+
+def forget_socket(sid):
+    _profiled_sids.discard(sid)
+
+
+def profiled_event(handler, notify):
+    """Wrap a Socket.IO handler; ``notify(profile_id)`` tells an opted-in client"""
+    @wraps(handler)
+    def wrapper(*args):
+        requested = request.sid in _profiled_sids
+        if not requested and not _sampled():
+            return handler(*args)
+        profiler = _start()
+        if profiler is None:
+            return handler(*args)
+        started = time.perf_counter()
+        try:
+            return handler(*args)
+        finally:
+            profiler.disable()
+            profile_id = profiles.add(profiler, origin(), time.perf_counter() - started, not requested)
+            if requested:
+                notify(profile_id)
+    return wrapper
+
+
+def init_app(app):
+    """Read profiling settings and install the request hooks"""
+    _settings['sample_rate'] = float(app.config['PROFILE_SAMPLE_RATE'] or 0)
+    _settings['profile_dir'] = app.config['PROFILE_DIR'] or None
+    # The SQL timing listener in ``metrics`` hands statements over the threshold to the log
+    threshold = app.config['SLOW_QUERY_MS']
+    metrics.slow_query_seconds = float(threshold) / 1000 if threshold not in (None, '') else float('inf')
+    metrics.slow_query_log = slow_queries
+    if _settings['profile_dir']:
+        os.makedirs(_settings['profile_dir'], exist_ok=True)
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
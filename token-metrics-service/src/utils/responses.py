@@ -0,0 +1,14 @@
+"""Helpers for the JSON envelope shared by API responses."""
+from datetime import datetime
+from src.utils.metrics import elapsed_ms
+
+
+def api_status(error_code=0, error_message=None, credit_count=0):
+    """The ``status`` object of a response"""
+    return {
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'error_code': error_code,
+        'error_message': error_message,
+        'elapsed': elapsed_ms(),
+        'credit_count': credit_count
+    }
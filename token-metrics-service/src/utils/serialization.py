@@ -0,0 +1,191 @@
+"""Row-tuple serialization for token and metric read paths.
+
+The ORM ``to_dict`` helpers hydrate full model instances and push every
+``Numeric`` column through ``Decimal`` before converting it back to ``float``.
+The helpers here select plain row tuples instead: numeric columns are read
+as native floats and rounded to their scale as they are fetched, and rows are
+mapped to dicts by serializers compiled once per column set.
+"""
+from collections import namedtuple
+from functools import lru_cache
+from sqlalchemy import Float, type_coerce
+from sqlalchemy.types import TypeDecorator
+from src.models.token import Token, TokenMetric
+
+# Token columns in the order ``Token.to_dict`` emits them
+TOKEN_FIELDS = (
+    'id', 'cmc_id', 'name', 'symbol', 'slug', 'description', 'logo_url',
+    'website_url', 'twitter_handle', 'reddit_url', 'github_url',
+    'whitepaper_url', 'date_added', 'is_active', 'created_at', 'updated_at'
+)
+
+# Token columns filled by metadata enrichment; list payloads only carry
+# them when ``fields`` names them
+METADATA_FIELDS = (
+    'description', 'logo_url', 'website_url', 'twitter_handle',
+    'reddit_url', 'github_url', 'whitepaper_url'
+)
+LIST_TOKEN_FIELDS = tuple(name for name in TOKEN_FIELDS if name not in METADATA_FIELDS)
+
+# Quote payload key -> TokenMetric column
+QUOTE_FIELDS = {
+    'price': 'price_usd',
+    'volume_24h': 'volume_24h_usd',
+    'market_cap': 'market_cap_usd',
+    'circulating_supply': 'circulating_supply',
+    'total_supply': 'total_supply',
+    'max_supply': 'max_supply',
+    'percent_change_1h': 'percent_change_1h',
+    'percent_change_24h': 'percent_change_24h',
+    'percent_change_7d': 'percent_change_7d',
+    'velocity': 'velocity',
+    'velocity_1h': 'velocity_1h',
+    'velocity_4h': 'velocity_4h',
+    'velocity_12h': 'velocity_12h',
+    'velocity_7d': 'velocity_7d'
+}
+
+LIST_QUOTE_FIELDS = (
+    'price', 'volume_24h', 'market_cap', 'percent_change_1h',
+    'percent_change_24h', 'percent_change_7d', 'velocity'
+)
+DETAIL_QUOTE_FIELDS = tuple(QUOTE_FIELDS)
+SEARCH_QUOTE_FIELDS = ('price', 'market_cap', 'velocity')
+
+# Computed fields that are not plain columns
+EXTRA_FIELDS = ('velocity_trend', 'last_updated')
+
+# Projection of a token payload: which token columns, quote columns and
+# computed fields to select and serialize
+FieldSelection = namedtuple(
+    'FieldSelection', 'token_fields quote_fields include_trend include_last_updated'
+)
+
+LIST_SELECTION = FieldSelection(LIST_TOKEN_FIELDS, LIST_QUOTE_FIELDS, True, True)
+DETAIL_SELECTION = FieldSelection(TOKEN_FIELDS, DETAIL_QUOTE_FIELDS, True, True)
+SEARCH_SELECTION = FieldSelection(LIST_TOKEN_FIELDS, SEARCH_QUOTE_FIELDS, False, False)
+HISTORY_SELECTION = FieldSelection((), LIST_QUOTE_FIELDS, False, False)
+
+# WebSocket ``token_update`` payload key -> TokenMetric column
+SOCKET_FIELDS = {
+    'price': 'price_usd',
+    'volume_24h': 'volume_24h_usd',
+    'market_cap': 'market_cap_usd',
+    'velocity': 'velocity',
+    'change_24h': 'percent_change_24h'
+}
+
+METRIC_FIELDS = tuple(c.key for c in TokenMetric.__table__.columns)
+
+_DATETIME_FIELDS = frozenset(('timestamp', 'date_added', 'created_at', 'updated_at'))
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def token_columns(fields=TOKEN_FIELDS):
+    """Token columns for ``fields``, labelled with their payload keys"""
+    return [getattr(Token, name).label(name) for name in fields]
+
+
+class RoundedFloat(TypeDecorator):
+    """``Float`` result type rounded to a ``Numeric`` column's scale on fetch.
+
+    Python's ``round`` is correctly rounded, like the ``Decimal`` conversion
+    of the ORM path; SQLite's ``round()`` is not and can differ by one unit
+    in the last place.
+    """
+    impl = Float
+    cache_ok = True
+
+    def __init__(self, scale):
+        super().__init__()
+        self.scale = scale
+
+    def process_result_value(self, value, dialect):
+        # SQLite hands back integral values as ints
+        return None if value is None else round(float(value), self.scale)
+
+
+def metric_columns(mapping):
+    """TokenMetric columns for a ``{payload_key: column_name}`` mapping.
+
+    Numeric columns are read as ``Float`` and rounded to their declared
+    scale in Python, so rows carry native floats rather than ``Decimal``
+    instances, with the same values the ORM path produced.
+    """
+    columns = []
+    for key, name in mapping.items():
+        column = getattr(TokenMetric, name)
+        scale = getattr(column.type, 'scale', None)
+        if scale is not None:
+            column = type_coerce(column, RoundedFloat(scale))
+        columns.append(column.label(key))
+    return columns
+
+
+def quote_mapping(fields):
+    """``{payload_key: column_name}`` for a sequence of quote keys"""
+    return {key: QUOTE_FIELDS[key] for key in fields}
+
+
+def parse_fields(value, default, allowed=None):
+    """Parse a comma-separated ``fields`` parameter into a ``FieldSelection``.
+
+    Returns ``default`` when ``value`` is empty. Field names are checked
+    against the token, quote and computed field whitelists (or ``allowed``
+    when given) and ``ValueError`` is raised for anything else.
+    """
+    if not value:
+        return default
+
+    if allowed is None:
+        allowed = TOKEN_FIELDS + tuple(QUOTE_FIELDS) + EXTRA_FIELDS
+
+    requested = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise ValueError(f"Invalid parameter: unknown field(s) {', '.join(unknown)}")
+
+    requested = set(requested)
+    return FieldSelection(
+        tuple(name for name in TOKEN_FIELDS if name in requested),
+        tuple(name for name in QUOTE_FIELDS if name in requested),
+        'velocity_trend' in requested,
+        'last_updated' in requested
+    )
+
+
+@lru_cache(maxsize=None)
+def compile_row_serializer(keys):
+    """Build a function mapping a row tuple to a dict keyed by ``keys``.
+
+    Serializers are cached per key tuple, so the column scan that decides
+    which positions need datetime conversion runs once per projection.
+    """
+    keys = tuple(keys)
+    converted = tuple(
+        (index, key) for index, key in enumerate(keys)
+        if key in _DATETIME_FIELDS or key == 'last_updated'
+    )
+
+    if not converted:
+        def serialize(row):
+            return dict(zip(keys, row))
+        return serialize
+
+    def serialize(row):
+        result = dict(zip(keys, row))
+        for index, key in converted:
+            value = row[index]
+            if value is not None:
+                result[key] = _isoformat(value)
+        return result
+    return serialize
+
+
+def serialize_rows(rows, keys):
+    """Serialize an iterable of row tuples with a compiled serializer"""
+    serialize = compile_row_serializer(tuple(keys))
+    return [serialize(row) for row in rows]
@@ -0,0 +1,63 @@
+"""Single-flight coalescing of concurrent identical computations.
+
+The first caller for a key runs the computation; callers arriving while it
+is in flight wait for it and receive the same result (or exception). The
+entry is dropped as soon as the computation finishes, so this shares work
+between overlapping callers only and never serves a stale result.
+"""
+import threading
+from src.utils.metrics import record_flight
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'followers')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, operation, key, function):
+        """Return ``function()``, sharing one execution per in-flight ``(operation, key)``.
+
+        ``key`` must be hashable and capture every input the result depends
+        on. Shared results are handed to every caller as-is and must not be
+        mutated.
+        """
+        flight_key = (operation, key)
+        with self._lock:
+            call = self._calls.get(flight_key)
+            leader = call is None
+            if leader:
+                call = self._calls[flight_key] = _Call()
+            else:
+                call.followers += 1
+        record_flight(operation, not leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[flight_key]
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,173 @@
+"""Indexed, precompressed static file serving.
+
+``StaticIndex`` walks the static folder once and keeps, per file, its
+metadata, a strong ETag, cached bytes for small files, and any ``.br`` or
+``.gz`` siblings. Compressible files without a ``.gz`` sibling are gzipped
+in memory while indexing. Requests then cost one dict lookup. Responses
+get the best encoding the client accepts and answer conditional requests
+with 304. Content-hashed names under ``assets/`` are cached as immutable,
+matching the nginx config.
+
+Precompress a build ahead of time with::
+
+    python -m src.utils.static_files <folder>
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+from flask import Response, request, send_file
+
+try:
+    import brotli
+except ImportError:  # optional; precompressed .br files are still served
+    brotli = None
+
+# Vite build output: assets/ names ending in an 8-character content hash,
+# e.g. assets/index-BK2k7E7y.js. Other files, such as apple-touch-icon.png,
+# can change in place
+HASHED_NAME = re.compile(r'^assets/(?:.+/)?[^/]+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$')
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/javascript', 'application/json', 'application/xml', 'image/svg+xml'
+)
+MIN_COMPRESS_BYTES = 1024
+
+# Files up to this size are held in memory; larger ones are streamed from disk
+MAX_CACHED_BYTES = 1024 * 1024
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+INDEX_CACHE = 'public, max-age=60, must-revalidate'
+DEFAULT_CACHE = 'public, max-age=3600'
+
+# Preference order when a client accepts several encodings
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class StaticFile:
+    __slots__ = ('path', 'mimetype', 'size', 'mtime', 'etag', 'data', 'cache_control', 'variants')
+
+    def __init__(self, path, mimetype, cache_control):
+        stat = os.stat(path)
+        self.path = path
+        self.mimetype = mimetype
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+        self.cache_control = cache_control
+        self.data = None
+        self.variants = {}
+
+        with open(path, 'rb') as source:
+            if self.size <= MAX_CACHED_BYTES:
+                self.data = source.read()
+                self.etag = hashlib.sha1(self.data).hexdigest()
+            else:
+                digest = hashlib.sha1()
+                for chunk in iter(lambda: source.read(65536), b''):
+                    digest.update(chunk)
+                self.etag = digest.hexdigest()
+
+
+def _compressible(mimetype, size):
+    return size >= MIN_COMPRESS_BYTES and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def _cache_control(name, index_name):
+    if name == index_name:
+        return INDEX_CACHE
+    if HASHED_NAME.search(name):
+        return IMMUTABLE_CACHE
+    return DEFAULT_CACHE
+
+
+class StaticIndex:
+    """In-memory index of a static folder, built once"""
+
+    def __init__(self, folder, index_name='index.html'):
+        self.folder = folder
+        self.index_name = index_name
+        self.files = {}
+        if folder and os.path.isdir(folder):
+            self._build()
+
+    def _build(self):
+        suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        for root, _, names in os.walk(self.folder):
+            for name in names:
+                if name.endswith(suffixes):
+                    continue
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, self.folder).replace(os.sep, '/')
+                mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+                entry = StaticFile(path, mimetype, _cache_control(relative, self.index_name))
+
+                for encoding, suffix in ENCODINGS:
+                    if os.path.isfile(path + suffix):
+                        with open(path + suffix, 'rb') as variant:
+                            entry.variants[encoding] = variant.read()
+                if 'gzip' not in entry.variants and entry.data is not None \
+                        and _compressible(mimetype, entry.size):
+                    entry.variants['gzip'] = gzip.compress(entry.data, 9, mtime=0)
+                self.files[relative] = entry
+
+    def lookup(self, path):
+        """The entry for ``path``, falling back to the index for client-side routes"""
+        return self.files.get(path) or self.files.get(self.index_name)
+
+    def response(self, entry):
+        """Build a (possibly 304) response for ``entry`` honouring Accept-Encoding"""
+        accepted = request.accept_encodings
+        encoding = next(
+            (name for name, _ in ENCODINGS if name in entry.variants and accepted[name]), None
+        )
+
+        if encoding:
+            body = entry.variants[encoding]
+            response = Response(body, mimetype=entry.mimetype)
+            response.content_encoding = encoding
+            # Each representation needs its own validator
+            response.set_etag(f'{entry.etag}-{encoding}')
+            length = len(body)
+        elif entry.data is not None:
+            response = Response(entry.data, mimetype=entry.mimetype)
+            response.set_etag(entry.etag)
+            length = entry.size
+        else:
+            response = send_file(entry.path, mimetype=entry.mimetype, etag=entry.etag, conditional=False)
+            length = entry.size
+
+        response.last_modified = entry.mtime
+        response.headers['Cache-Control'] = entry.cache_control
+        if entry.variants:
+            response.vary.add('Accept-Encoding')
+        return response.make_conditional(request, accept_ranges=True, complete_length=length)
+
+
+def precompress(folder):
+    """Write ``.gz`` (and ``.br`` when brotli is installed) next to compressible files"""
+    written = 0
+    for root, _, names in os.walk(folder):
+        for name in names:
+            if name.endswith(('.gz', '.br')):
+                continue
+            path = os.path.join(root, name)
+            mimetype = mimetypes.guess_type(name)[0] or ''
+            if not _compressible(mimetype, os.path.getsize(path)):
+                continue
+            with open(path, 'rb') as source:
+                data = source.read()
+            with open(path + '.gz', 'wb') as target:
+                target.write(gzip.compress(data, 9, mtime=0))
+            written += 1
+            if brotli is not None:
+                with open(path + '.br', 'wb') as target:
+                    target.write(brotli.compress(data))
+                written += 1
+    return written
+
+
+if __name__ == '__main__':
+    for folder in sys.argv[1:]:
+        print(f"{folder}: wrote {precompress(folder)} compressed files")